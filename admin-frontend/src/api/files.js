@@ -1,21 +1,51 @@
 import apiClient from "./client.js";
 
+const JOB_POLL_INTERVAL_MS = 1000;
+// Stop polling after 30 minutes; the backend fails jobs whose worker stopped long before that.
+const JOB_MAX_POLL_ATTEMPTS = 1800;
+const FINISHED_JOB_STATUSES = ["completed", "failed"];
+
 export async function fetchFileStats() {
   const { data } = await apiClient.get("/files/stats/");
   return data;
 }
 
-export async function bulkDeleteFiles(count) {
-  const { data } = await apiClient.post("/files/bulk-delete/", { count });
+export async function fetchFileJob(jobId) {
+  const { data } = await apiClient.get(`/files/jobs/${jobId}/`);
   return data;
 }
 
+export async function waitForFileJob(job, onProgress) {
+  let current = job;
+  let attempts = 0;
+  while (!FINISHED_JOB_STATUSES.includes(current.status)) {
+    if (attempts >= JOB_MAX_POLL_ATTEMPTS) {
+      throw new Error("File deletion is taking too long; check the job again later");
+    }
+    attempts += 1;
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    current = await fetchFileJob(current.id);
+    if (onProgress) {
+      onProgress(current);
+    }
+  }
+  if (current.status === "failed") {
+    throw new Error(current.error || "File deletion failed");
+  }
+  return current;
+}
+
+export async function bulkDeleteFiles(count, onProgress) {
+  const { data } = await apiClient.post("/files/bulk-delete/", { count });
+  return waitForFileJob(data, onProgress);
+}
+
 export async function fetchTripFileStats(tripId) {
   const { data } = await apiClient.get(`/trips/${tripId}/files/stats/`);
   return data;
 }
 
-export async function deleteTripFiles(tripId) {
+export async function deleteTripFiles(tripId, onProgress) {
   const { data } = await apiClient.post(`/trips/${tripId}/files/delete/`);
-  return data;
+  return waitForFileJob(data, onProgress);
 }
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -103,6 +104,24 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads larger than this spool to a temporary file instead of staying in memory,
+# so concurrent payment proofs do not each hold a full copy in the worker.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", str(256 * 1024)))
+PAYMENT_PROOF_MAX_SIZE = int(os.getenv("PAYMENT_PROOF_MAX_SIZE", str(10 * 1024 * 1024)))
+
+# Payment proofs submitted as a Telegram file_id are downloaded by a background worker.
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+PAYMENT_PROOF_FETCHER = os.getenv("PAYMENT_PROOF_FETCHER", "core.telegram_files.TelegramBotAPIFetcher")
+PAYMENT_PROOF_FETCH_WORKERS = int(os.getenv("PAYMENT_PROOF_FETCH_WORKERS", "2"))
+PAYMENT_PROOF_FETCH_TIMEOUT = int(os.getenv("PAYMENT_PROOF_FETCH_TIMEOUT", "60"))
+# A download claimed longer ago than this is treated as abandoned (e.g. the worker restarted).
+PAYMENT_PROOF_FETCH_CLAIM_SECONDS = int(os.getenv("PAYMENT_PROOF_FETCH_CLAIM_SECONDS", "300"))
+
+# Place photos get resized WebP and JPEG copies, keyed by name with the longest edge in pixels.
+PLACE_PHOTO_VARIANT_SIZES = {"thumb": 320, "medium": 800, "large": 1600}
+PLACE_PHOTO_VARIANT_WORKERS = int(os.getenv("PLACE_PHOTO_VARIANT_WORKERS", "2"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
@@ -123,6 +142,39 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 20,
 }
 
+# Every worker must share this cache: Settings.load() and bot token lookups are cached
+# per process and invalidated through version tokens stored here. The default file
+# cache is shared by all processes on one host; use Redis or Memcached across hosts.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "loctur-cache")),
+    }
+}
+
+# Delta sync cursors trail the server clock by this much so late commits are not skipped.
+DELTA_SYNC_OVERLAP_SECONDS = int(os.getenv("DELTA_SYNC_OVERLAP_SECONDS", "5"))
+# Deletion tombstones are kept this long (prune_deleted_records); older watermarks need a full sync.
+DELTA_SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("DELTA_SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Outbox delivery: unacknowledged events are redelivered after the ack timeout, up to
+# OUTBOX_MAX_ATTEMPTS times. /api/events/ holds a request open for at most the wait limit,
+# which ties up a worker thread, so keep it short; the bot polls again after a delay.
+OUTBOX_ACK_TIMEOUT_SECONDS = int(os.getenv("OUTBOX_ACK_TIMEOUT_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_LONG_POLL_MAX_SECONDS = int(os.getenv("OUTBOX_LONG_POLL_MAX_SECONDS", "5"))
+
+# Number of threads a background file purge job uses to unlink files.
+FILE_PURGE_WORKERS = int(os.getenv("FILE_PURGE_WORKERS", "8"))
+# Pending or running purge jobs with no progress for this long are failed (worker restarts).
+FILE_PURGE_STALE_SECONDS = int(os.getenv("FILE_PURGE_STALE_SECONDS", "600"))
+
+# Bot token lookups are cached per process and revoked everywhere through CACHES;
+# misses are cached briefly to absorb invalid-token floods.
+BOT_TOKEN_CACHE_TTL = int(os.getenv("BOT_TOKEN_CACHE_TTL", "60"))
+BOT_TOKEN_CACHE_NEGATIVE_TTL = int(os.getenv("BOT_TOKEN_CACHE_NEGATIVE_TTL", "5"))
+BOT_TOKEN_CACHE_SIZE = int(os.getenv("BOT_TOKEN_CACHE_SIZE", "256"))
+
 CORS_ALLOWED_ORIGINS = list(
     filter(
         None,
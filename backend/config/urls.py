@@ -28,8 +28,22 @@ urlpatterns = [
     path("api/auth/user/", views.UserView.as_view(), name="user"),
     path("api/auth/csrf/", views.CSRFTokenView.as_view(), name="csrf-token"),
     path("api/auth/", include("rest_framework.urls")),
+    path("api/bot/join-requests/", views.BotJoinRequestLookupView.as_view(), name="bot-join-request"),
+    path(
+        "api/bot/registration-context/",
+        views.BotRegistrationContextView.as_view(),
+        name="bot-registration-context",
+    ),
+    path(
+        "api/bot/travelers/<int:telegram_id>/registrations/",
+        views.BotTravelerRegistrationsView.as_view(),
+        name="bot-traveler-registrations",
+    ),
+    path("api/events/", views.OutboxEventListView.as_view(), name="outbox-events"),
+    path("api/events/ack/", views.OutboxEventAckView.as_view(), name="outbox-events-ack"),
     path("api/files/stats/", views.FileStatsView.as_view(), name="file-stats"),
     path("api/files/bulk-delete/", views.BulkDeleteFilesView.as_view(), name="bulk-delete-files"),
+    path("api/files/jobs/<uuid:pk>/", views.FilePurgeJobView.as_view(), name="file-purge-job"),
     path("api/trips/<uuid:pk>/files/stats/", views.TripFileStatsView.as_view(), name="trip-file-stats"),
     path("api/trips/<uuid:pk>/files/delete/", views.TripDeleteFilesView.as_view(), name="trip-delete-files"),
     path("api/metrics/overview/", views.OverviewMetricsView.as_view(), name="metrics-overview"),
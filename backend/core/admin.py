@@ -89,3 +89,31 @@ class BotTokenAdmin(admin.ModelAdmin):
     list_display = ("name", "is_active", "created_at")
     search_fields = ("name", "token")
     list_filter = ("is_active",)
+
+
+@admin.register(models.DailyFinanceRollup)
+class DailyFinanceRollupAdmin(admin.ModelAdmin):
+    list_display = ("date", "trip", "income", "expenses", "confirmations", "outstanding")
+    list_filter = ("date",)
+    search_fields = ("trip__title",)
+
+
+@admin.register(models.StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ("path", "kind", "size", "ref_count", "mtime")
+    list_filter = ("kind",)
+    search_fields = ("path",)
+    readonly_fields = ("user_trip", "place_photo")
+
+
+@admin.register(models.FilePurgeJob)
+class FilePurgeJobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "trip", "status", "deleted_count", "total_files", "created_at")
+    list_filter = ("kind", "status")
+
+
+@admin.register(models.OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("event_type", "user_trip", "attempts", "available_at", "acknowledged_at", "created_at")
+    list_filter = ("event_type",)
+    readonly_fields = ("user_trip",)
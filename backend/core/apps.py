@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "LocTur Core"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
@@ -1,12 +1,18 @@
 """Custom authentication backends."""
 from __future__ import annotations
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from rest_framework import authentication, exceptions
 
+from . import versioning
 from .models import BotToken
 
 
@@ -32,6 +38,84 @@ class BotUser:
         return f"BotUser<{self.token.name}>"
 
 
+class BotTokenCache:
+    """Bounded TTL cache of bot token lookups keyed by a SHA-256 digest of the token.
+
+    Hits store the token's field values without the raw token string; misses are
+    remembered for a shorter time so repeated invalid tokens skip the database.
+    Entries are stamped with a version token from the shared cache, which
+    ``invalidate`` replaces, so a revoked token stops working on every worker.
+    """
+
+    VERSION_KEY = "core:bot-tokens:version"
+
+    def __init__(self, *, ttl: float, negative_ttl: float, max_size: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, Tuple[float, str, Optional[Dict[str, Any]]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token_value: str) -> str:
+        return hashlib.sha256(token_value.encode("utf-8")).hexdigest()
+
+    def get(self, token_value: str) -> Tuple[bool, Optional[Dict[str, Any]], str]:
+        """Return ``(found, values, version)``; ``values`` is None for a cached miss.
+
+        On a miss, pass ``version`` back to ``set`` so a revocation that lands during
+        the database lookup is not hidden under the newer version.
+        """
+        key = self._key(token_value)
+        version = versioning.current(self.VERSION_KEY)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None, version
+            expires_at, entry_version, values = entry
+            if expires_at <= time.monotonic() or entry_version != version:
+                del self._entries[key]
+                return False, None, version
+            self._entries.move_to_end(key)
+            return True, values, version
+
+    def set(self, token_value: str, values: Optional[Dict[str, Any]], version: str) -> None:
+        """Store a lookup made under ``version``, the token ``get`` returned before it."""
+        ttl = self.ttl if values is not None else self.negative_ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        key = self._key(token_value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, version, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self) -> None:
+        """Drop cached lookups in this process and, through the version token, in every other."""
+        versioning.bump(self.VERSION_KEY)
+        self.clear()
+
+
+bot_token_cache = BotTokenCache(
+    ttl=getattr(settings, "BOT_TOKEN_CACHE_TTL", 60),
+    negative_ttl=getattr(settings, "BOT_TOKEN_CACHE_NEGATIVE_TTL", 5),
+    max_size=getattr(settings, "BOT_TOKEN_CACHE_SIZE", 256),
+)
+
+
+def _token_values(token: BotToken) -> Dict[str, Any]:
+    return {
+        field.attname: getattr(token, field.attname)
+        for field in token._meta.concrete_fields
+        if field.name != "token"
+    }
+
+
 class BotTokenAuthentication(authentication.BaseAuthentication):
     """Authenticate Telegram bot requests via `X-Bot-Token` header."""
 
@@ -42,10 +126,18 @@ class BotTokenAuthentication(authentication.BaseAuthentication):
         if not token_value:
             return None
 
-        try:
-            token = BotToken.objects.get(token=token_value, is_active=True)
-        except BotToken.DoesNotExist as exc:
-            raise exceptions.AuthenticationFailed("Invalid bot token.") from exc
+        found, values, version = bot_token_cache.get(token_value)
+        if not found:
+            try:
+                token = BotToken.objects.get(token=token_value, is_active=True)
+            except BotToken.DoesNotExist as exc:
+                bot_token_cache.set(token_value, None, version)
+                raise exceptions.AuthenticationFailed("Invalid bot token.") from exc
+            bot_token_cache.set(token_value, _token_values(token), version)
+        elif values is None:
+            raise exceptions.AuthenticationFailed("Invalid bot token.")
+        else:
+            token = BotToken(token=token_value, **values)
 
         return BotUser(token=token), token
 
@@ -0,0 +1,72 @@
+"""Validators for conditional GETs, computed from ``updated_at`` watermarks."""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from . import models
+
+Validators = Tuple[str, Optional[datetime]]
+
+
+def make_validators(request, parts: Iterable[object]) -> Validators:
+    """Build a strong ETag and Last-Modified date for the representation at ``request``.
+
+    ``parts`` must change whenever the serialized data could; the request path and
+    renderer are mixed in so different pages and formats never share a tag.
+    """
+    parts = list(parts)
+    renderer = getattr(getattr(request, "accepted_renderer", None), "format", "")
+    digest = hashlib.sha1(
+        "|".join([request.get_full_path(), renderer, *map(str, parts)]).encode("utf-8")
+    ).hexdigest()
+    timestamps = [part for part in parts if isinstance(part, datetime)]
+    return quote_etag(digest), max(timestamps) if timestamps else None
+
+
+def _per_trip(model, link: str, outer: str, expression):
+    """``expression`` over the ``model`` rows whose ``link`` matches the outer trip's ``outer``."""
+    rows = model.objects.filter(**{link: OuterRef(outer)}).order_by().values(link).annotate(value=expression)
+    return Subquery(rows.values("value")[:1])
+
+
+def trip_watermark(queryset) -> Optional[Tuple[object, ...]]:
+    """Summarize everything a serialized trip depends on, or None if no trip matches.
+
+    Counts catch deletions; maxima of ``updated_at`` catch inserts and edits of the
+    trips, their places and photos, and the registrations and expenses behind the
+    financial totals. The start of the local day is included because
+    ``is_registration_open`` changes at midnight without any row changing. Everything
+    is computed in one query.
+    """
+    trips = (
+        models.Trip.objects.filter(pk__in=queryset.order_by().values("pk"))
+        .annotate(
+            place_photos=_per_trip(models.PlacePhoto, "place", "place_id", Count("pk")),
+            place_photos_updated=_per_trip(models.PlacePhoto, "place", "place_id", Max("updated_at")),
+            registrations=_per_trip(models.UserTrip, "trip", "pk", Count("pk")),
+            registrations_updated=_per_trip(models.UserTrip, "trip", "pk", Max("updated_at")),
+            trip_expenses=_per_trip(models.Expense, "trip", "pk", Count("pk")),
+            trip_expenses_updated=_per_trip(models.Expense, "trip", "pk", Max("updated_at")),
+        )
+    )
+    watermark = trips.aggregate(
+        count=Count("pk"),
+        updated=Max("updated_at"),
+        place_updated=Max("place__updated_at"),
+        photos_count=Sum("place_photos"),
+        photos_updated=Max("place_photos_updated"),
+        user_trips_count=Sum("registrations"),
+        user_trips_updated=Max("registrations_updated"),
+        expenses_count=Sum("trip_expenses"),
+        expenses_updated=Max("trip_expenses_updated"),
+    )
+    if not watermark["count"]:
+        return None
+    day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (*watermark.values(), day_start)
@@ -0,0 +1,111 @@
+"""Sparse fieldsets (``?fields=``) and explicit expansion (``?expand=``) for read requests."""
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from rest_framework import serializers
+
+# Nested field names to their own spec. ``None`` means "everything", at any level.
+FieldSpec = Optional[Dict[str, "FieldSpec"]]
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def parse_spec(value: str | None) -> FieldSpec:
+    """Turn ``"id,trip_detail.title"`` into ``{"id": None, "trip_detail": {"title": None}}``."""
+    if not value:
+        return None
+    tree: Dict[str, FieldSpec] = {}
+    for path in value.split(","):
+        parts = [part for part in path.strip().split(".") if part]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break  # the whole field was requested already
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree or None
+
+
+def _child(spec: FieldSpec, name: str) -> FieldSpec:
+    return None if spec is None else spec.get(name)
+
+
+class FieldShape:
+    """The representation a read request asked for: which fields, which expansions."""
+
+    def __init__(self, fields: FieldSpec = None, expand: FieldSpec = None):
+        self.fields = fields
+        self.expand = expand or {}
+
+    @classmethod
+    def from_request(cls, request) -> "FieldShape":
+        if request is None or request.method not in SAFE_METHODS:
+            return cls()
+        return cls(parse_spec(request.query_params.get("fields")), parse_spec(request.query_params.get("expand")))
+
+    def includes(self, path: str) -> bool:
+        """True if the dotted field path is part of the response (absent ``fields`` includes all)."""
+        spec = self.fields
+        for name in path.split("."):
+            if spec is None:
+                return True
+            if name not in spec:
+                return False
+            spec = spec[name]
+        return True
+
+    def includes_any(self, prefix: str, names: Iterable[str]) -> bool:
+        prefix = f"{prefix}." if prefix else ""
+        return any(self.includes(prefix + name) for name in names)
+
+    def expands(self, path: str) -> bool:
+        spec: FieldSpec = self.expand
+        for name in path.split("."):
+            if not spec or name not in spec:
+                return False
+            spec = spec[name]
+        return True
+
+
+class SparseFieldsMixin:
+    """Serializer mixin that drops unrequested fields before anything is evaluated.
+
+    The top-level serializer reads the request's ``fields``/``expand`` parameters and
+    hands each nested ``SparseFieldsMixin`` serializer its part of them.
+    ``expandable_fields`` maps an expansion name to the field it replaces and a factory
+    for the richer field (``expand=place`` swaps ``place_detail``); nested paths go
+    through field names, as in ``expand=trip_detail.place``. Only read requests are
+    shaped; writes always see every field.
+    """
+
+    expandable_fields: Dict[str, Tuple[str, Callable[[], serializers.Field]]] = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, expand = self._field_specs()
+        for expansion, (name, factory) in self.expandable_fields.items():
+            if expand and expansion in expand and name in fields:
+                fields[name] = factory()
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+        for name, field in fields.items():
+            nested = getattr(field, "child", field)
+            if isinstance(nested, SparseFieldsMixin):
+                nested._sparse_specs = (_child(only, name), _child(expand, name))
+        return fields
+
+    def _field_specs(self):
+        specs = getattr(self, "_sparse_specs", None)
+        if specs is not None:
+            return specs
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return None, None
+        shape = FieldShape.from_request(self.context.get("request"))
+        return shape.fields, shape.expand
@@ -0,0 +1,121 @@
+"""Background generation of resized place photo variants."""
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterator, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import media, models
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIRECTORY = "place_photo_variants"
+
+# Pillow format name, file extension and encoder options per output format.
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_variant_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PLACE_PHOTO_VARIANT_WORKERS", 2),
+    thread_name_prefix="photo-variants",
+)
+
+
+def variant_sizes() -> Dict[str, int]:
+    """Variant name to the longest edge in pixels, smallest first."""
+    sizes = getattr(settings, "PLACE_PHOTO_VARIANT_SIZES", {"thumb": 320, "medium": 800, "large": 1600})
+    return dict(sorted(sizes.items(), key=lambda item: item[1]))
+
+
+def enqueue_variants(photo: models.PlacePhoto) -> None:
+    """Render the photo's variants in the background once the transaction commits."""
+    transaction.on_commit(lambda: _variant_executor.submit(_run_in_worker, photo.pk))
+
+
+def _run_in_worker(photo_id) -> None:
+    close_old_connections()
+    try:
+        generate_variants(photo_id)
+    except Exception:  # pragma: no cover - defensive logging
+        logger.exception("Unable to generate variants for place photo %s", photo_id)
+    finally:
+        close_old_connections()
+
+
+def render_variants(source) -> Iterator[Tuple[str, str, bytes, int, int]]:
+    """Yield ``(variant, format, data, width, height)`` for every configured size and format.
+
+    The image is rotated according to its EXIF orientation first; the encoded
+    variants carry no EXIF or other metadata. Images are never upscaled, and sizes
+    that would repeat a smaller variant's dimensions are skipped.
+    """
+    with Image.open(source) as original:
+        original.draft("RGB", (max(variant_sizes().values()),) * 2)
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+    previous = None
+    for variant, edge in variant_sizes().items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        if resized.size == previous:
+            continue
+        previous = resized.size
+        for format_key, (pil_format, _, options) in FORMATS.items():
+            output = resized
+            if pil_format == "JPEG" and output.mode == "RGBA":
+                output = Image.new("RGB", resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel("A"))
+            buffer = BytesIO()
+            output.save(buffer, pil_format, **options)
+            yield variant, format_key, buffer.getvalue(), resized.width, resized.height
+
+
+def generate_variants(photo_id) -> bool:
+    """Render and store variants for a photo, replacing any previous set. Returns True on success."""
+    try:
+        photo = models.PlacePhoto.objects.get(pk=photo_id)
+    except models.PlacePhoto.DoesNotExist:
+        return False
+    if not photo.image:
+        return False
+
+    variants: Dict[str, Dict[str, object]] = {}
+    try:
+        with photo.image.open("rb") as source:
+            rendered = list(render_variants(source))
+    except (OSError, Image.DecompressionBombError) as exc:
+        logger.warning("Unable to read place photo %s: %s", photo_id, exc)
+        return False
+
+    delete_variants(photo.variants)
+    for variant, format_key, data, width, height in rendered:
+        extension = FORMATS[format_key][1]
+        name = default_storage.save(f"{VARIANT_DIRECTORY}/{photo.pk}/{variant}.{extension}", ContentFile(data))
+        media.record_file(name, place_photo=photo)
+        entry = variants.setdefault(variant, {"width": width, "height": height})
+        entry[format_key] = name
+
+    models.PlacePhoto.objects.filter(pk=photo.pk).update(variants=variants, updated_at=timezone.now())
+    return True
+
+
+def delete_variants(variants: Dict[str, Dict[str, object]]) -> None:
+    """Remove stored variant files and their manifest entries."""
+    for entry in (variants or {}).values():
+        for format_key in FORMATS:
+            name = entry.get(format_key)
+            if name:
+                default_storage.delete(name)
+                media.release_file(name)
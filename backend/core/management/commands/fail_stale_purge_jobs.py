@@ -0,0 +1,14 @@
+"""Fail file purge jobs orphaned by a restarted or killed worker."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.purge import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Mark pending or running FilePurgeJobs without progress for FILE_PURGE_STALE_SECONDS as failed."
+
+    def handle(self, *args, **options):
+        count = fail_stale_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Marked {count} stale purge jobs as failed."))
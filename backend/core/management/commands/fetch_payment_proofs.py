@@ -0,0 +1,25 @@
+"""Download payment proofs still pending behind a Telegram file_id."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core import models
+from core.telegram_files import fetch_payment_proof
+
+
+class Command(BaseCommand):
+    help = "Fetch payment proofs that were submitted as a Telegram file_id but not downloaded yet."
+
+    def handle(self, *args, **options):
+        pending = (
+            models.UserTrip.objects.exclude(payment_proof_file_id="")
+            .filter(payment_proof="")
+            .values_list("pk", flat=True)
+        )
+        fetched = failed = 0
+        for user_trip_id in pending.iterator():
+            if fetch_payment_proof(user_trip_id):
+                fetched += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Fetched {fetched} payment proofs; {failed} still pending."))
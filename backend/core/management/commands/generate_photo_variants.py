@@ -0,0 +1,30 @@
+"""Render resized variants for place photos that do not have them yet."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core import models
+from core.images import generate_variants
+
+
+class Command(BaseCommand):
+    help = "Generate WebP/JPEG variants for place photos, skipping photos that already have them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate variants for every photo, e.g. after changing PLACE_PHOTO_VARIANT_SIZES.",
+        )
+
+    def handle(self, *args, **options):
+        photos = models.PlacePhoto.objects.exclude(image="")
+        if not options["all"]:
+            photos = photos.filter(variants={})
+        generated = failed = 0
+        for photo_id in photos.values_list("pk", flat=True).iterator():
+            if generate_variants(photo_id):
+                generated += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {generated} photos; {failed} failed."))
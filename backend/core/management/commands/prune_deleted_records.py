@@ -0,0 +1,14 @@
+"""Delete delta sync tombstones older than the retention window."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.models import DeletedRecord
+
+
+class Command(BaseCommand):
+    help = "Delete DeletedRecord tombstones older than DELTA_SYNC_TOMBSTONE_RETENTION_DAYS."
+
+    def handle(self, *args, **options):
+        count = DeletedRecord.prune()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} deleted record tombstones."))
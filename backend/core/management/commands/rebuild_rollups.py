@@ -0,0 +1,14 @@
+"""Rebuild the daily finance rollup table from registrations and expenses."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailyFinanceRollup rows from UserTrip and Expense records."
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily finance rollup rows."))
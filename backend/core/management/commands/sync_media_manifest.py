@@ -0,0 +1,73 @@
+"""Backfill and reconcile the StoredFile manifest against media storage."""
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import models
+from core.images import FORMATS
+from core.media import KIND_DIRECTORIES
+
+
+class Command(BaseCommand):
+    help = "Scan payment proof, place photo and variant directories and reconcile StoredFile rows."
+
+    def handle(self, *args, **options):
+        media_root = Path(settings.MEDIA_ROOT)
+        proof_rows = list(models.UserTrip.objects.exclude(payment_proof="").values_list("payment_proof", "id"))
+        proof_owners = dict(proof_rows)
+        photo_owners = {}
+        for image, photo_id, variants in models.PlacePhoto.objects.exclude(image="").values_list(
+            "image", "id", "variants"
+        ):
+            photo_owners[image] = photo_id
+            for entry in (variants or {}).values():
+                photo_owners.update(
+                    (entry[format_key], photo_id) for format_key in FORMATS if entry.get(format_key)
+                )
+        # Content-addressed proofs may be shared by several registrations.
+        references = Counter(name for name, _ in proof_rows)
+        references.update(photo_owners.keys())
+
+        seen = set()
+        created = updated = 0
+        for kind, directory in KIND_DIRECTORIES.items():
+            dir_path = media_root / directory
+            if not dir_path.exists():
+                continue
+            for file_path in dir_path.rglob("*"):
+                if not file_path.is_file() or file_path.name.startswith(".upload-"):
+                    continue
+                name = file_path.relative_to(media_root).as_posix()
+                stat = file_path.stat()
+                seen.add(name)
+                _, was_created = models.StoredFile.objects.update_or_create(
+                    path=name,
+                    defaults={
+                        "kind": kind,
+                        "size": stat.st_size,
+                        "mtime": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                        "user_trip_id": proof_owners.get(name),
+                        "place_photo_id": photo_owners.get(name),
+                        "ref_count": references[name],
+                    },
+                )
+                if was_created:
+                    created += 1
+                else:
+                    updated += 1
+
+        stale = [path for path in models.StoredFile.objects.values_list("path", flat=True) if path not in seen]
+        removed = 0
+        for start in range(0, len(stale), 500):
+            count, _ = models.StoredFile.objects.filter(path__in=stale[start:start + 500]).delete()
+            removed += count
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Media manifest synced: {created} added, {updated} refreshed, {removed} removed."
+            )
+        )
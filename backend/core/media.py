@@ -0,0 +1,100 @@
+"""Helpers that keep the ``StoredFile`` manifest in sync with media storage."""
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from . import models
+
+KIND_DIRECTORIES = {
+    models.StoredFile.KIND_PAYMENT_PROOF: "payment_proofs",
+    models.StoredFile.KIND_PLACE_PHOTO: "place_photos",
+    models.StoredFile.KIND_PHOTO_VARIANT: "place_photo_variants",
+}
+
+
+def kind_for_path(name: str) -> Optional[str]:
+    """Return the manifest kind for a storage name, or None if it is not tracked."""
+    directory = name.split("/", 1)[0]
+    for kind, kind_directory in KIND_DIRECTORIES.items():
+        if directory == kind_directory:
+            return kind
+    return None
+
+
+def record_file(
+    name: str,
+    *,
+    user_trip: models.UserTrip | None = None,
+    place_photo: models.PlacePhoto | None = None,
+) -> Optional[models.StoredFile]:
+    """Add a reference to a file that was just attached, creating its manifest entry if needed.
+
+    The latest owner is kept on the entry; ``ref_count`` tracks how many records
+    share a content-addressed file.
+    """
+    kind = kind_for_path(name)
+    if not name or kind is None:
+        return None
+    with transaction.atomic():
+        # A purge unlinks content-addressed blobs while holding this row; once the lock
+        # is ours, the file is either still there and safe to count, or already gone.
+        models.StoredFile.objects.select_for_update().filter(path=name).first()
+        try:
+            size = default_storage.size(name)
+            mtime = default_storage.get_modified_time(name)
+        except (FileNotFoundError, NotImplementedError, OSError):
+            return None
+        stored_file, created = models.StoredFile.objects.update_or_create(
+            path=name,
+            defaults={
+                "kind": kind,
+                "size": size,
+                "mtime": mtime,
+                "user_trip": user_trip,
+                "place_photo": place_photo,
+            },
+        )
+        if not created:
+            models.StoredFile.objects.filter(pk=stored_file.pk).update(ref_count=F("ref_count") + 1)
+    return stored_file
+
+
+def release_file(name: str) -> None:
+    """Drop one reference to a file, removing the entry if the file is gone from storage.
+
+    Entries whose last reference is released stay in the manifest without an owner,
+    so storage stats keep counting the file until it is purged.
+    """
+    if not name or kind_for_path(name) is None:
+        return
+    if default_storage.exists(name):
+        models.StoredFile.objects.filter(path=name, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+        models.StoredFile.objects.filter(path=name, ref_count=0).update(user_trip=None, place_photo=None)
+    else:
+        models.StoredFile.objects.filter(path=name).delete()
+
+
+def file_stats(queryset=None) -> Dict[str, Dict[str, float]]:
+    """Return count/size totals per kind plus an overall total, in the file stats response shape."""
+    queryset = models.StoredFile.objects.all() if queryset is None else queryset
+    totals = {
+        row["kind"]: (row["count"], row["size"] or 0)
+        for row in queryset.order_by().values("kind").annotate(count=Count("pk"), size=Sum("size"))
+    }
+
+    def _entry(count: int, size: int) -> Dict[str, float]:
+        return {"count": count, "size": size, "size_mb": round(size / (1024 * 1024), 2)}
+
+    proofs = totals.get(models.StoredFile.KIND_PAYMENT_PROOF, (0, 0))
+    photos = totals.get(models.StoredFile.KIND_PLACE_PHOTO, (0, 0))
+    variants = totals.get(models.StoredFile.KIND_PHOTO_VARIANT, (0, 0))
+    return {
+        "payment_proofs": _entry(*proofs),
+        "place_photos": _entry(*photos),
+        "photo_variants": _entry(*variants),
+        "total": _entry(proofs[0] + photos[0] + variants[0], proofs[1] + photos[1] + variants[1]),
+    }
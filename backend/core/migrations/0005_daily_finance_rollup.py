@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:17
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_settings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFinanceRollup',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('income', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('expenses', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('confirmations', models.PositiveIntegerField(default=0)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.trip')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('date', 'trip')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_daily_finance_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('path', models.CharField(help_text='Storage name relative to MEDIA_ROOT.', max_length=255, unique=True)),
+                ('kind', models.CharField(choices=[('payment_proof', 'Payment proof'), ('place_photo', 'Place photo')], max_length=16)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('mtime', models.DateTimeField()),
+                ('place_photo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stored_files', to='core.placephoto')),
+                ('user_trip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stored_files', to='core.usertrip')),
+            ],
+            options={
+                'ordering': ['mtime'],
+                'indexes': [models.Index(fields=['kind', 'size'], name='core_storedfile_kind_size'), models.Index(fields=['mtime'], name='core_storedfile_mtime')],
+            },
+        ),
+    ]
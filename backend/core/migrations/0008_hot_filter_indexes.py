@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_file_purge_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usertrip',
+            name='traveler',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='user_trips', to='core.traveler'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['incurred_at'], name='core_expense_incurred_at'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(fields=['status', 'payment_status'], name='core_usertrip_status_payment'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(fields=['traveler', 'trip'], name='core_usertrip_traveler_trip'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(condition=models.Q(('group_joined_at__isnull', True), ('payment_status', 'confirmed'), ('status', 'confirmed')), fields=['created_at'], name='core_usertrip_awaiting_join'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(fields=['confirmed_at'], name='core_usertrip_confirmed_at'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(fields=['created_at'], name='core_usertrip_created_at'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traveler',
+            index=models.Index(fields=['created_at'], name='core_traveler_created_at'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:24
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_traveler_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model_name', models.CharField(max_length=32)),
+                ('object_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='traveler',
+            index=models.Index(fields=['updated_at'], name='core_traveler_updated_at'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['updated_at'], name='core_trip_updated_at'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(fields=['updated_at'], name='core_usertrip_updated_at'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedrecord',
+            index=models.Index(fields=['model_name', 'deleted_at'], name='core_deletedrecord_lookup'),
+        ),
+    ]
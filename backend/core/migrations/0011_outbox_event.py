@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('payment_confirmed', 'Payment confirmed')], max_length=32)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('acknowledged_at', models.DateTimeField(blank=True, null=True)),
+                ('user_trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='core.usertrip')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(condition=models.Q(('acknowledged_at__isnull', True)), fields=['available_at'], name='core_outboxevent_pending')],
+            },
+        ),
+    ]
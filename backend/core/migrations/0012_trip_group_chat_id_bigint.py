@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+def copy_chat_ids(apps, schema_editor):
+    Trip = apps.get_model("core", "Trip")
+    for trip in Trip.objects.exclude(group_chat_id="").only("pk", "group_chat_id"):
+        try:
+            chat_id = int(trip.group_chat_id.strip())
+        except (TypeError, ValueError):
+            continue
+        Trip.objects.filter(pk=trip.pk).update(group_chat_id_int=chat_id)
+
+
+def copy_chat_ids_back(apps, schema_editor):
+    Trip = apps.get_model("core", "Trip")
+    for trip in Trip.objects.exclude(group_chat_id_int=None).only("pk", "group_chat_id_int"):
+        Trip.objects.filter(pk=trip.pk).update(group_chat_id=str(trip.group_chat_id_int))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_outbox_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="group_chat_id_int",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_chat_ids, copy_chat_ids_back),
+        migrations.RemoveField(
+            model_name="trip",
+            name="group_chat_id",
+        ),
+        migrations.RenameField(
+            model_name="trip",
+            old_name="group_chat_id_int",
+            new_name="group_chat_id",
+        ),
+        migrations.AlterField(
+            model_name="trip",
+            name="group_chat_id",
+            field=models.BigIntegerField(
+                blank=True,
+                help_text="Telegram chat identifier (e.g. -1001234567890) where confirmed travelers should be added.",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                condition=models.Q(("group_chat_id__isnull", False)),
+                fields=["group_chat_id"],
+                name="core_trip_group_chat_id",
+            ),
+        ),
+    ]
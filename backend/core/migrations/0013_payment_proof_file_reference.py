@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_trip_group_chat_id_bigint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertrip',
+            name='payment_proof_fetch_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='usertrip',
+            name='payment_proof_file_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='usertrip',
+            name='payment_proof_file_unique_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:39
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_payment_proof_file_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='ref_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='usertrip',
+            name='payment_proof',
+            field=models.FileField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='payment_proofs/'),
+        ),
+        migrations.AddIndex(
+            model_name='usertrip',
+            index=models.Index(condition=models.Q(('payment_proof_file_unique_id', ''), _negated=True), fields=['payment_proof_file_unique_id'], name='core_usertrip_proof_unique_id'),
+        ),
+    ]
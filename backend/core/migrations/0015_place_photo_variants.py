@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_payment_proof_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placephoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='storedfile',
+            name='kind',
+            field=models.CharField(choices=[('payment_proof', 'Payment proof'), ('place_photo', 'Place photo'), ('photo_variant', 'Place photo variant')], max_length=16),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def assign_cover_photos(apps, schema_editor):
+    Place = apps.get_model("core", "Place")
+    PlacePhoto = apps.get_model("core", "PlacePhoto")
+    oldest = PlacePhoto.objects.filter(place_id=models.OuterRef("pk")).order_by("created_at").values("pk")[:1]
+    Place.objects.filter(cover_photo__isnull=True).update(cover_photo=models.Subquery(oldest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_place_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='cover_photo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.placephoto'),
+        ),
+        migrations.RunPython(assign_cover_photos, migrations.RunPython.noop),
+    ]
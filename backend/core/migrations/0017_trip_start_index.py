@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_place_cover_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['trip_start', 'id'], name='core_trip_start_id'),
+        ),
+    ]
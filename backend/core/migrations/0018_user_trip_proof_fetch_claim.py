@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_trip_start_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertrip',
+            name='payment_proof_fetch_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,13 +1,19 @@
 """Database models for the LocTur backend."""
 from __future__ import annotations
 
+import copy
 import uuid
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import versioning
+from .storage import payment_proof_storage
 
 
 class TimeStampedModel(models.Model):
@@ -33,6 +39,10 @@ class Traveler(TimeStampedModel):
 
     class Meta:
         ordering = ["first_name", "last_name"]
+        indexes = [
+            models.Index(fields=["created_at"], name="core_traveler_created_at"),
+            models.Index(fields=["updated_at"], name="core_traveler_updated_at"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name}".strip()
@@ -76,6 +86,15 @@ class Place(TimeStampedModel):
         on_delete=models.SET_NULL,
         related_name="places",
     )
+    # Shown in list payloads instead of the gallery; kept pointing at one of the
+    # place's photos by the PlacePhoto signals.
+    cover_photo = models.ForeignKey(
+        "PlacePhoto",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
 
     class Meta:
         ordering = ["name"]
@@ -91,6 +110,9 @@ class PlacePhoto(TimeStampedModel):
     place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="photos")
     image = models.ImageField(upload_to="place_photos/")
     caption = models.CharField(max_length=255, blank=True)
+    # Resized copies by variant name, e.g. {"thumb": {"width": 320, "height": 213,
+    # "webp": "<storage name>", "jpeg": "<storage name>"}}; filled in by ``core.images``.
+    variants = models.JSONField(default=dict, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -99,6 +121,50 @@ class PlacePhoto(TimeStampedModel):
         return f"Photo for {self.place.name}"
 
 
+class TripQuerySet(models.QuerySet):
+    """Query helpers for trips."""
+
+    def with_financials(self) -> "TripQuerySet":
+        """Annotate confirmed participants, income and expenses in a single query.
+
+        Each aggregate is a correlated subquery so the joins do not multiply rows.
+        Serializers read ``confirmed_count``, ``income_sum`` and ``expenses_sum``
+        and fall back to the model methods when they are absent.
+        """
+        confirmed = UserTrip.objects.filter(
+            trip=models.OuterRef("pk"),
+            status=UserTrip.STATUS_CONFIRMED,
+        ).values("trip")
+        expenses = Expense.objects.filter(trip=models.OuterRef("pk")).values("trip")
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+
+        return self.annotate(
+            confirmed_count=Coalesce(
+                models.Subquery(
+                    confirmed.annotate(total=models.Count("pk")).values("total")[:1],
+                    output_field=models.IntegerField(),
+                ),
+                0,
+            ),
+            income_sum=Coalesce(
+                models.Subquery(
+                    confirmed.annotate(total=models.Sum("paid_amount")).values("total")[:1],
+                    output_field=money,
+                ),
+                models.Value(Decimal("0.00")),
+                output_field=money,
+            ),
+            expenses_sum=Coalesce(
+                models.Subquery(
+                    expenses.annotate(total=models.Sum("amount")).values("total")[:1],
+                    output_field=money,
+                ),
+                models.Value(Decimal("0.00")),
+                output_field=money,
+            ),
+        )
+
+
 class Trip(TimeStampedModel):
     """Trip definition created by admins."""
 
@@ -129,8 +195,8 @@ class Trip(TimeStampedModel):
     announce_in_channel = models.BooleanField(default=True)
     bonus_message = models.CharField(max_length=255, blank=True)
     custom_announcement_text = models.TextField(blank=True)
-    group_chat_id = models.CharField(
-        max_length=128,
+    group_chat_id = models.BigIntegerField(
+        null=True,
         blank=True,
         help_text=(
             "Telegram chat identifier (e.g. -1001234567890) where confirmed travelers should be added."
@@ -141,8 +207,19 @@ class Trip(TimeStampedModel):
         help_text="Optional static invite link shared with travelers after payment confirmation.",
     )
 
+    objects = TripQuerySet.as_manager()
+
     class Meta:
         ordering = ["-trip_start"]
+        indexes = [
+            models.Index(fields=["updated_at"], name="core_trip_updated_at"),
+            models.Index(fields=["trip_start", "id"], name="core_trip_start_id"),
+            models.Index(
+                fields=["group_chat_id"],
+                name="core_trip_group_chat_id",
+                condition=models.Q(group_chat_id__isnull=False),
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -220,7 +297,10 @@ class UserTrip(TimeStampedModel):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="user_trips")
-    traveler = models.ForeignKey(Traveler, on_delete=models.CASCADE, related_name="user_trips")
+    # Indexed through the (traveler, trip) composite index below.
+    traveler = models.ForeignKey(
+        Traveler, on_delete=models.CASCADE, related_name="user_trips", db_index=False
+    )
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
     payment_status = models.CharField(
         max_length=16, choices=PAYMENT_CHOICES, default=PAYMENT_PENDING
@@ -233,8 +313,16 @@ class UserTrip(TimeStampedModel):
         validators=[MinValueValidator(Decimal("0.00"))],
     )
     payment_note = models.TextField(blank=True)
-    payment_proof = models.FileField(upload_to="payment_proofs/", blank=True)
+    # Content-addressed: identical proofs share one file, see ``StoredFile.ref_count``.
+    payment_proof = models.FileField(upload_to="payment_proofs/", storage=payment_proof_storage, blank=True)
     payment_proof_uploaded_at = models.DateTimeField(null=True, blank=True)
+    # Set when the bot hands over a Telegram file reference instead of the file itself;
+    # the backend downloads it in the background (see ``core.telegram_files``).
+    payment_proof_file_id = models.CharField(max_length=255, blank=True)
+    payment_proof_file_unique_id = models.CharField(max_length=64, blank=True)
+    payment_proof_fetch_error = models.TextField(blank=True)
+    # Claim on the download, so the background worker and ``fetch_payment_proofs`` never both fetch it.
+    payment_proof_fetch_started_at = models.DateTimeField(null=True, blank=True, editable=False)
     custom_bonus_message = models.CharField(max_length=255, blank=True)
     admin_comment = models.TextField(blank=True)
     confirmed_by = models.ForeignKey(
@@ -251,6 +339,23 @@ class UserTrip(TimeStampedModel):
     class Meta:
         ordering = ["-created_at"]
         unique_together = ("trip", "traveler")
+        indexes = [
+            models.Index(fields=["status", "payment_status"], name="core_usertrip_status_payment"),
+            models.Index(fields=["traveler", "trip"], name="core_usertrip_traveler_trip"),
+            models.Index(
+                fields=["created_at"],
+                name="core_usertrip_awaiting_join",
+                condition=models.Q(status="confirmed", payment_status="confirmed", group_joined_at__isnull=True),
+            ),
+            models.Index(fields=["confirmed_at"], name="core_usertrip_confirmed_at"),
+            models.Index(fields=["created_at"], name="core_usertrip_created_at"),
+            models.Index(fields=["updated_at"], name="core_usertrip_updated_at"),
+            models.Index(
+                fields=["payment_proof_file_unique_id"],
+                name="core_usertrip_proof_unique_id",
+                condition=~models.Q(payment_proof_file_unique_id=""),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.traveler} -> {self.trip}"
@@ -283,14 +388,173 @@ class Expense(TimeStampedModel):
 
     class Meta:
         ordering = ["-incurred_at", "-created_at"]
+        indexes = [
+            models.Index(fields=["incurred_at"], name="core_expense_incurred_at"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.trip.title} - {self.amount}"
 
 
+class DailyFinanceRollup(TimeStampedModel):
+    """Per-day, per-trip financial totals maintained from registrations and expenses.
+
+    Income and confirmations are bucketed by ``UserTrip.confirmed_at``, expenses by
+    ``Expense.incurred_at`` and outstanding amounts by ``UserTrip.created_at``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    date = models.DateField()
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="daily_rollups")
+    income = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    expenses = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    confirmations = models.PositiveIntegerField(default=0)
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        ordering = ["date"]
+        unique_together = ("date", "trip")
+
+    def __str__(self) -> str:
+        return f"{self.date} - {self.trip_id}"
+
+
+class StoredFile(TimeStampedModel):
+    """Manifest entry for an uploaded media file kept under ``MEDIA_ROOT``."""
+
+    KIND_PAYMENT_PROOF = "payment_proof"
+    KIND_PLACE_PHOTO = "place_photo"
+    KIND_PHOTO_VARIANT = "photo_variant"
+    KIND_CHOICES = [
+        (KIND_PAYMENT_PROOF, "Payment proof"),
+        (KIND_PLACE_PHOTO, "Place photo"),
+        (KIND_PHOTO_VARIANT, "Place photo variant"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    path = models.CharField(max_length=255, unique=True, help_text="Storage name relative to MEDIA_ROOT.")
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    size = models.PositiveBigIntegerField(default=0)
+    mtime = models.DateTimeField()
+    # Number of records pointing at this path; content-addressed proofs can be shared.
+    ref_count = models.PositiveIntegerField(default=1)
+    user_trip = models.ForeignKey(
+        UserTrip,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stored_files",
+    )
+    place_photo = models.ForeignKey(
+        PlacePhoto,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stored_files",
+    )
+
+    class Meta:
+        ordering = ["mtime"]
+        indexes = [
+            models.Index(fields=["kind", "size"], name="core_storedfile_kind_size"),
+            models.Index(fields=["mtime"], name="core_storedfile_mtime"),
+        ]
+
+    def __str__(self) -> str:
+        return self.path
+
+
+class FilePurgeJob(TimeStampedModel):
+    """Background job that deletes media files for a trip or the oldest stored files."""
+
+    KIND_TRIP = "trip"
+    KIND_BULK = "bulk"
+    KIND_CHOICES = [
+        (KIND_TRIP, "Trip files"),
+        (KIND_BULK, "Oldest files"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="file_purge_jobs",
+    )
+    requested_count = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_files = models.PositiveIntegerField(default=0)
+    processed_count = models.PositiveIntegerField(default=0)
+    deleted_count = models.PositiveIntegerField(default=0)
+    deleted_size = models.PositiveBigIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="file_purge_jobs",
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} purge ({self.status})"
+
+
+class DeletedRecord(models.Model):
+    """Tombstone left behind when a synced object is deleted, for delta sync clients."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    model_name = models.CharField(max_length=32)
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["deleted_at"]
+        indexes = [
+            models.Index(fields=["model_name", "deleted_at"], name="core_deletedrecord_lookup"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model_name}:{self.object_id}"
+
+    @classmethod
+    def retention_cutoff(cls):
+        """Tombstones older than this are pruned; delta syncs must start after it."""
+        days = getattr(settings, "DELTA_SYNC_TOMBSTONE_RETENTION_DAYS", 30)
+        return timezone.now() - timedelta(days=days)
+
+    @classmethod
+    def prune(cls) -> int:
+        """Delete tombstones past the retention window and return how many were removed."""
+        deleted, _ = cls.objects.filter(deleted_at__lt=cls.retention_cutoff()).delete()
+        return deleted
+
+
 class Settings(TimeStampedModel):
     """Application settings for bot and payment instructions."""
 
+    CACHE_VERSION_KEY = "core:settings:version"
+    _cached: tuple[str, "Settings"] | None = None
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     payment_instructions = models.TextField(
         default="Send payment screenshot to the bot.",
@@ -313,3 +577,73 @@ class Settings(TimeStampedModel):
         if not self.pk and Settings.objects.exists():
             raise ValueError("Only one Settings instance is allowed")
         super().save(*args, **kwargs)
+        Settings.invalidate_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Settings.invalidate_cache()
+        return result
+
+    @classmethod
+    def load(cls) -> "Settings":
+        """Return the singleton settings row, creating it on first use.
+
+        The row is cached per process and tagged with a version token kept in the
+        shared cache (``CACHES``); saving replaces the token so every worker reloads.
+        """
+        version = versioning.current(cls.CACHE_VERSION_KEY)
+        cached = cls._cached
+        if cached is not None and cached[0] == version:
+            return copy.copy(cached[1])
+
+        instance, created = cls.objects.get_or_create(
+            defaults={
+                "payment_instructions": "Send payment screenshot to the bot.",
+                "support_contacts": "",
+            }
+        )
+        if created:
+            # Creating the row replaced the version token through save().
+            version = versioning.current(cls.CACHE_VERSION_KEY)
+        cls._cached = (version, instance)
+        return copy.copy(instance)
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        cls._cached = None
+        versioning.bump(cls.CACHE_VERSION_KEY)
+
+
+class OutboxEvent(TimeStampedModel):
+    """Event written alongside a state change and delivered to the bot at least once."""
+
+    TYPE_PAYMENT_CONFIRMED = "payment_confirmed"
+    TYPE_CHOICES = [
+        (TYPE_PAYMENT_CONFIRMED, "Payment confirmed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_type = models.CharField(max_length=32, choices=TYPE_CHOICES)
+    user_trip = models.ForeignKey(
+        UserTrip,
+        on_delete=models.CASCADE,
+        related_name="outbox_events",
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    # Undelivered events become visible again once their lease runs out.
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                name="core_outboxevent_pending",
+                condition=models.Q(acknowledged_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type}:{self.user_trip_id}"
@@ -0,0 +1,61 @@
+"""Transactional outbox feeding state changes to the Telegram bot."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from . import models
+
+
+def record_payment_confirmed(user_trip: models.UserTrip) -> models.OutboxEvent:
+    """Queue a payment confirmation event; call inside the transaction that confirms."""
+    return models.OutboxEvent.objects.create(
+        event_type=models.OutboxEvent.TYPE_PAYMENT_CONFIRMED,
+        user_trip=user_trip,
+        payload={"trip": str(user_trip.trip_id), "traveler": str(user_trip.traveler_id)},
+    )
+
+
+def claim_events(limit: int) -> List[models.OutboxEvent]:
+    """Lease up to ``limit`` deliverable events to the caller.
+
+    Claimed events are hidden for ``OUTBOX_ACK_TIMEOUT_SECONDS``; anything not
+    acknowledged by then is handed out again, which gives at-least-once delivery.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, "OUTBOX_ACK_TIMEOUT_SECONDS", 60))
+    max_attempts = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 10)
+
+    with transaction.atomic():
+        events = list(
+            models.OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(acknowledged_at__isnull=True, available_at__lte=now, attempts__lt=max_attempts)
+            .order_by("available_at")[:limit]
+        )
+        if not events:
+            return []
+        for event in events:
+            event.attempts += 1
+            event.available_at = now + lease
+        models.OutboxEvent.objects.bulk_update(events, ["attempts", "available_at"])
+
+    # Everything the nested UserTripSerializer reads, in one trip query for the batch.
+    trips = models.Trip.objects.with_financials().select_related("place__cover_photo")
+    return list(
+        models.OutboxEvent.objects.filter(pk__in=[event.pk for event in events])
+        .select_related("user_trip__traveler")
+        .prefetch_related(Prefetch("user_trip__trip", queryset=trips))
+        .order_by("created_at")
+    )
+
+
+def acknowledge(event_ids: Iterable) -> int:
+    """Mark events as delivered. Returns the number of events newly acknowledged."""
+    return models.OutboxEvent.objects.filter(pk__in=list(event_ids), acknowledged_at__isnull=True).update(
+        acknowledged_at=timezone.now(),
+    )
@@ -0,0 +1,69 @@
+"""Pagination classes for API endpoints."""
+from __future__ import annotations
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .authentication import BotUser
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination ordered by the view's ``cursor_ordering`` key.
+
+    The user-supplied ``ordering`` parameter is ignored so the cursor always walks
+    a stable, indexed key. Orderings end with the primary key so rows sharing the
+    leading key keep a fixed order and are neither skipped nor repeated across pages.
+    """
+
+    ordering = ("-created_at", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, "get_cursor_ordering"):
+            ordering = view.get_cursor_ordering()
+        else:
+            ordering = getattr(view, "cursor_ordering", self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Cursor mode is used for delta-sync requests, when the request carries
+    ``cursor``, asks for ``pagination=cursor``, or comes from a bot token (unless
+    it asks for ``pagination=page``). It skips the ``COUNT(*)`` query, and deep pages cost
+    the same as the first one.
+    """
+
+    mode_query_param = "pagination"
+
+    def __init__(self):
+        self.cursor_paginator: KeysetCursorPagination | None = None
+
+    def use_cursor(self, request, view=None) -> bool:
+        if view is not None and getattr(view, "is_delta_sync", lambda: False)():
+            return True
+        mode = request.query_params.get(self.mode_query_param)
+        if mode == "page":
+            return False
+        if mode == "cursor" or KeysetCursorPagination.cursor_query_param in request.query_params:
+            return True
+        return isinstance(request.user, BotUser)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request, view):
+            self.cursor_paginator = KeysetCursorPagination()
+            self.cursor_paginator.page_size = self.page_size
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
@@ -50,3 +50,15 @@ class IsStaffOrBotReadOnly(BasePermission):
             return True
 
         return False
+
+
+class IsStaffOrBot(BasePermission):
+    """Allow only staff users and authenticated bots, for any method."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if getattr(user, "is_staff", False):
+            return True
+        return user.__class__.__name__ == "BotUser" and bool(request.auth)
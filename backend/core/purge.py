@@ -0,0 +1,227 @@
+"""Background execution of media purge jobs."""
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import media, models
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+
+# Jobs run one at a time per process; each job fans file deletions out to its own pool.
+_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-purge")
+
+
+@dataclass
+class _Target:
+    path: str
+    user_trip_ids: List[object] = field(default_factory=list)
+    place_photo_id: Optional[object] = None
+    # Payment proofs are content-addressed; a blob also used outside the job is only dereferenced.
+    shared: bool = False
+    size: int = 0
+    deleted: bool = False
+    missing: bool = False
+
+
+def enqueue_purge_job(job: models.FilePurgeJob) -> None:
+    """Start the job in the background once the creating transaction commits."""
+    transaction.on_commit(lambda: _job_executor.submit(_run_in_worker, job.pk))
+
+
+def _run_in_worker(job_id) -> None:
+    close_old_connections()
+    try:
+        run_purge_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_purge_job(job_id) -> None:
+    """Execute a purge job, recording progress on the job row as batches finish.
+
+    Every progress update also touches ``updated_at``, which ``fail_stale_jobs``
+    reads as the job's heartbeat.
+    """
+    try:
+        now = timezone.now()
+        claimed = models.FilePurgeJob.objects.filter(pk=job_id, status=models.FilePurgeJob.STATUS_PENDING).update(
+            status=models.FilePurgeJob.STATUS_RUNNING,
+            started_at=now,
+            updated_at=now,
+        )
+        if not claimed:
+            return  # already run, or failed as stale while it waited
+        job = models.FilePurgeJob.objects.select_related("trip__place").get(pk=job_id)
+        targets = _collect_targets(job)
+        models.FilePurgeJob.objects.filter(pk=job.pk).update(total_files=len(targets), updated_at=timezone.now())
+
+        workers = getattr(settings, "FILE_PURGE_WORKERS", 8)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-unlink") as pool:
+            for start in range(0, len(targets), BATCH_SIZE):
+                batch = targets[start:start + BATCH_SIZE]
+                # Payment proofs are unlinked in _apply_batch, under their manifest row locks.
+                list(pool.map(_unlink, [target for target in batch if not _content_addressed(target)]))
+                _apply_batch(job, batch)
+
+        now = timezone.now()
+        models.FilePurgeJob.objects.filter(pk=job.pk).update(
+            status=models.FilePurgeJob.STATUS_COMPLETED,
+            finished_at=now,
+            updated_at=now,
+        )
+    except Exception as exc:
+        logger.exception("File purge job %s failed", job_id)
+        now = timezone.now()
+        models.FilePurgeJob.objects.filter(pk=job_id).update(
+            status=models.FilePurgeJob.STATUS_FAILED,
+            error=str(exc) or exc.__class__.__name__,
+            finished_at=now,
+            updated_at=now,
+        )
+
+
+def fail_stale_jobs(queryset=None) -> int:
+    """Fail pending or running jobs that stopped reporting progress; returns how many.
+
+    Jobs run on a thread of the process that created them, so a restarted or killed
+    worker leaves them unfinished. They are failed rather than resumed: a bulk purge
+    picks its files when it starts, and re-running it would delete a different set.
+    Pending jobs may legitimately queue behind a long job, so they only count as
+    stale while no job anywhere is making progress.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "FILE_PURGE_STALE_SECONDS", 600))
+    jobs = models.FilePurgeJob.objects.all() if queryset is None else queryset
+    stale = Q(status=models.FilePurgeJob.STATUS_RUNNING, updated_at__lt=cutoff)
+    progressing = models.FilePurgeJob.objects.filter(
+        status=models.FilePurgeJob.STATUS_RUNNING, updated_at__gte=cutoff
+    ).exists()
+    if not progressing:
+        stale |= Q(status=models.FilePurgeJob.STATUS_PENDING, updated_at__lt=cutoff)
+    now = timezone.now()
+    return jobs.filter(stale).update(
+        status=models.FilePurgeJob.STATUS_FAILED,
+        error="Interrupted: the worker running this job stopped. Start a new purge.",
+        finished_at=now,
+        updated_at=now,
+    )
+
+
+def _collect_targets(job: models.FilePurgeJob) -> List[_Target]:
+    if job.kind == models.FilePurgeJob.KIND_BULK:
+        # Variants are removed along with their photo; deleting them alone would break its URLs.
+        paths = (
+            models.StoredFile.objects.exclude(kind=models.StoredFile.KIND_PHOTO_VARIANT)
+            .order_by("mtime")
+            .values_list("path", flat=True)
+        )
+        return [_Target(path=path) for path in paths[: job.requested_count or 0]]
+
+    if job.trip is None:
+        return []
+    proofs = defaultdict(list)
+    for pk, name in job.trip.user_trips.exclude(payment_proof="").values_list("pk", "payment_proof"):
+        proofs[name].append(pk)
+    # Whether a proof is shared with other trips is decided under lock in _apply_batch.
+    targets = [_Target(path=name, user_trip_ids=pks) for name, pks in proofs.items()]
+    targets.extend(
+        _Target(path=name, place_photo_id=pk)
+        for pk, name in models.PlacePhoto.objects.filter(place_id=job.trip.place_id).values_list("pk", "image")
+    )
+    return targets
+
+
+def _content_addressed(target: _Target) -> bool:
+    return media.kind_for_path(target.path) == models.StoredFile.KIND_PAYMENT_PROOF
+
+
+def _unlink_content_addressed(batch: List[_Target]) -> None:
+    """Unlink payment proof blobs while holding their manifest rows; call inside a transaction.
+
+    An upload with the same content reuses the existing blob and then takes the same
+    row lock in ``media.record_file``, so ``ref_count`` re-read here counts every
+    reference added since the job collected its targets.
+    """
+    targets = {target.path: target for target in batch if _content_addressed(target)}
+    if not targets:
+        return
+    ref_counts = dict(
+        models.StoredFile.objects.select_for_update()
+        .filter(path__in=list(targets))
+        .order_by("path")
+        .values_list("path", "ref_count")
+    )
+    for path, target in targets.items():
+        if target.user_trip_ids:
+            target.shared = ref_counts.get(path, 0) > len(target.user_trip_ids)
+        _unlink(target)
+
+
+def _unlink(target: _Target) -> None:
+    if target.shared:
+        return
+    file_path = Path(settings.MEDIA_ROOT) / target.path
+    try:
+        size = file_path.stat().st_size
+        file_path.unlink()
+    except FileNotFoundError:
+        target.missing = True
+        return
+    except OSError as exc:
+        logger.warning("Unable to delete %s: %s", target.path, exc)
+        return
+    target.size = size
+    target.deleted = True
+
+
+def _apply_batch(job: models.FilePurgeJob, batch: Iterable[_Target]) -> None:
+    batch = list(batch)
+    with transaction.atomic():
+        _unlink_content_addressed(batch)
+        deleted = [target for target in batch if target.deleted]
+        shared = [target for target in batch if target.shared]
+        failed = [target for target in batch if not target.deleted and not target.missing and not target.shared]
+
+        # bulk_update skips auto_now, so set updated_at for delta sync clients.
+        now = timezone.now()
+        user_trips = [
+            models.UserTrip(pk=user_trip_id, payment_proof="", updated_at=now)
+            for target in deleted + shared
+            for user_trip_id in target.user_trip_ids
+        ]
+        if user_trips:
+            models.UserTrip.objects.bulk_update(user_trips, ["payment_proof", "updated_at"])
+        for target in shared:
+            models.StoredFile.objects.filter(path=target.path).update(
+                ref_count=F("ref_count") - len(target.user_trip_ids)
+            )
+
+        photo_ids = [target.place_photo_id for target in deleted if target.place_photo_id is not None]
+        if photo_ids:
+            models.PlacePhoto.objects.filter(pk__in=photo_ids).delete()
+
+        # Missing files are stale manifest entries; drop them along with the deleted ones.
+        stored_paths = [target.path for target in batch if target.deleted or target.missing]
+        if stored_paths:
+            models.StoredFile.objects.filter(path__in=stored_paths).delete()
+
+        models.FilePurgeJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now(),
+            processed_count=F("processed_count") + len(batch),
+            deleted_count=F("deleted_count") + len(deleted),
+            deleted_size=F("deleted_size") + sum(target.size for target in deleted),
+            failed_count=F("failed_count") + len(failed),
+        )
+
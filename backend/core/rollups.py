@@ -0,0 +1,149 @@
+"""Maintenance helpers for the daily finance rollup table."""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import models
+
+RollupKey = Tuple[date, UUID]
+
+ZERO = Decimal("0.00")
+
+
+def local_day(value: Optional[datetime]) -> Optional[date]:
+    """Return the calendar day of ``value`` in the current time zone."""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def user_trip_keys(trip_id, confirmed_at, created_at) -> Set[RollupKey]:
+    """Buckets a registration contributes to (income by confirmation, outstanding by creation)."""
+    keys: Set[RollupKey] = set()
+    if trip_id is None:
+        return keys
+    for value in (confirmed_at, created_at):
+        day = local_day(value)
+        if day is not None:
+            keys.add((day, trip_id))
+    return keys
+
+
+def expense_keys(trip_id, incurred_at) -> Set[RollupKey]:
+    """Bucket an expense contributes to."""
+    if trip_id is None or incurred_at is None:
+        return set()
+    return {(incurred_at, trip_id)}
+
+
+def schedule_refresh(keys: Iterable[RollupKey]) -> None:
+    """Recompute the given buckets once the current transaction commits."""
+    keys = set(keys)
+    if keys:
+        transaction.on_commit(lambda: refresh_daily_rollups(keys))
+
+
+def refresh_daily_rollups(keys: Iterable[RollupKey]) -> None:
+    """Recompute rollup rows for the given (date, trip) buckets from the fact tables."""
+    for day, trip_id in keys:
+        _refresh_bucket(day, trip_id)
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Return the [start, end) datetimes of ``day`` in the current time zone.
+
+    Filtering on a datetime range keeps the ``confirmed_at``/``created_at`` indexes
+    usable, unlike ``__date`` lookups which wrap the column in a cast.
+    """
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    if settings.USE_TZ:
+        zone = timezone.get_current_timezone()
+        return timezone.make_aware(start, zone), timezone.make_aware(end, zone)
+    return start, end
+
+
+def _refresh_bucket(day: date, trip_id: UUID) -> None:
+    start, end = day_bounds(day)
+    income = models.UserTrip.objects.filter(
+        trip_id=trip_id,
+        status=models.UserTrip.STATUS_CONFIRMED,
+        confirmed_at__gte=start,
+        confirmed_at__lt=end,
+    ).aggregate(total=Sum("paid_amount"), count=Count("pk"))
+    expenses = models.Expense.objects.filter(trip_id=trip_id, incurred_at=day).aggregate(total=Sum("amount"))
+    outstanding = models.UserTrip.objects.filter(
+        trip_id=trip_id,
+        payment_status=models.UserTrip.PAYMENT_PENDING,
+        created_at__gte=start,
+        created_at__lt=end,
+    ).aggregate(total=Sum("quoted_price"))
+
+    values = {
+        "income": income["total"] or ZERO,
+        "expenses": expenses["total"] or ZERO,
+        "confirmations": income["count"] or 0,
+        "outstanding": outstanding["total"] or ZERO,
+    }
+
+    if not any(values.values()):
+        models.DailyFinanceRollup.objects.filter(date=day, trip_id=trip_id).delete()
+        return
+    models.DailyFinanceRollup.objects.update_or_create(date=day, trip_id=trip_id, defaults=values)
+
+
+def rebuild_daily_rollups() -> int:
+    """Rebuild the whole rollup table from scratch. Returns the number of rows written."""
+    buckets: Dict[RollupKey, Dict[str, object]] = defaultdict(
+        lambda: {"income": ZERO, "expenses": ZERO, "confirmations": 0, "outstanding": ZERO}
+    )
+
+    income_rows = (
+        models.UserTrip.objects.filter(
+            status=models.UserTrip.STATUS_CONFIRMED,
+            confirmed_at__isnull=False,
+        )
+        .annotate(day=TruncDate("confirmed_at"))
+        .values("day", "trip_id")
+        .annotate(total=Sum("paid_amount"), count=Count("pk"))
+        .order_by()
+    )
+    for row in income_rows:
+        bucket = buckets[(row["day"], row["trip_id"])]
+        bucket["income"] = row["total"] or ZERO
+        bucket["confirmations"] = row["count"]
+
+    expense_rows = models.Expense.objects.values("incurred_at", "trip_id").annotate(total=Sum("amount")).order_by()
+    for row in expense_rows:
+        buckets[(row["incurred_at"], row["trip_id"])]["expenses"] = row["total"] or ZERO
+
+    outstanding_rows = (
+        models.UserTrip.objects.filter(payment_status=models.UserTrip.PAYMENT_PENDING)
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "trip_id")
+        .annotate(total=Sum("quoted_price"))
+        .order_by()
+    )
+    for row in outstanding_rows:
+        buckets[(row["day"], row["trip_id"])]["outstanding"] = row["total"] or ZERO
+
+    rollups = [
+        models.DailyFinanceRollup(date=day, trip_id=trip_id, **values)
+        for (day, trip_id), values in buckets.items()
+    ]
+    with transaction.atomic():
+        models.DailyFinanceRollup.objects.all().delete()
+        models.DailyFinanceRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
@@ -3,13 +3,16 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 
-from . import models
+from . import images, models, outbox, telegram_files
+from .fieldsets import SparseFieldsMixin
 
 
-class TravelerSerializer(serializers.ModelSerializer):
+class TravelerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Traveler
         fields = [
@@ -25,21 +28,55 @@ class TravelerSerializer(serializers.ModelSerializer):
         ]
 
 
-class BotTokenSerializer(serializers.ModelSerializer):
+class BotTokenSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.BotToken
         fields = ["id", "name", "token", "is_active", "created_at", "updated_at"]
         read_only_fields = ["created_at", "updated_at"]
 
 
-class PlacePhotoSerializer(serializers.ModelSerializer):
+class PlacePhotoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = models.PlacePhoto
-        fields = ["id", "place", "image", "caption", "created_at"]
+        fields = ["id", "place", "image", "variants", "caption", "created_at"]
         read_only_fields = ["id", "created_at"]
 
+    def get_variants(self, obj):
+        """Resized copies as ``{name: {"width", "height", "webp", "jpeg"}}`` with URLs.
+
+        Empty until the background worker has rendered them; clients fall back to ``image``.
+        """
+        request = self.context.get("request")
+        storage = obj.image.storage
+        variants = {}
+        for name, entry in (obj.variants or {}).items():
+            variant = {"width": entry.get("width"), "height": entry.get("height")}
+            for format_key in images.FORMATS:
+                if entry.get(format_key):
+                    url = storage.url(entry[format_key])
+                    variant[format_key] = request.build_absolute_uri(url) if request else url
+            variants[name] = variant
+        return variants
+
+
+class PlacePhotoSummarySerializer(PlacePhotoSerializer):
+    class Meta(PlacePhotoSerializer.Meta):
+        fields = ["id", "image", "variants"]
+
+
+class PlaceSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Place as embedded in list payloads: the cover photo instead of the whole gallery."""
 
-class PlaceSerializer(serializers.ModelSerializer):
+    cover_photo = PlacePhotoSummarySerializer(read_only=True)
+
+    class Meta:
+        model = models.Place
+        fields = ["id", "name", "latitude", "longitude", "rating", "cover_photo"]
+
+
+class PlaceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     photos = PlacePhotoSerializer(many=True, read_only=True)
 
     class Meta:
@@ -54,10 +91,16 @@ class PlaceSerializer(serializers.ModelSerializer):
             "created_by",
             "created_at",
             "updated_at",
+            "cover_photo",
             "photos",
         ]
         read_only_fields = ["created_by", "created_at", "updated_at"]
 
+    def validate_cover_photo(self, photo):
+        if photo is not None and (self.instance is None or photo.place_id != self.instance.pk):
+            raise serializers.ValidationError("Cover photo must be one of this place's photos.")
+        return photo
+
     def create(self, validated_data):
         request = self.context.get("request")
         if request and request.user and request.user.is_authenticated:
@@ -65,13 +108,35 @@ class PlaceSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TripSerializer(serializers.ModelSerializer):
+class ChatIdField(serializers.IntegerField):
+    """Telegram chat id; blank strings from forms clear the value."""
+
+    default_error_messages = {
+        "invalid": "Group chat ID must be a numeric identifier like -1001234567890.",
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("allow_null", True)
+        kwargs.setdefault("required", False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and not data.strip():
+            return None
+        return super().to_internal_value(data.strip() if isinstance(data, str) else data)
+
+
+class TripSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     place_detail = PlaceSerializer(source="place", read_only=True)
     participants_count = serializers.SerializerMethodField()
     total_income = serializers.SerializerMethodField()
     total_expenses = serializers.SerializerMethodField()
     net_income = serializers.SerializerMethodField()
     is_registration_open = serializers.ReadOnlyField()
+    group_chat_id = ChatIdField()
+
+    # Backed by ``TripQuerySet.with_financials``; views annotate only when these are requested.
+    financial_fields = ("participants_count", "total_income", "total_expenses", "net_income")
 
     class Meta:
         model = models.Trip
@@ -103,23 +168,25 @@ class TripSerializer(serializers.ModelSerializer):
         ]
 
     def get_participants_count(self, obj: models.Trip) -> int:
-        return obj.participants_count()
+        count = getattr(obj, "confirmed_count", None)
+        return obj.participants_count() if count is None else count
 
     def get_total_income(self, obj: models.Trip) -> Decimal:
-        return obj.total_income()
+        income = getattr(obj, "income_sum", None)
+        return obj.total_income() if income is None else income
 
     def get_total_expenses(self, obj: models.Trip) -> Decimal:
-        return obj.total_expenses()
+        expenses = getattr(obj, "expenses_sum", None)
+        return obj.total_expenses() if expenses is None else expenses
 
     def get_net_income(self, obj: models.Trip) -> Decimal:
-        return obj.total_income() - obj.total_expenses()
+        return self.get_total_income(obj) - self.get_total_expenses(obj)
 
     def validate(self, attrs):
         registration_start = attrs.get("registration_start", getattr(self.instance, "registration_start", None))
         registration_end = attrs.get("registration_end", getattr(self.instance, "registration_end", None))
         trip_start = attrs.get("trip_start", getattr(self.instance, "trip_start", None))
         trip_end = attrs.get("trip_end", getattr(self.instance, "trip_end", None))
-        group_chat_id = attrs.get("group_chat_id", getattr(self.instance, "group_chat_id", ""))
         group_invite_link = attrs.get("group_invite_link", getattr(self.instance, "group_invite_link", ""))
 
         if registration_start and registration_end and registration_start > registration_end:
@@ -129,14 +196,6 @@ class TripSerializer(serializers.ModelSerializer):
         if registration_end and trip_start and registration_end > trip_start:
             raise serializers.ValidationError("Registration must end before trip starts.")
 
-        group_chat_id = (group_chat_id or "").strip()
-        if group_chat_id:
-            try:
-                int(group_chat_id)
-            except (TypeError, ValueError):
-                raise serializers.ValidationError(
-                    {"group_chat_id": "Group chat ID must be a numeric identifier like -1001234567890."}
-                )
         group_invite_link = (group_invite_link or "").strip()
         if group_invite_link and not group_invite_link.startswith("http"):
             raise serializers.ValidationError({"group_invite_link": "Invite link must be a valid URL."})
@@ -144,27 +203,37 @@ class TripSerializer(serializers.ModelSerializer):
 
 
 class TripListSerializer(TripSerializer):
-    class Meta(TripSerializer.Meta):
+    """Trip for list payloads; the place is summarized unless ``?expand=place`` asks for it in full."""
+
+    place_detail = PlaceSummarySerializer(source="place", read_only=True)
+    expandable_fields = {"place": ("place_detail", lambda: PlaceSerializer(source="place", read_only=True))}
+
+
+class BotTripSummarySerializer(TripListSerializer):
+    """What the bot shows while registering for a trip; no aggregates or group details."""
+
+    class Meta(TripListSerializer.Meta):
         fields = [
             "id",
-            "title",
             "place",
             "place_detail",
-            "trip_start",
-            "trip_end",
+            "title",
+            "description",
             "registration_start",
             "registration_end",
+            "trip_start",
+            "trip_end",
             "default_price",
             "max_capacity",
             "status",
-            "participants_count",
+            "bonus_message",
             "is_registration_open",
         ]
 
 
-class UserTripSerializer(serializers.ModelSerializer):
+class UserTripSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     traveler_detail = TravelerSerializer(source="traveler", read_only=True)
-    trip_detail = TripSerializer(source="trip", read_only=True)
+    trip_detail = TripListSerializer(source="trip", read_only=True)
 
     class Meta:
         model = models.UserTrip
@@ -181,6 +250,9 @@ class UserTripSerializer(serializers.ModelSerializer):
             "payment_note",
             "payment_proof",
             "payment_proof_uploaded_at",
+            "payment_proof_file_id",
+            "payment_proof_file_unique_id",
+            "payment_proof_fetch_error",
             "custom_bonus_message",
             "admin_comment",
             "confirmed_by",
@@ -192,6 +264,7 @@ class UserTripSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             "payment_proof_uploaded_at",
+            "payment_proof_fetch_error",
             "confirmed_by",
             "confirmed_at",
             "group_joined_at",
@@ -200,28 +273,81 @@ class UserTripSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def validate_payment_proof(self, value):
+        max_size = getattr(settings, "PAYMENT_PROOF_MAX_SIZE", None)
+        if value and max_size and value.size > max_size:
+            raise serializers.ValidationError(
+                f"Payment proof must be at most {max_size // (1024 * 1024)} MB."
+            )
+        return value
+
     def _set_payment_proof_timestamp(self, instance, validated_data):
         if validated_data.get("payment_proof"):
             validated_data["payment_proof_uploaded_at"] = timezone.now()
 
+    def _needs_proof_fetch(self, instance, validated_data) -> bool:
+        """True when a new Telegram file reference arrives without the file itself."""
+        file_id = validated_data.get("payment_proof_file_id")
+        if not file_id or validated_data.get("payment_proof"):
+            return False
+        return instance is None or file_id != instance.payment_proof_file_id
+
+    def _reuse_stored_proof(self, validated_data) -> bool:
+        """Point at an already stored copy of the same Telegram file instead of fetching it."""
+        stored_name = telegram_files.find_stored_proof(validated_data.get("payment_proof_file_unique_id", ""))
+        if not stored_name:
+            return False
+        validated_data["payment_proof"] = stored_name
+        validated_data["payment_proof_fetch_error"] = ""
+        return True
+
     def create(self, validated_data):
+        fetch_proof = self._needs_proof_fetch(None, validated_data) and not self._reuse_stored_proof(validated_data)
         self._set_payment_proof_timestamp(None, validated_data)
-        return super().create(validated_data)
+        instance = super().create(validated_data)
+        if fetch_proof:
+            telegram_files.enqueue_payment_proof_fetch(instance)
+        return instance
 
     def update(self, instance, validated_data):
         request = self.context.get("request")
         if "paid_amount" in validated_data and validated_data["paid_amount"] < Decimal("0.00"):
             raise serializers.ValidationError({"paid_amount": "Cannot be negative."})
 
+        fetch_proof = self._needs_proof_fetch(instance, validated_data) and not self._reuse_stored_proof(
+            validated_data
+        )
         self._set_payment_proof_timestamp(instance, validated_data)
         if request and request.user.is_authenticated:
             if "payment_status" in validated_data and validated_data["payment_status"] == models.UserTrip.PAYMENT_CONFIRMED:
                 validated_data["confirmed_by"] = request.user
                 validated_data["confirmed_at"] = timezone.now()
-        return super().update(instance, validated_data)
-
 
-class ExpenseSerializer(serializers.ModelSerializer):
+        if fetch_proof:
+            # The fetched file replaces the current proof once it arrives.
+            validated_data["payment_proof"] = None
+            validated_data["payment_proof_uploaded_at"] = None
+            validated_data["payment_proof_fetch_error"] = ""
+            validated_data["payment_proof_fetch_started_at"] = None
+
+        was_confirmed = self._is_fully_confirmed(instance)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if not was_confirmed and self._is_fully_confirmed(instance):
+                outbox.record_payment_confirmed(instance)
+            if fetch_proof:
+                telegram_files.enqueue_payment_proof_fetch(instance)
+        return instance
+
+    @staticmethod
+    def _is_fully_confirmed(user_trip) -> bool:
+        return (
+            user_trip.payment_status == models.UserTrip.PAYMENT_CONFIRMED
+            and user_trip.status == models.UserTrip.STATUS_CONFIRMED
+        )
+
+
+class ExpenseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Expense
         fields = [
@@ -244,7 +370,7 @@ class ExpenseSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TripAnnouncementSerializer(serializers.ModelSerializer):
+class TripAnnouncementSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.TripAnnouncement
         fields = [
@@ -267,7 +393,44 @@ class TripAnnouncementSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class SettingsSerializer(serializers.ModelSerializer):
+class FilePurgeJobSerializer(serializers.ModelSerializer):
+    deleted_size_mb = serializers.SerializerMethodField()
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.FilePurgeJob
+        fields = [
+            "id",
+            "kind",
+            "trip",
+            "requested_count",
+            "status",
+            "total_files",
+            "processed_count",
+            "deleted_count",
+            "deleted_size",
+            "deleted_size_mb",
+            "failed_count",
+            "progress",
+            "error",
+            "started_at",
+            "finished_at",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+    def get_deleted_size_mb(self, obj: models.FilePurgeJob) -> float:
+        return round(obj.deleted_size / (1024 * 1024), 2)
+
+    def get_progress(self, obj: models.FilePurgeJob) -> float:
+        if obj.status == models.FilePurgeJob.STATUS_COMPLETED:
+            return 1.0
+        if not obj.total_files:
+            return 0.0
+        return round(obj.processed_count / obj.total_files, 4)
+
+
+class SettingsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Settings
         fields = [
@@ -278,3 +441,12 @@ class SettingsSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+
+
+class OutboxEventSerializer(serializers.ModelSerializer):
+    user_trip = UserTripSerializer(read_only=True)
+
+    class Meta:
+        model = models.OutboxEvent
+        fields = ["id", "event_type", "payload", "attempts", "user_trip", "created_at"]
+        read_only_fields = fields
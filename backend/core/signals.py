@@ -0,0 +1,139 @@
+"""Signal receivers for the core app."""
+from __future__ import annotations
+
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import images, media, models, rollups
+from .authentication import bot_token_cache
+
+USER_TRIP_ROLLUP_FIELDS = {
+    "trip",
+    "status",
+    "payment_status",
+    "paid_amount",
+    "quoted_price",
+    "confirmed_at",
+}
+
+
+def _user_trip_keys(instance: models.UserTrip):
+    return rollups.user_trip_keys(instance.trip_id, instance.confirmed_at, instance.created_at)
+
+
+def _expense_keys(instance: models.Expense):
+    return rollups.expense_keys(instance.trip_id, instance.incurred_at)
+
+
+@receiver(post_init, sender=models.UserTrip)
+def remember_user_trip_rollup_keys(sender, instance, **kwargs):
+    instance._rollup_keys = _user_trip_keys(instance)
+
+
+@receiver(post_save, sender=models.UserTrip)
+def refresh_user_trip_rollups(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not USER_TRIP_ROLLUP_FIELDS.intersection(update_fields):
+        return
+    keys = _user_trip_keys(instance)
+    rollups.schedule_refresh(keys | getattr(instance, "_rollup_keys", set()))
+    instance._rollup_keys = keys
+
+
+@receiver(post_delete, sender=models.UserTrip)
+def refresh_deleted_user_trip_rollups(sender, instance, **kwargs):
+    rollups.schedule_refresh(_user_trip_keys(instance) | getattr(instance, "_rollup_keys", set()))
+
+
+@receiver(post_init, sender=models.Expense)
+def remember_expense_rollup_keys(sender, instance, **kwargs):
+    instance._rollup_keys = _expense_keys(instance)
+
+
+@receiver(post_save, sender=models.Expense)
+def refresh_expense_rollups(sender, instance, created, **kwargs):
+    keys = _expense_keys(instance)
+    rollups.schedule_refresh(keys | getattr(instance, "_rollup_keys", set()))
+    instance._rollup_keys = keys
+
+
+@receiver(post_delete, sender=models.Expense)
+def refresh_deleted_expense_rollups(sender, instance, **kwargs):
+    rollups.schedule_refresh(_expense_keys(instance) | getattr(instance, "_rollup_keys", set()))
+
+
+@receiver(post_save, sender=models.BotToken)
+@receiver(post_delete, sender=models.BotToken)
+def invalidate_bot_token_cache(sender, instance, **kwargs):
+    bot_token_cache.invalidate()
+
+
+@receiver(post_init, sender=models.UserTrip)
+def remember_payment_proof_name(sender, instance, **kwargs):
+    instance._stored_payment_proof = instance.payment_proof.name or ""
+
+
+@receiver(post_save, sender=models.UserTrip)
+def sync_payment_proof_manifest(sender, instance, created, **kwargs):
+    name = instance.payment_proof.name or ""
+    previous = getattr(instance, "_stored_payment_proof", "")
+    if name == previous and not created:
+        return
+    if previous and not created:
+        media.release_file(previous)
+    if name:
+        media.record_file(name, user_trip=instance)
+    instance._stored_payment_proof = name
+
+
+@receiver(post_delete, sender=models.UserTrip)
+def release_deleted_payment_proof(sender, instance, **kwargs):
+    media.release_file(instance.payment_proof.name or "")
+
+
+@receiver(post_init, sender=models.PlacePhoto)
+def remember_place_photo_name(sender, instance, **kwargs):
+    instance._stored_image = instance.image.name or ""
+
+
+@receiver(post_save, sender=models.PlacePhoto)
+def sync_place_photo_manifest(sender, instance, created, **kwargs):
+    name = instance.image.name or ""
+    previous = getattr(instance, "_stored_image", "")
+    if name == previous and not created:
+        return
+    if previous and not created:
+        media.release_file(previous)
+    if name:
+        media.record_file(name, place_photo=instance)
+        images.enqueue_variants(instance)
+    instance._stored_image = name
+
+
+@receiver(post_save, sender=models.PlacePhoto)
+def assign_place_cover_photo(sender, instance, created, **kwargs):
+    if created:
+        models.Place.objects.filter(pk=instance.place_id, cover_photo__isnull=True).update(cover_photo=instance)
+
+
+@receiver(post_delete, sender=models.PlacePhoto)
+def replace_deleted_cover_photo(sender, instance, **kwargs):
+    # The foreign key was already nulled on delete; fall back to the oldest remaining photo,
+    # matching the first-upload-wins rule above.
+    oldest = models.PlacePhoto.objects.filter(place_id=OuterRef("pk")).order_by("created_at").values("pk")[:1]
+    models.Place.objects.filter(pk=instance.place_id, cover_photo__isnull=True).update(
+        cover_photo=Subquery(oldest)
+    )
+
+
+@receiver(post_delete, sender=models.PlacePhoto)
+def release_deleted_place_photo(sender, instance, **kwargs):
+    media.release_file(instance.image.name or "")
+    images.delete_variants(instance.variants)
+
+
+@receiver(post_delete, sender=models.Trip)
+@receiver(post_delete, sender=models.Traveler)
+@receiver(post_delete, sender=models.UserTrip)
+def record_tombstone(sender, instance, **kwargs):
+    models.DeletedRecord.objects.create(model_name=sender._meta.model_name, object_id=instance.pk)
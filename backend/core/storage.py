@@ -0,0 +1,70 @@
+"""Content-addressed file storage for payment proofs."""
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Store each distinct file once, named by the SHA-256 of its content.
+
+    The digest is computed while the upload is copied to a temporary file next to
+    its destination, so a file is read once. Saving bytes that are already stored
+    returns the existing name (``<dir>/<ab>/<sha256><ext>``). Deleting a shared blob
+    is the caller's responsibility, guarded by ``StoredFile.ref_count``; purges hold
+    the blob's manifest row, which ``media.record_file`` locks before counting a reuse.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content and is chosen in ``_save``.
+        return name
+
+    def _save(self, name, content):
+        directory, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        full_directory = self.path(directory)
+        self._makedirs(full_directory)
+
+        temporary_path = os.path.join(full_directory, f".upload-{uuid.uuid4().hex}")
+        digest = hashlib.sha256()
+        try:
+            fd = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+            with os.fdopen(fd, "wb") as handle:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    handle.write(chunk)
+
+            hexdigest = digest.hexdigest()
+            stored_name = posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+            stored_path = self.path(stored_name)
+            if os.path.exists(stored_path):
+                os.unlink(temporary_path)
+            else:
+                self._makedirs(os.path.dirname(stored_path))
+                os.replace(temporary_path, stored_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(stored_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+            raise
+        return stored_name
+
+    def _makedirs(self, path: str) -> None:
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(path, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(path, exist_ok=True)
+
+
+payment_proof_storage = ContentAddressedStorage()
@@ -0,0 +1,205 @@
+"""Background download of payment proofs referenced by Telegram ``file_id``."""
+from __future__ import annotations
+
+import logging
+import posixpath
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import IO, Protocol
+
+import httpx
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PAYMENT_PROOF_FETCH_WORKERS", 2),
+    thread_name_prefix="proof-fetch",
+)
+
+
+class FetchError(RuntimeError):
+    """Raised when a Telegram file cannot be downloaded."""
+
+
+@dataclass
+class FetchedFile:
+    filename: str
+    file: IO[bytes]
+
+
+class PaymentProofFetcher(Protocol):
+    def fetch(self, file_id: str) -> FetchedFile:
+        """Download ``file_id`` into a temporary file the caller closes."""
+
+
+class TelegramBotAPIFetcher:
+    """Fetch files through the Telegram Bot API (``getFile`` plus the file endpoint).
+
+    ``TELEGRAM_API_BASE`` can point at a local Bot API server or a test stub.
+    """
+
+    def __init__(self, *, token: str | None = None, api_base: str | None = None, max_size: int | None = None):
+        self.token = token if token is not None else getattr(settings, "TELEGRAM_BOT_TOKEN", "")
+        api_base = api_base or getattr(settings, "TELEGRAM_API_BASE", "https://api.telegram.org")
+        self.api_base = api_base.rstrip("/")
+        self.max_size = max_size if max_size is not None else getattr(settings, "PAYMENT_PROOF_MAX_SIZE", None)
+        self.timeout = getattr(settings, "PAYMENT_PROOF_FETCH_TIMEOUT", 60)
+
+    def fetch(self, file_id: str) -> FetchedFile:
+        if not self.token:
+            raise FetchError("TELEGRAM_BOT_TOKEN is not configured.")
+        with httpx.Client(timeout=self.timeout) as client:
+            response = client.get(f"{self.api_base}/bot{self.token}/getFile", params={"file_id": file_id})
+            is_json = response.headers.get("content-type", "").startswith("application/json")
+            payload = response.json() if is_json else {}
+            if response.status_code != 200 or not payload.get("ok"):
+                raise FetchError(payload.get("description") or f"getFile failed with status {response.status_code}")
+            result = payload["result"]
+            file_path = result.get("file_path")
+            if not file_path:
+                raise FetchError("Telegram did not return a file path.")
+            if self.max_size and (result.get("file_size") or 0) > self.max_size:
+                raise FetchError(f"File is larger than {self.max_size} bytes.")
+
+            # Spools to disk past 1 MB so large proofs never sit fully in memory.
+            target = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+            try:
+                with client.stream("GET", f"{self.api_base}/file/bot{self.token}/{file_path}") as download:
+                    if download.status_code != 200:
+                        raise FetchError(f"File download failed with status {download.status_code}")
+                    received = 0
+                    for chunk in download.iter_bytes(CHUNK_SIZE):
+                        received += len(chunk)
+                        if self.max_size and received > self.max_size:
+                            raise FetchError(f"File is larger than {self.max_size} bytes.")
+                        target.write(chunk)
+            except Exception:
+                target.close()
+                raise
+            target.seek(0)
+            return FetchedFile(filename=posixpath.basename(file_path), file=target)
+
+
+def get_fetcher() -> PaymentProofFetcher:
+    return import_string(getattr(settings, "PAYMENT_PROOF_FETCHER", "core.telegram_files.TelegramBotAPIFetcher"))()
+
+
+def find_stored_proof(file_unique_id: str) -> str:
+    """Return the stored proof already downloaded for this Telegram file, or an empty string.
+
+    ``file_unique_id`` is stable across bots and re-sends, so a traveler re-sending the
+    same screenshot is matched without downloading it again.
+    """
+    if not file_unique_id:
+        return ""
+    name = (
+        models.UserTrip.objects.filter(payment_proof_file_unique_id=file_unique_id)
+        .exclude(payment_proof="")
+        .values_list("payment_proof", flat=True)
+        .first()
+    )
+    if name and models.UserTrip._meta.get_field("payment_proof").storage.exists(name):
+        return name
+    return ""
+
+
+def enqueue_payment_proof_fetch(user_trip: models.UserTrip) -> None:
+    """Download the registration's proof in the background once the transaction commits."""
+    transaction.on_commit(lambda: _fetch_executor.submit(_run_in_worker, user_trip.pk))
+
+
+def _run_in_worker(user_trip_id) -> None:
+    close_old_connections()
+    try:
+        fetch_payment_proof(user_trip_id)
+    finally:
+        close_old_connections()
+
+
+def fetch_payment_proof(user_trip_id) -> bool:
+    """Download and attach a pending proof. Returns True if a file was stored.
+
+    The row is claimed first through a conditional update of
+    ``payment_proof_fetch_started_at``, so the background worker and the
+    ``fetch_payment_proofs`` command never download the same proof twice. A claim
+    older than ``PAYMENT_PROOF_FETCH_CLAIM_SECONDS`` is taken over.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, "PAYMENT_PROOF_FETCH_CLAIM_SECONDS", 300))
+    claimed = (
+        models.UserTrip.objects.filter(pk=user_trip_id, payment_proof="")
+        .exclude(payment_proof_file_id="")
+        .filter(Q(payment_proof_fetch_started_at__isnull=True) | Q(payment_proof_fetch_started_at__lt=cutoff))
+        .update(payment_proof_fetch_started_at=now)
+    )
+    if not claimed:
+        return False
+    try:
+        return _fetch_claimed(models.UserTrip.objects.get(pk=user_trip_id))
+    finally:
+        models.UserTrip.objects.filter(pk=user_trip_id, payment_proof_fetch_started_at=now).update(
+            payment_proof_fetch_started_at=None
+        )
+
+
+def _fetch_claimed(user_trip: models.UserTrip) -> bool:
+    fetched = None
+    stored_name = find_stored_proof(user_trip.payment_proof_file_unique_id)
+    if not stored_name:
+        try:
+            fetched = get_fetcher().fetch(user_trip.payment_proof_file_id)
+        except Exception as exc:
+            logger.warning("Unable to fetch payment proof for user trip %s: %s", user_trip.pk, exc)
+            models.UserTrip.objects.filter(
+                pk=user_trip.pk, payment_proof_file_id=user_trip.payment_proof_file_id
+            ).update(
+                payment_proof_fetch_error=str(exc) or exc.__class__.__name__,
+                updated_at=timezone.now(),
+            )
+            return False
+
+    try:
+        with transaction.atomic():
+            current = models.UserTrip.objects.select_for_update().filter(pk=user_trip.pk).first()
+            if (
+                current is None
+                or current.payment_proof
+                or current.payment_proof_file_id != user_trip.payment_proof_file_id
+            ):
+                return False  # deleted, or a newer proof was submitted during the download
+            if stored_name:
+                current.payment_proof.name = stored_name
+            else:
+                filename = _proof_filename(current, fetched.filename)
+                current.payment_proof.save(filename, File(fetched.file, name=filename), save=False)
+            return _attach_proof(current)
+    finally:
+        if fetched is not None:
+            fetched.file.close()
+
+
+def _attach_proof(user_trip: models.UserTrip) -> bool:
+    user_trip.payment_proof_uploaded_at = timezone.now()
+    user_trip.payment_proof_fetch_error = ""
+    user_trip.save(
+        update_fields=["payment_proof", "payment_proof_uploaded_at", "payment_proof_fetch_error", "updated_at"]
+    )
+    return True
+
+
+def _proof_filename(user_trip: models.UserTrip, remote_name: str) -> str:
+    extension = posixpath.splitext(remote_name)[1] or ".jpg"
+    stem = user_trip.payment_proof_file_unique_id or str(user_trip.pk)
+    return f"payment_{stem}{extension}"
@@ -0,0 +1,72 @@
+"""Tests for bot token authentication."""
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework import exceptions
+from rest_framework.test import APIRequestFactory
+
+from core import models, versioning
+from core.authentication import BotTokenAuthentication, bot_token_cache
+
+
+class BotTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        bot_token_cache.clear()
+        self.addCleanup(bot_token_cache.clear)
+        self.token = models.BotToken.objects.create(name="bot", token="secret-token")
+        self.auth = BotTokenAuthentication()
+        self.factory = APIRequestFactory()
+
+    def _authenticate(self, token_value):
+        request = self.factory.get("/api/trips/", HTTP_X_BOT_TOKEN=token_value)
+        return self.auth.authenticate(request)
+
+    def test_repeated_lookups_hit_the_cache(self):
+        self._authenticate("secret-token")
+        with self.assertNumQueries(0):
+            user, token = self._authenticate("secret-token")
+        self.assertEqual(token.pk, self.token.pk)
+        self.assertEqual(user.token.name, "bot")
+
+    def test_cache_does_not_store_raw_token(self):
+        self._authenticate("secret-token")
+        self.assertNotIn("secret-token", repr(bot_token_cache._entries))
+
+    def test_deactivation_invalidates_cache(self):
+        self._authenticate("secret-token")
+        self.token.is_active = False
+        self.token.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self._authenticate("secret-token")
+
+    def test_revocation_by_another_worker_invalidates_cache(self):
+        self._authenticate("secret-token")
+        # Another worker deactivates the token: only the shared version token changes here.
+        models.BotToken.objects.filter(pk=self.token.pk).update(is_active=False)
+        versioning.bump(bot_token_cache.VERSION_KEY)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self._authenticate("secret-token")
+
+    def test_revocation_during_lookup_is_not_cached_as_active(self):
+        original_get = models.BotToken.objects.get
+
+        def get_then_revoke(*args, **kwargs):
+            token = original_get(*args, **kwargs)
+            # Another worker revokes the token after this lookup but before it is cached.
+            models.BotToken.objects.filter(pk=token.pk).update(is_active=False)
+            versioning.bump(bot_token_cache.VERSION_KEY)
+            return token
+
+        with mock.patch.object(models.BotToken.objects, "get", side_effect=get_then_revoke):
+            self._authenticate("secret-token")
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self._authenticate("secret-token")
+
+    def test_invalid_tokens_are_negatively_cached(self):
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self._authenticate("bogus")
+        with self.assertNumQueries(0):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                self._authenticate("bogus")
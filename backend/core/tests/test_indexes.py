@@ -0,0 +1,96 @@
+"""EXPLAIN checks that hot query shapes are served by the dedicated indexes."""
+from __future__ import annotations
+
+import uuid
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core import models
+
+
+@skipUnless(connection.vendor == "sqlite", "plans are asserted against SQLite's planner")
+class QueryPlanTests(TestCase):
+    """Each test captures the plan for a query shape issued by the bot or the dashboard.
+
+    Plan choice is planner-specific (PostgreSQL may prefer a sequential scan on tables
+    this small), so the checks only run on SQLite, the database the test suite uses.
+    """
+
+    def _seed_registrations(self) -> None:
+        place = models.Place.objects.create(name="Place")
+        trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=0,
+        )
+        travelers = models.Traveler.objects.bulk_create(
+            models.Traveler(first_name=f"T{index}", phone_number="+1", telegram_id=str(index)) for index in range(200)
+        )
+        now = timezone.now()
+        user_trips = []
+        for index, traveler in enumerate(travelers):
+            confirmed = index % 2 == 0
+            status = models.UserTrip.STATUS_CONFIRMED if confirmed else models.UserTrip.STATUS_PENDING
+            user_trips.append(
+                models.UserTrip(
+                    trip=trip,
+                    traveler=traveler,
+                    status=status,
+                    payment_status=status,
+                    quoted_price=0,
+                    group_joined_at=now if confirmed and index > 10 else None,
+                )
+            )
+        models.UserTrip.objects.bulk_create(user_trips)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=f"Expected {index_name} in plan:\n{plan}")
+
+    def test_group_join_poll_uses_partial_index(self):
+        # telegram_bot.poller: confirmed registrations not yet in the group. Most confirmed
+        # rows have already joined, so the partial index stays tiny compared to the table.
+        self._seed_registrations()
+        queryset = models.UserTrip.objects.filter(
+            payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+            status=models.UserTrip.STATUS_CONFIRMED,
+            group_joined_at__isnull=True,
+        )
+        self.assertUsesIndex(queryset, "core_usertrip_awaiting_join")
+
+    def test_registrations_by_traveler_use_traveler_index(self):
+        # Bot "my registrations" and registration checks filter by traveler (and trip).
+        traveler_id = uuid.uuid4()
+        self.assertUsesIndex(models.UserTrip.objects.filter(traveler_id=traveler_id), "core_usertrip_traveler_trip")
+
+    def test_status_filters_use_composite_index(self):
+        queryset = models.UserTrip.objects.filter(
+            status=models.UserTrip.STATUS_PENDING,
+            payment_status=models.UserTrip.PAYMENT_PENDING,
+        )
+        self.assertUsesIndex(queryset, "core_usertrip_status_payment")
+
+    def test_confirmation_range_uses_confirmed_at_index(self):
+        # Dashboard income windows and rollup refreshes filter on a confirmed_at range.
+        start = timezone.now() - timedelta(days=30)
+        queryset = models.UserTrip.objects.filter(confirmed_at__gte=start, confirmed_at__lt=timezone.now())
+        self.assertUsesIndex(queryset, "core_usertrip_confirmed_at")
+
+    def test_creation_range_uses_created_at_index(self):
+        # Outstanding totals are bucketed by registration creation time.
+        start = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(models.UserTrip.objects.filter(created_at__gte=start), "core_usertrip_created_at")
+
+    def test_expense_range_uses_incurred_at_index(self):
+        queryset = models.Expense.objects.filter(incurred_at__gte=date(2024, 1, 1), incurred_at__lte=date(2024, 2, 1))
+        self.assertUsesIndex(queryset, "core_expense_incurred_at")
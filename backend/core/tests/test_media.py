@@ -0,0 +1,506 @@
+"""Tests for the stored file manifest."""
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from core import images, models, purge, telegram_files
+
+
+class StoredFileManifestTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=self.place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        self.traveler = models.Traveler.objects.create(first_name="John", phone_number="+1", telegram_id="1")
+
+    def _create_user_trip(self, content=b"proof-bytes"):
+        return models.UserTrip.objects.create(
+            trip=self.trip,
+            traveler=self.traveler,
+            quoted_price=Decimal("100.00"),
+            payment_proof=SimpleUploadedFile("proof.jpg", content),
+        )
+
+    def test_upload_records_manifest_entry(self):
+        user_trip = self._create_user_trip()
+        stored_file = models.StoredFile.objects.get()
+        self.assertEqual(stored_file.path, user_trip.payment_proof.name)
+        self.assertEqual(stored_file.kind, models.StoredFile.KIND_PAYMENT_PROOF)
+        self.assertEqual(stored_file.size, len(b"proof-bytes"))
+        self.assertEqual(stored_file.user_trip, user_trip)
+
+    @override_settings(PAYMENT_PROOF_MAX_SIZE=8)
+    def test_oversized_payment_proof_is_rejected(self):
+        response = self.client.post(
+            "/api/user-trips/",
+            {
+                "trip": str(self.trip.id),
+                "traveler": str(self.traveler.id),
+                "quoted_price": "100.00",
+                "payment_proof": SimpleUploadedFile("proof.pdf", b"0123456789"),
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("payment_proof", response.data)
+        self.assertFalse(models.StoredFile.objects.exists())
+
+    def test_removed_file_drops_manifest_entry(self):
+        user_trip = self._create_user_trip()
+        Path(user_trip.payment_proof.path).unlink()
+        user_trip.payment_proof = None
+        user_trip.save()
+        self.assertFalse(models.StoredFile.objects.exists())
+
+    def test_stats_and_bulk_delete_use_manifest(self):
+        self._create_user_trip(b"12345")
+        models.PlacePhoto.objects.create(place=self.place, image=SimpleUploadedFile("a.jpg", b"123"))
+
+        with self.assertNumQueries(1):
+            stats = self.client.get("/api/files/stats/").data
+        self.assertEqual(stats["payment_proofs"]["count"], 1)
+        self.assertEqual(stats["place_photos"]["size"], 3)
+        self.assertEqual(stats["total"], {"count": 2, "size": 8, "size_mb": 0.0})
+
+        trip_stats = self.client.get(f"/api/trips/{self.trip.pk}/files/stats/").data
+        self.assertEqual(trip_stats["total"]["count"], 2)
+
+        oldest = models.StoredFile.objects.order_by("mtime").first()
+        response = self.client.post("/api/files/bulk-delete/", {"count": 1}, format="json")
+        self.assertEqual(response.status_code, 202)
+        purge.run_purge_job(response.data["id"])
+
+        job = self.client.get(f"/api/files/jobs/{response.data['id']}/").data
+        self.assertEqual(job["status"], models.FilePurgeJob.STATUS_COMPLETED)
+        self.assertEqual(job["deleted_count"], 1)
+        self.assertFalse((Path(self.media_root) / oldest.path).exists())
+        self.assertEqual(models.StoredFile.objects.count(), 1)
+
+    def test_trip_purge_clears_proofs_and_photos(self):
+        user_trip = self._create_user_trip(b"12345")
+        models.PlacePhoto.objects.create(place=self.place, image=SimpleUploadedFile("a.jpg", b"123"))
+
+        response = self.client.post(f"/api/trips/{self.trip.pk}/files/delete/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], models.FilePurgeJob.STATUS_PENDING)
+        purge.run_purge_job(response.data["id"])
+
+        job = models.FilePurgeJob.objects.get(pk=response.data["id"])
+        self.assertEqual((job.total_files, job.processed_count, job.deleted_count), (2, 2, 2))
+        self.assertEqual(job.deleted_size, 8)
+        previous_update = user_trip.updated_at
+        user_trip.refresh_from_db()
+        self.assertFalse(user_trip.payment_proof)
+        self.assertGreater(user_trip.updated_at, previous_update)
+        self.assertFalse(models.PlacePhoto.objects.exists())
+        self.assertFalse(models.StoredFile.objects.exists())
+
+    def test_identical_proofs_share_one_file(self):
+        first = self._create_user_trip(b"same-screenshot")
+        other = models.Traveler.objects.create(first_name="Jane", phone_number="+2", telegram_id="2")
+        second = models.UserTrip.objects.create(
+            trip=self.trip,
+            traveler=other,
+            quoted_price=Decimal("100.00"),
+            payment_proof=SimpleUploadedFile("copy.JPG", b"same-screenshot"),
+        )
+
+        digest = hashlib.sha256(b"same-screenshot").hexdigest()
+        self.assertEqual(first.payment_proof.name, f"payment_proofs/{digest[:2]}/{digest}.jpg")
+        self.assertEqual(second.payment_proof.name, first.payment_proof.name)
+        stored_files = [path for path in Path(self.media_root).rglob("*") if path.is_file()]
+        self.assertEqual(len(stored_files), 1)
+        self.assertEqual(models.StoredFile.objects.get().ref_count, 2)
+
+        second.delete()
+        self.assertEqual(models.StoredFile.objects.get().ref_count, 1)
+
+    def test_trip_purge_keeps_proofs_shared_with_other_trips(self):
+        user_trip = self._create_user_trip(b"shared")
+        other_trip = models.Trip.objects.create(
+            place=self.place,
+            title="Other trip",
+            registration_start=date(2024, 2, 1),
+            registration_end=date(2024, 2, 10),
+            trip_start=date(2024, 2, 15),
+            trip_end=date(2024, 2, 20),
+            default_price=Decimal("100.00"),
+        )
+        other_user_trip = models.UserTrip.objects.create(
+            trip=other_trip,
+            traveler=self.traveler,
+            quoted_price=Decimal("100.00"),
+            payment_proof=SimpleUploadedFile("proof.jpg", b"shared"),
+        )
+
+        response = self.client.post(f"/api/trips/{self.trip.pk}/files/delete/")
+        purge.run_purge_job(response.data["id"])
+
+        job = models.FilePurgeJob.objects.get(pk=response.data["id"])
+        self.assertEqual((job.processed_count, job.deleted_count, job.failed_count), (1, 0, 0))
+        user_trip.refresh_from_db()
+        self.assertFalse(user_trip.payment_proof)
+        self.assertTrue(Path(other_user_trip.payment_proof.path).exists())
+        self.assertEqual(models.StoredFile.objects.get().ref_count, 1)
+
+    def test_trip_purge_keeps_proof_reused_after_collecting_targets(self):
+        self._create_user_trip(b"resent")
+        other_trip = models.Trip.objects.create(
+            place=self.place,
+            title="Other trip",
+            registration_start=date(2024, 2, 1),
+            registration_end=date(2024, 2, 10),
+            trip_start=date(2024, 2, 15),
+            trip_end=date(2024, 2, 20),
+            default_price=Decimal("100.00"),
+        )
+        collect_targets = purge._collect_targets
+        reused = []
+
+        def collect_then_upload(job):
+            targets = collect_targets(job)
+            # The same screenshot arrives for another trip while the purge is running.
+            reused.append(
+                models.UserTrip.objects.create(
+                    trip=other_trip,
+                    traveler=self.traveler,
+                    quoted_price=Decimal("100.00"),
+                    payment_proof=SimpleUploadedFile("proof.jpg", b"resent"),
+                )
+            )
+            return targets
+
+        response = self.client.post(f"/api/trips/{self.trip.pk}/files/delete/")
+        with mock.patch.object(purge, "_collect_targets", side_effect=collect_then_upload):
+            purge.run_purge_job(response.data["id"])
+
+        job = models.FilePurgeJob.objects.get(pk=response.data["id"])
+        self.assertEqual((job.processed_count, job.deleted_count), (1, 0))
+        self.assertTrue(Path(reused[0].payment_proof.path).exists())
+        self.assertEqual(models.StoredFile.objects.get().ref_count, 1)
+
+    def test_purge_job_failure_is_recorded(self):
+        user_trip = self._create_user_trip(b"12345")
+        response = self.client.post(f"/api/trips/{self.trip.pk}/files/delete/")
+
+        with mock.patch.object(purge, "_unlink", side_effect=OSError("disk gone")), self.assertLogs("core.purge", "ERROR"):
+            purge.run_purge_job(response.data["id"])
+
+        job = self.client.get(f"/api/files/jobs/{response.data['id']}/").data
+        self.assertEqual(job["status"], models.FilePurgeJob.STATUS_FAILED)
+        self.assertEqual(job["error"], "disk gone")
+        self.assertIsNotNone(job["finished_at"])
+        self.assertTrue(Path(user_trip.payment_proof.path).exists())
+
+        # A failed job is not picked up again.
+        purge.run_purge_job(response.data["id"])
+        self.assertEqual(models.FilePurgeJob.objects.get(pk=response.data["id"]).status, models.FilePurgeJob.STATUS_FAILED)
+
+    def test_stale_purge_jobs_are_failed(self):
+        self._create_user_trip(b"12345")
+        stale = self.client.post(f"/api/trips/{self.trip.pk}/files/delete/").data["id"]
+        models.FilePurgeJob.objects.filter(pk=stale).update(status=models.FilePurgeJob.STATUS_RUNNING)
+        queued = self.client.post("/api/files/bulk-delete/", {"count": 1}, format="json").data["id"]
+
+        with override_settings(FILE_PURGE_STALE_SECONDS=0):
+            job = self.client.get(f"/api/files/jobs/{stale}/").data
+            self.assertEqual(job["status"], models.FilePurgeJob.STATUS_FAILED)
+            self.assertTrue(job["error"].startswith("Interrupted"))
+
+            out = StringIO()
+            call_command("fail_stale_purge_jobs", stdout=out)
+        self.assertIn("Marked 1 stale", out.getvalue())
+        self.assertEqual(models.FilePurgeJob.objects.get(pk=queued).status, models.FilePurgeJob.STATUS_FAILED)
+
+        fresh = self.client.post("/api/files/bulk-delete/", {"count": 1}, format="json").data["id"]
+        call_command("fail_stale_purge_jobs", stdout=StringIO())
+        self.assertEqual(self.client.get(f"/api/files/jobs/{fresh}/").data["status"], models.FilePurgeJob.STATUS_PENDING)
+
+    def _jpeg_with_orientation(self, size, orientation):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        exif[0x010F] = "Test Camera"
+        Image.new("RGB", size, (200, 30, 30)).save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_photo_variants_are_resized_and_stripped(self):
+        # Orientation 6 means the camera was rotated; variants come out upright.
+        photo = models.PlacePhoto.objects.create(
+            place=self.place, image=self._jpeg_with_orientation((2000, 1000), orientation=6)
+        )
+
+        self.assertTrue(images.generate_variants(photo.pk))
+
+        photo.refresh_from_db()
+        self.assertEqual(list(photo.variants), ["thumb", "medium", "large"])
+        self.assertEqual((photo.variants["thumb"]["width"], photo.variants["thumb"]["height"]), (160, 320))
+        with Image.open(Path(self.media_root) / photo.variants["thumb"]["jpeg"]) as thumb:
+            self.assertEqual(thumb.size, (160, 320))
+            self.assertEqual(len(thumb.getexif()), 0)
+        with Image.open(Path(self.media_root) / photo.variants["large"]["webp"]) as large:
+            self.assertEqual((large.format, large.size), ("WEBP", (800, 1600)))
+        self.assertEqual(
+            models.StoredFile.objects.filter(kind=models.StoredFile.KIND_PHOTO_VARIANT, place_photo=photo).count(),
+            6,
+        )
+
+        data = self.client.get(f"/api/places/{self.place.pk}/").data
+        thumb = data["photos"][0]["variants"]["thumb"]
+        self.assertTrue(thumb["webp"].startswith("http://testserver/media/place_photo_variants/"))
+        self.assertTrue(thumb["jpeg"].endswith("/thumb.jpg"))
+
+        variant_path = Path(self.media_root) / photo.variants["medium"]["webp"]
+        photo.delete()
+        self.assertFalse(variant_path.exists())
+        self.assertFalse(models.StoredFile.objects.filter(kind=models.StoredFile.KIND_PHOTO_VARIANT).exists())
+
+    def test_variant_backfill_command(self):
+        small = models.PlacePhoto.objects.create(place=self.place, image=self._jpeg_with_orientation((100, 50), 1))
+        broken = models.PlacePhoto.objects.create(place=self.place, image=SimpleUploadedFile("a.jpg", b"not-an-image"))
+
+        out = StringIO()
+        call_command("generate_photo_variants", stdout=out)
+
+        self.assertIn("Generated variants for 1 photos; 1 failed.", out.getvalue())
+        small.refresh_from_db()
+        # Sizes larger than the original would repeat the thumbnail and are skipped.
+        self.assertEqual(list(small.variants), ["thumb"])
+        self.assertEqual(small.variants["thumb"]["width"], 100)
+        broken.refresh_from_db()
+        self.assertEqual(broken.variants, {})
+
+    def test_sync_command_reconciles_disk(self):
+        user_trip = self._create_user_trip()
+        models.StoredFile.objects.all().delete()
+        orphan = Path(self.media_root) / "place_photos" / "orphan.jpg"
+        orphan.parent.mkdir(parents=True, exist_ok=True)
+        orphan.write_bytes(b"xy")
+        models.StoredFile.objects.create(
+            path="payment_proofs/missing.jpg",
+            kind=models.StoredFile.KIND_PAYMENT_PROOF,
+            size=1,
+            mtime=user_trip.created_at,
+        )
+
+        call_command("sync_media_manifest", stdout=StringIO())
+
+        paths = dict(models.StoredFile.objects.values_list("path", "user_trip_id"))
+        self.assertEqual(paths, {user_trip.payment_proof.name: user_trip.pk, "place_photos/orphan.jpg": None})
+
+
+class _TelegramStubHandler(BaseHTTPRequestHandler):
+    files = {"proof-file-id": ("photos/file_1.jpg", b"fetched-proof")}
+
+    def do_GET(self):
+        if self.path.startswith("/bottest-token/getFile"):
+            file_id = self.path.split("file_id=", 1)[-1]
+            if file_id not in self.files:
+                self._send_json(400, {"ok": False, "description": "Bad Request: invalid file_id"})
+                return
+            file_path, content = self.files[file_id]
+            self._send_json(200, {"ok": True, "result": {"file_path": file_path, "file_size": len(content)}})
+            return
+        for file_path, content in self.files.values():
+            if self.path == f"/file/bottest-token/{file_path}":
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+        self.send_error(404)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PaymentProofFetchTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _TelegramStubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            TELEGRAM_BOT_TOKEN="test-token",
+            TELEGRAM_API_BASE=f"http://127.0.0.1:{server.server_address[1]}",
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        self.traveler = models.Traveler.objects.create(first_name="John", phone_number="+1", telegram_id="1")
+
+    def _register(self, file_id, traveler=None):
+        traveler = traveler or self.traveler
+        with mock.patch.object(telegram_files, "enqueue_payment_proof_fetch") as enqueue:
+            response = self.client.post(
+                "/api/user-trips/",
+                {
+                    "trip": str(self.trip.id),
+                    "traveler": str(traveler.id),
+                    "quoted_price": "100.00",
+                    "payment_proof_file_id": file_id,
+                    "payment_proof_file_unique_id": "unique-1",
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertIsNone(response.data["payment_proof_uploaded_at"])
+        enqueue.assert_called_once()
+        return response.data["id"]
+
+    def test_file_id_is_fetched_and_stored(self):
+        user_trip_id = self._register("proof-file-id")
+
+        self.assertTrue(telegram_files.fetch_payment_proof(user_trip_id))
+
+        user_trip = models.UserTrip.objects.get(pk=user_trip_id)
+        digest = hashlib.sha256(b"fetched-proof").hexdigest()
+        self.assertEqual(user_trip.payment_proof.name, f"payment_proofs/{digest[:2]}/{digest}.jpg")
+        with user_trip.payment_proof.open("rb") as handle:
+            self.assertEqual(handle.read(), b"fetched-proof")
+        self.assertIsNotNone(user_trip.payment_proof_uploaded_at)
+        self.assertEqual(user_trip.payment_proof_fetch_error, "")
+        self.assertEqual(models.StoredFile.objects.get().path, user_trip.payment_proof.name)
+        # Already stored: a repeated fetch is a no-op.
+        self.assertFalse(telegram_files.fetch_payment_proof(user_trip_id))
+
+    def test_known_file_unique_id_skips_download(self):
+        first_id = self._register("proof-file-id")
+        telegram_files.fetch_payment_proof(first_id)
+        other = models.Traveler.objects.create(first_name="Jane", phone_number="+2", telegram_id="2")
+
+        with mock.patch.object(telegram_files, "enqueue_payment_proof_fetch") as enqueue:
+            response = self.client.post(
+                "/api/user-trips/",
+                {
+                    "trip": str(self.trip.id),
+                    "traveler": str(other.id),
+                    "quoted_price": "100.00",
+                    "payment_proof_file_id": "another-file-id",
+                    "payment_proof_file_unique_id": "unique-1",
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        enqueue.assert_not_called()
+        self.assertIsNotNone(response.data["payment_proof_uploaded_at"])
+        second = models.UserTrip.objects.get(pk=response.data["id"])
+        self.assertEqual(second.payment_proof.name, models.UserTrip.objects.get(pk=first_id).payment_proof.name)
+        self.assertEqual(models.StoredFile.objects.get().ref_count, 2)
+
+    def test_failed_fetch_records_error(self):
+        user_trip_id = self._register("unknown-file-id")
+
+        self.assertFalse(telegram_files.fetch_payment_proof(user_trip_id))
+
+        user_trip = models.UserTrip.objects.get(pk=user_trip_id)
+        self.assertFalse(user_trip.payment_proof)
+        self.assertIsNone(user_trip.payment_proof_uploaded_at)
+        self.assertIn("invalid file_id", user_trip.payment_proof_fetch_error)
+
+    def test_claimed_proof_is_not_fetched_twice(self):
+        user_trip_id = self._register("proof-file-id")
+        downloader = telegram_files.TelegramBotAPIFetcher()
+        calls = []
+        out = StringIO()
+
+        class ConcurrentFetcher:
+            def fetch(self, file_id):
+                calls.append(file_id)
+                # The command runs while the background worker is still downloading.
+                call_command("fetch_payment_proofs", stdout=out)
+                return downloader.fetch(file_id)
+
+        with mock.patch.object(telegram_files, "get_fetcher", return_value=ConcurrentFetcher()):
+            self.assertTrue(telegram_files.fetch_payment_proof(user_trip_id))
+
+        self.assertEqual(calls, ["proof-file-id"])
+        self.assertIn("Fetched 0 payment proofs; 1 still pending.", out.getvalue())
+        self.assertIsNone(models.UserTrip.objects.get(pk=user_trip_id).payment_proof_fetch_started_at)
+
+    def test_abandoned_claim_is_taken_over(self):
+        user_trip_id = self._register("proof-file-id")
+        claims = models.UserTrip.objects.filter(pk=user_trip_id)
+
+        claims.update(payment_proof_fetch_started_at=timezone.now())
+        self.assertFalse(telegram_files.fetch_payment_proof(user_trip_id))
+
+        claims.update(payment_proof_fetch_started_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(telegram_files.fetch_payment_proof(user_trip_id))
+
+    def test_proof_replaced_during_download_is_not_overwritten(self):
+        user_trip_id = self._register("proof-file-id")
+        downloader = telegram_files.TelegramBotAPIFetcher()
+        client = self.client
+
+        class ReplacingFetcher:
+            def fetch(self, file_id):
+                with mock.patch.object(telegram_files, "enqueue_payment_proof_fetch"):
+                    client.patch(f"/api/user-trips/{user_trip_id}/", {"payment_proof_file_id": "newer-file-id"})
+                return downloader.fetch(file_id)
+
+        with mock.patch.object(telegram_files, "get_fetcher", return_value=ReplacingFetcher()):
+            self.assertFalse(telegram_files.fetch_payment_proof(user_trip_id))
+
+        user_trip = models.UserTrip.objects.get(pk=user_trip_id)
+        self.assertEqual(user_trip.payment_proof_file_id, "newer-file-id")
+        self.assertFalse(user_trip.payment_proof)
+        self.assertFalse(models.StoredFile.objects.exists())
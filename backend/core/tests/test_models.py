@@ -7,7 +7,7 @@ from datetime import date
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from core import models
+from core import models, versioning
 
 
 class TripAggregationTests(TestCase):
@@ -63,3 +63,62 @@ class TripAggregationTests(TestCase):
             recorded_by=self.user,
         )
         self.assertEqual(self.trip.total_expenses(), Decimal("50.50"))
+
+    def test_with_financials_matches_model_methods(self):
+        models.UserTrip.objects.create(
+            trip=self.trip,
+            traveler=self.traveler,
+            status=models.UserTrip.STATUS_CONFIRMED,
+            payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+            quoted_price=Decimal("100.00"),
+            paid_amount=Decimal("80.00"),
+        )
+        models.Expense.objects.create(
+            trip=self.trip,
+            amount=Decimal("30.00"),
+            category="food",
+            incurred_at=date(2024, 1, 16),
+        )
+        models.Expense.objects.create(
+            trip=self.trip,
+            amount=Decimal("5.25"),
+            category="other",
+            incurred_at=date(2024, 1, 17),
+        )
+
+        trip = models.Trip.objects.with_financials().get(pk=self.trip.pk)
+        self.assertEqual(trip.confirmed_count, self.trip.participants_count())
+        self.assertEqual(trip.income_sum, self.trip.total_income())
+        self.assertEqual(trip.expenses_sum, self.trip.total_expenses())
+
+    def test_with_financials_defaults_to_zero(self):
+        trip = models.Trip.objects.with_financials().get(pk=self.trip.pk)
+        self.assertEqual(trip.confirmed_count, 0)
+        self.assertEqual(trip.income_sum, Decimal("0.00"))
+        self.assertEqual(trip.expenses_sum, Decimal("0.00"))
+
+
+class SettingsLoadTests(TestCase):
+    def setUp(self):
+        models.Settings.invalidate_cache()
+        self.addCleanup(models.Settings.invalidate_cache)
+
+    def test_load_creates_and_caches_singleton(self):
+        first = models.Settings.load()
+        with self.assertNumQueries(0):
+            second = models.Settings.load()
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(models.Settings.objects.count(), 1)
+
+    def test_save_invalidates_cached_instance(self):
+        instance = models.Settings.load()
+        instance.payment_instructions = "Pay to card 8600"
+        instance.save()
+        self.assertEqual(models.Settings.load().payment_instructions, "Pay to card 8600")
+
+    def test_change_from_another_worker_is_picked_up(self):
+        instance = models.Settings.load()
+        # Another worker saves: the row changes and the shared version token is replaced.
+        models.Settings.objects.filter(pk=instance.pk).update(payment_instructions="Pay in cash")
+        versioning.bump(models.Settings.CACHE_VERSION_KEY)
+        self.assertEqual(models.Settings.load().payment_instructions, "Pay in cash")
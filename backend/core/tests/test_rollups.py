@@ -0,0 +1,102 @@
+"""Tests for the daily finance rollup maintenance."""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import models
+
+
+class DailyFinanceRollupTests(TestCase):
+    def setUp(self):
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        self.traveler = models.Traveler.objects.create(first_name="John", phone_number="+1", telegram_id="1")
+        self.today = timezone.localdate()
+
+    def _rollup(self, day):
+        return models.DailyFinanceRollup.objects.get(date=day, trip=self.trip)
+
+    def test_pending_registration_counts_as_outstanding(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.UserTrip.objects.create(trip=self.trip, traveler=self.traveler, quoted_price=Decimal("100.00"))
+        rollup = self._rollup(self.today)
+        self.assertEqual(rollup.outstanding, Decimal("100.00"))
+        self.assertEqual(rollup.income, Decimal("0.00"))
+
+    def test_confirmation_moves_outstanding_to_income(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user_trip = models.UserTrip.objects.create(
+                trip=self.trip, traveler=self.traveler, quoted_price=Decimal("100.00")
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            user_trip.status = models.UserTrip.STATUS_CONFIRMED
+            user_trip.payment_status = models.UserTrip.PAYMENT_CONFIRMED
+            user_trip.paid_amount = Decimal("90.00")
+            user_trip.confirmed_at = timezone.now()
+            user_trip.save()
+        rollup = self._rollup(self.today)
+        self.assertEqual(rollup.outstanding, Decimal("0.00"))
+        self.assertEqual(rollup.income, Decimal("90.00"))
+        self.assertEqual(rollup.confirmations, 1)
+
+    def test_moving_and_deleting_expense_updates_both_days(self):
+        yesterday = self.today - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            expense = models.Expense.objects.create(trip=self.trip, amount=Decimal("20.00"), incurred_at=yesterday)
+        self.assertEqual(self._rollup(yesterday).expenses, Decimal("20.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expense = models.Expense.objects.get(pk=expense.pk)
+            expense.incurred_at = self.today
+            expense.save()
+        self.assertFalse(models.DailyFinanceRollup.objects.filter(date=yesterday).exists())
+        self.assertEqual(self._rollup(self.today).expenses, Decimal("20.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.delete()
+        self.assertFalse(models.DailyFinanceRollup.objects.exists())
+
+    def test_rebuild_matches_incremental_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.UserTrip.objects.create(
+                trip=self.trip,
+                traveler=self.traveler,
+                status=models.UserTrip.STATUS_CONFIRMED,
+                payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+                quoted_price=Decimal("100.00"),
+                paid_amount=Decimal("100.00"),
+                confirmed_at=timezone.now(),
+            )
+            models.Expense.objects.create(trip=self.trip, amount=Decimal("15.00"), incurred_at=self.today)
+        incremental = list(
+            models.DailyFinanceRollup.objects.values_list("date", "income", "expenses", "confirmations", "outstanding")
+        )
+
+        models.DailyFinanceRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=StringIO())
+        rebuilt = list(
+            models.DailyFinanceRollup.objects.values_list("date", "income", "expenses", "confirmations", "outstanding")
+        )
+        self.assertEqual(rebuilt, incremental)
+
+    def test_trip_deletion_cascades_cleanly(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.UserTrip.objects.create(trip=self.trip, traveler=self.traveler, quoted_price=Decimal("100.00"))
+            models.Expense.objects.create(trip=self.trip, amount=Decimal("5.00"), incurred_at=self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip.delete()
+        self.assertFalse(models.DailyFinanceRollup.objects.exists())
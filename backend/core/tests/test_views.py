@@ -0,0 +1,638 @@
+"""API level tests for core views."""
+from __future__ import annotations
+
+import shutil
+import tempfile
+import uuid
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core import models, outbox, serializers, views
+
+
+class TripFixturesMixin:
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.place = models.Place.objects.create(name="Test Place")
+
+    def _create_trips(self, count: int) -> None:
+        offset = models.Trip.objects.count()
+        for index in range(offset, offset + count):
+            trip = models.Trip.objects.create(
+                place=self.place,
+                title=f"Trip {index}",
+                registration_start=date(2024, 1, 1),
+                registration_end=date(2024, 1, 10),
+                trip_start=date(2024, 1, 15),
+                trip_end=date(2024, 1, 20),
+                default_price=Decimal("100.00"),
+            )
+            traveler = models.Traveler.objects.create(
+                first_name=f"Traveler {index}",
+                phone_number="+123456789",
+                telegram_id=str(1000 + index),
+            )
+            models.UserTrip.objects.create(
+                trip=trip,
+                traveler=traveler,
+                status=models.UserTrip.STATUS_CONFIRMED,
+                quoted_price=Decimal("100.00"),
+                paid_amount=Decimal("100.00"),
+            )
+            models.Expense.objects.create(trip=trip, amount=Decimal("25.00"), incurred_at=date(2024, 1, 16))
+
+
+class TripListQueryTests(TripFixturesMixin, APITestCase):
+    def _count_list_queries(self) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/trips/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_trip_list_query_count_is_constant(self):
+        self._create_trips(2)
+        baseline = self._count_list_queries()
+        self._create_trips(10)
+        self.assertEqual(self._count_list_queries(), baseline)
+
+    def test_trip_list_reports_financials(self):
+        self._create_trips(1)
+        response = self.client.get("/api/trips/")
+        trip = response.data["results"][0]
+        self.assertEqual(trip["participants_count"], 1)
+        self.assertEqual(Decimal(trip["total_income"]), Decimal("100.00"))
+        self.assertEqual(Decimal(trip["total_expenses"]), Decimal("25.00"))
+        self.assertEqual(Decimal(trip["net_income"]), Decimal("75.00"))
+
+
+    def test_trip_list_embeds_place_summary(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self._create_trips(3)
+        with override_settings(MEDIA_ROOT=media_root):
+            baseline = self._count_list_queries()
+            cover = models.PlacePhoto.objects.create(place=self.place, image=SimpleUploadedFile("a.jpg", b"a"))
+            for name in ("b.jpg", "c.jpg"):
+                models.PlacePhoto.objects.create(place=self.place, image=SimpleUploadedFile(name, b"b"))
+            self.assertEqual(self._count_list_queries(), baseline)
+
+            place = self.client.get("/api/trips/").data["results"][0]["place_detail"]
+            self.assertEqual(set(place), {"id", "name", "latitude", "longitude", "rating", "cover_photo"})
+            self.assertEqual(place["cover_photo"]["id"], str(cover.pk))
+
+            expanded = self.client.get("/api/trips/", {"expand": "place"}).data["results"][0]["place_detail"]
+            self.assertEqual(len(expanded["photos"]), 3)
+            trip_id = models.Trip.objects.first().pk
+            detail = self.client.get(f"/api/trips/{trip_id}/").data["place_detail"]
+            self.assertEqual(len(detail["photos"]), 3)
+
+            cover.delete()
+            self.place.refresh_from_db()
+            self.assertEqual(self.place.cover_photo, models.PlacePhoto.objects.order_by("created_at").first())
+
+
+class SparseFieldsetTests(TripFixturesMixin, APITestCase):
+    def _user_trip_queries(self, params) -> tuple:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/user-trips/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"], [query["sql"] for query in ctx.captured_queries]
+
+    def test_fields_limit_payload_and_queries(self):
+        self._create_trips(3)
+        params = {"fields": "id,status,trip_detail.title,trip_detail.group_chat_id"}
+        results, queries = self._user_trip_queries(params)
+
+        self.assertEqual(set(results[0]), {"id", "status", "trip_detail"})
+        self.assertEqual(set(results[0]["trip_detail"]), {"title", "group_chat_id"})
+        # Count, page and one trip prefetch; no traveler join and no financial subqueries.
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any("core_traveler" in sql or "core_expense" in sql for sql in queries))
+
+        results, queries = self._user_trip_queries({"fields": "id"})
+        self.assertEqual(results[0], {"id": results[0]["id"]})
+        self.assertEqual(len(queries), 2)
+
+    def test_default_shape_query_count_is_constant(self):
+        self._create_trips(2)
+        results, baseline = self._user_trip_queries({})
+        self.assertEqual(results[0]["trip_detail"]["participants_count"], 1)
+        self.assertEqual(results[0]["traveler_detail"]["first_name"], "Traveler 1")
+        self._create_trips(8)
+        self.assertEqual(len(self._user_trip_queries({})[1]), len(baseline))
+
+    def test_expand_nested_place(self):
+        self._create_trips(1)
+        results, _ = self._user_trip_queries({"fields": "trip_detail.place_detail"})
+        self.assertNotIn("photos", results[0]["trip_detail"]["place_detail"])
+
+        results, _ = self._user_trip_queries(
+            {"fields": "trip_detail.place_detail", "expand": "trip_detail.place"}
+        )
+        self.assertEqual(results[0]["trip_detail"]["place_detail"]["photos"], [])
+
+    def test_fields_on_trips(self):
+        self._create_trips(2)
+        response = self.client.get("/api/trips/", {"fields": "id,title"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "title"})
+
+
+class OverviewMetricsTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        traveler = models.Traveler.objects.create(first_name="John", phone_number="+1", telegram_id="1")
+        self.today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_facts(traveler)
+
+    def _create_facts(self, traveler):
+        models.UserTrip.objects.create(
+            trip=self.trip,
+            traveler=traveler,
+            status=models.UserTrip.STATUS_CONFIRMED,
+            payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+            quoted_price=Decimal("100.00"),
+            paid_amount=Decimal("100.00"),
+            confirmed_at=timezone.now(),
+        )
+        models.Expense.objects.create(trip=self.trip, amount=Decimal("30.00"), incurred_at=self.today)
+        models.Expense.objects.create(
+            trip=self.trip, amount=Decimal("12.50"), incurred_at=self.today - timedelta(days=2)
+        )
+
+    def test_daily_data_is_gap_filled(self):
+        response = self.client.get("/api/metrics/overview/", {"range": "7d"})
+        self.assertEqual(response.status_code, 200)
+        daily = {row["date"]: row for row in response.data["daily_data"]}
+        self.assertEqual(len(daily), 8)
+        today = daily[self.today.strftime("%Y-%m-%d")]
+        self.assertEqual(today["income"], 100.0)
+        self.assertEqual(today["expenses"], 30.0)
+        self.assertEqual(today["net"], 70.0)
+        earlier = daily[(self.today - timedelta(days=2)).strftime("%Y-%m-%d")]
+        self.assertEqual(earlier["income"], 0.0)
+        self.assertEqual(earlier["expenses"], 12.5)
+        empty = daily[(self.today - timedelta(days=1)).strftime("%Y-%m-%d")]
+        self.assertEqual(empty["net"], 0.0)
+
+    def test_query_count_does_not_grow_with_range(self):
+        with CaptureQueriesContext(connection) as short_range:
+            self.client.get("/api/metrics/overview/", {"range": "7d"})
+        with CaptureQueriesContext(connection) as long_range:
+            self.client.get("/api/metrics/overview/", {"range": "365d"})
+        self.assertEqual(len(short_range.captured_queries), len(long_range.captured_queries))
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        place = models.Place.objects.create(name="Test Place")
+        trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        for index in range(25):
+            traveler = models.Traveler.objects.create(
+                first_name=f"Traveler {index}", phone_number="+1", telegram_id=str(index)
+            )
+            models.UserTrip.objects.create(trip=trip, traveler=traveler, quoted_price=Decimal("100.00"))
+        models.BotToken.objects.create(name="bot", token="bot-secret")
+
+    def _walk(self, url, **params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def test_staff_defaults_to_page_numbers(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/user-trips/")
+        self.assertEqual(response.data["count"], 25)
+
+    def test_cursor_mode_walks_every_row_without_count(self):
+        self.client.force_authenticate(self.admin)
+        ids = self._walk("/api/user-trips/", pagination="cursor")
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_bot_callers_get_cursor_pages(self):
+        self.client.credentials(HTTP_X_BOT_TOKEN="bot-secret")
+        self.assertEqual(len(self._walk("/api/travelers/")), 25)
+        response = self.client.get("/api/travelers/", {"pagination": "page"})
+        self.assertEqual(response.data["count"], 25)
+
+    def test_cursor_pages_break_ties_on_primary_key(self):
+        self.client.force_authenticate(self.admin)
+        trip = models.Trip.objects.get()
+        for index in range(24):
+            trip.pk = None
+            trip.title = f"Trip {index}"
+            trip.save()
+        ids = self._walk("/api/trips/", pagination="cursor")
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        self.user_trips = []
+        for index in range(3):
+            traveler = models.Traveler.objects.create(first_name=f"T{index}", phone_number="+1", telegram_id=str(index))
+            self.user_trips.append(
+                models.UserTrip.objects.create(trip=self.trip, traveler=traveler, quoted_price=Decimal("100.00"))
+            )
+        models.UserTrip.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def test_only_changed_rows_and_tombstones_are_returned(self):
+        watermark = timezone.now() - timedelta(minutes=5)
+        changed = self.user_trips[0]
+        changed.payment_note = "paid"
+        changed.save()
+        deleted_id = str(self.user_trips[1].pk)
+        self.user_trips[1].delete()
+
+        response = self.client.get("/api/user-trips/", {"updated_since": watermark.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [str(changed.pk)])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+        self.assertIn("sync_cursor", response.data)
+
+        follow_up = self.client.get("/api/user-trips/", {"updated_since": response.data["sync_cursor"]})
+        self.assertEqual([item["id"] for item in follow_up.data["results"]], [str(changed.pk)])
+
+    def test_invalid_watermark_is_rejected(self):
+        response = self.client.get("/api/trips/", {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(DELTA_SYNC_TOMBSTONE_RETENTION_DAYS=7)
+    def test_tombstones_are_pruned_after_retention(self):
+        old_id, recent_id = self.user_trips[0].pk, self.user_trips[1].pk
+        self.user_trips[0].delete()
+        self.user_trips[1].delete()
+        models.DeletedRecord.objects.filter(object_id=old_id).update(deleted_at=timezone.now() - timedelta(days=8))
+        call_command("prune_deleted_records", stdout=StringIO())
+        self.assertEqual(list(models.DeletedRecord.objects.values_list("object_id", flat=True)), [recent_id])
+
+        stale = (timezone.now() - timedelta(days=8)).isoformat()
+        response = self.client.get("/api/user-trips/", {"updated_since": stale})
+        self.assertEqual(response.status_code, 400)
+
+
+class OutboxEventTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        place = models.Place.objects.create(name="Test Place")
+        trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        traveler = models.Traveler.objects.create(first_name="Ann", phone_number="+1", telegram_id="42")
+        self.user_trip = models.UserTrip.objects.create(
+            trip=trip,
+            traveler=traveler,
+            status=models.UserTrip.STATUS_CONFIRMED,
+            quoted_price=Decimal("100.00"),
+        )
+        models.BotToken.objects.create(name="bot", token="bot-secret")
+
+    def _confirm_payment(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(
+            f"/api/user-trips/{self.user_trip.id}/",
+            {"payment_status": models.UserTrip.PAYMENT_CONFIRMED},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+
+    def test_confirmation_writes_single_event(self):
+        self._confirm_payment()
+        self._confirm_payment()
+        event = models.OutboxEvent.objects.get()
+        self.assertEqual(event.event_type, models.OutboxEvent.TYPE_PAYMENT_CONFIRMED)
+        self.assertEqual(event.user_trip_id, self.user_trip.id)
+
+    def test_events_are_leased_until_acknowledged(self):
+        self._confirm_payment()
+        self.client.credentials(HTTP_X_BOT_TOKEN="bot-secret")
+
+        response = self.client.get("/api/events/")
+        self.assertEqual(response.status_code, 200)
+        [event] = response.data["results"]
+        self.assertEqual(event["user_trip"]["id"], str(self.user_trip.id))
+        self.assertEqual(self.client.get("/api/events/").data["results"], [])
+
+        # An expired lease hands the event out again.
+        models.OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(self.client.get("/api/events/").data["results"]), 1)
+
+        response = self.client.post("/api/events/ack/", {"ids": [event["id"]]}, format="json")
+        self.assertEqual(response.data["acknowledged"], 1)
+        models.OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.get("/api/events/").data["results"], [])
+
+    def test_event_batch_query_count_is_constant(self):
+        def claim_and_serialize(count):
+            for _ in range(count):
+                traveler = models.Traveler.objects.create(
+                    first_name="T", phone_number="+1", telegram_id=str(models.Traveler.objects.count() + 100)
+                )
+                user_trip = models.UserTrip.objects.create(
+                    trip=self.user_trip.trip, traveler=traveler, quoted_price=Decimal("100.00")
+                )
+                outbox.record_payment_confirmed(user_trip)
+            with CaptureQueriesContext(connection) as ctx:
+                data = serializers.OutboxEventSerializer(outbox.claim_events(100), many=True).data
+            self.assertEqual(len(data), count)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(claim_and_serialize(2), claim_and_serialize(6))
+
+    def test_events_require_staff_or_bot(self):
+        user = get_user_model().objects.create(username="viewer")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get("/api/events/").status_code, 403)
+
+
+class BotJoinRequestLookupTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+            group_chat_id=-1001234567890,
+        )
+        self.traveler = models.Traveler.objects.create(first_name="Ann", phone_number="+1", telegram_id="42")
+        self.user_trip = models.UserTrip.objects.create(
+            trip=self.trip,
+            traveler=self.traveler,
+            quoted_price=Decimal("100.00"),
+            payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+        )
+
+    def _lookup(self, chat_id=-1001234567890, telegram_id=42):
+        return self.client.get("/api/bot/join-requests/", {"chat_id": chat_id, "telegram_id": telegram_id})
+
+    def test_resolves_confirmed_registration_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._lookup()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(self.user_trip.id))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_unknown_chat_or_unconfirmed_payment_is_not_found(self):
+        self.assertEqual(self._lookup(chat_id=-1).status_code, 404)
+        models.UserTrip.objects.update(payment_status=models.UserTrip.PAYMENT_PENDING)
+        self.assertEqual(self._lookup().status_code, 404)
+
+    def test_rejects_non_numeric_ids(self):
+        self.assertEqual(self._lookup(chat_id="abc").status_code, 400)
+
+    def test_trip_group_chat_id_accepts_blank_and_rejects_text(self):
+        url = f"/api/trips/{self.trip.id}/"
+        self.assertEqual(self.client.patch(url, {"group_chat_id": "-100999"}).data["group_chat_id"], -100999)
+        self.assertIsNone(self.client.patch(url, {"group_chat_id": ""}).data["group_chat_id"])
+        response = self.client.patch(url, {"group_chat_id": "my-group"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("group_chat_id", response.data)
+
+
+class BotTravelerRegistrationsTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.traveler = models.Traveler.objects.create(first_name="Ann", phone_number="+1", telegram_id="42")
+        self.user_trips = {}
+        for title, chat_id, link in [("Grouped", -100123, ""), ("Linked", None, "https://t.me/+x"), ("Solo", None, "")]:
+            trip = models.Trip.objects.create(
+                place=place,
+                title=title,
+                registration_start=date(2024, 1, 1),
+                registration_end=date(2024, 1, 10),
+                trip_start=date(2024, 1, 15),
+                trip_end=date(2024, 1, 20),
+                default_price=Decimal("100.00"),
+                group_chat_id=chat_id,
+                group_invite_link=link,
+            )
+            self.user_trips[title] = models.UserTrip.objects.create(
+                trip=trip,
+                traveler=self.traveler,
+                quoted_price=Decimal("100.00"),
+                status=models.UserTrip.STATUS_CONFIRMED,
+                payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+            )
+        models.UserTrip.objects.filter(pk=self.user_trips["Linked"].pk).update(
+            payment_status=models.UserTrip.PAYMENT_PENDING
+        )
+
+    def test_flat_registrations_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/bot/travelers/42/registrations/")
+        self.assertEqual(response.status_code, 200)
+        rows = {row["title"]: row for row in response.data["results"]}
+        self.assertEqual(set(rows), {"Grouped", "Linked", "Solo"})
+        self.assertEqual(
+            rows["Grouped"],
+            {
+                "id": str(self.user_trips["Grouped"].id),
+                "trip": str(self.user_trips["Grouped"].trip_id),
+                "title": "Grouped",
+                "status": "confirmed",
+                "payment_status": "confirmed",
+                "can_request_invite": True,
+            },
+        )
+        self.assertFalse(rows["Linked"]["can_request_invite"])
+        self.assertFalse(rows["Solo"]["can_request_invite"])
+        self.assertFalse(response.data["has_more"])
+
+    def test_registrations_beyond_the_cap_are_flagged(self):
+        with mock.patch.object(views.BotTravelerRegistrationsView, "max_results", 2):
+            response = self.client.get("/api/bot/travelers/42/registrations/")
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertTrue(response.data["has_more"])
+
+    def test_unknown_traveler_has_no_registrations(self):
+        response = self.client.get("/api/bot/travelers/7/registrations/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+
+
+class BotRegistrationContextTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Hike",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+        self.traveler = models.Traveler.objects.create(first_name="Ann", phone_number="+1", telegram_id="42")
+        settings_row = models.Settings.load()
+        settings_row.payment_instructions = "Card 1234"
+        settings_row.save()
+        models.Settings.load()
+
+    def get_context(self, telegram_id="42", trip=None):
+        return self.client.get(
+            "/api/bot/registration-context/",
+            {"trip": str(trip or self.trip.id), "telegram_id": telegram_id},
+        )
+
+    def test_context_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.get_context()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["trip"]["title"], "Hike")
+        self.assertEqual(response.data["trip"]["place_detail"]["name"], "Test Place")
+        self.assertNotIn("total_income", response.data["trip"])
+        self.assertEqual(response.data["traveler"]["id"], str(self.traveler.id))
+        self.assertFalse(response.data["already_registered"])
+        self.assertEqual(response.data["payment_instructions"], "Card 1234")
+
+    def test_existing_registration_is_flagged(self):
+        models.UserTrip.objects.create(trip=self.trip, traveler=self.traveler, quoted_price=Decimal("100.00"))
+        response = self.get_context()
+        self.assertTrue(response.data["already_registered"])
+
+    def test_unknown_traveler(self):
+        response = self.get_context(telegram_id="7")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["traveler"])
+        self.assertFalse(response.data["already_registered"])
+
+    def test_invalid_parameters_and_unknown_trip(self):
+        self.assertEqual(self.get_context(telegram_id="abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/bot/registration-context/", {"telegram_id": "42"}).status_code, 400)
+        self.assertEqual(self.get_context(trip=uuid.uuid4()).status_code, 404)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        place = models.Place.objects.create(name="Test Place")
+        self.trip = models.Trip.objects.create(
+            place=place,
+            title="Trip",
+            registration_start=date(2024, 1, 1),
+            registration_end=date(2024, 1, 10),
+            trip_start=date(2024, 1, 15),
+            trip_end=date(2024, 1, 20),
+            default_price=Decimal("100.00"),
+        )
+
+    def _assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+        return etag
+
+    def test_trip_list_and_detail_return_304_until_data_changes(self):
+        list_etag = self._assert_revalidates("/api/trips/")
+        detail_etag = self._assert_revalidates(f"/api/trips/{self.trip.id}/")
+        self.assertNotEqual(list_etag, detail_etag)
+
+        # Expenses feed the financial totals, so they invalidate the trip too.
+        models.Expense.objects.create(trip=self.trip, amount=Decimal("10.00"), incurred_at=date(2024, 1, 16))
+        response = self.client.get(f"/api/trips/{self.trip.id}/", HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_expenses"], Decimal("10.00"))
+        self.assertEqual(self.client.get("/api/trips/", HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+        # Deleting an expense leaves no newer timestamp; the count catches it.
+        detail_etag = self._assert_revalidates(f"/api/trips/{self.trip.id}/")
+        models.Expense.objects.filter(trip=self.trip).delete()
+        response = self.client.get(f"/api/trips/{self.trip.id}/", HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_trip_etag_changes_at_midnight(self):
+        # is_registration_open depends on the date, not on any row.
+        etag = self._assert_revalidates(f"/api/trips/{self.trip.id}/")
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + timedelta(days=1)):
+            response = self.client.get(f"/api/trips/{self.trip.id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_trip_is_confirmed_without_serializing(self):
+        etag = self._assert_revalidates(f"/api/trips/{self.trip.id}/")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f"/api/trips/{self.trip.id}/", HTTP_IF_NONE_MATCH=etag)
+        # Only the watermark query runs; the trip itself is never loaded.
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_settings_etag_changes_on_save(self):
+        etag = self._assert_revalidates("/api/settings/")
+        settings_obj = models.Settings.load()
+        settings_obj.support_contacts = "@support"
+        settings_obj.save()
+        self.assertEqual(self.client.get("/api/settings/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_trip_is_still_not_found(self):
+        self.assertEqual(self.client.get("/api/trips/00000000-0000-0000-0000-000000000000/").status_code, 404)
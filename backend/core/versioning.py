@@ -0,0 +1,25 @@
+"""Version tokens kept in the shared cache to invalidate per-process caches."""
+from __future__ import annotations
+
+import uuid
+
+from django.core.cache import cache
+
+
+def current(key: str) -> str:
+    """Return the token stored under ``key``, creating one if the cache has none.
+
+    A process compares the token it cached data under with this value; any
+    difference means another process changed the data.
+    """
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump(key: str) -> None:
+    """Replace the token so every process drops data cached under the old one."""
+    cache.set(key, uuid.uuid4().hex, timeout=None)
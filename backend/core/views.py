@@ -1,17 +1,22 @@
 """API views for LocTur backend."""
 from __future__ import annotations
 
-from datetime import timedelta
+import time
+import uuid
+from datetime import timedelta, timezone as dt_timezone
 from decimal import Decimal
-
-from django.db.models import Count, Sum
+from typing import Optional
+
+from django.conf import settings as django_settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import BooleanField, Case, Count, Exists, OuterRef, Prefetch, Q, Sum, Value, When
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.dateparse import parse_datetime
 from django.utils import timezone
-from django.db.models.functions import TruncDate
-from django.conf import settings
-import os
-from pathlib import Path
 from rest_framework import mixins, status, viewsets
-from rest_framework.generics import ListAPIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.permissions import IsAdminUser, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -22,10 +27,133 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.middleware.csrf import get_token
 
-from . import filters, models, permissions, serializers
+from . import conditional, fieldsets, filters, media, models, outbox, pagination, permissions, purge, serializers
+
+
+class DeltaSyncMixin:
+    """Let list endpoints return only rows changed since an ``updated_since`` watermark.
+
+    Delta responses are keyset-paginated by ``updated_at`` and carry a ``sync_cursor``
+    to send as the next ``updated_since`` plus ``deleted`` tombstone ids. The cursor
+    trails the server clock by ``DELTA_SYNC_OVERLAP_SECONDS`` so rows committed late
+    are picked up again on the next call; clients must treat rows idempotently.
+    Watermarks older than the tombstone retention window are rejected.
+    """
+
+    sync_query_param = "updated_since"
+
+    def get_sync_watermark(self):
+        if not hasattr(self, "_sync_watermark"):
+            raw_value = self.request.query_params.get(self.sync_query_param)
+            watermark = None
+            if raw_value:
+                watermark = parse_datetime(raw_value)
+                if watermark is None:
+                    raise ValidationError({self.sync_query_param: "Must be an ISO 8601 datetime."})
+                if timezone.is_naive(watermark):
+                    watermark = timezone.make_aware(watermark, dt_timezone.utc)
+                if watermark < models.DeletedRecord.retention_cutoff():
+                    raise ValidationError(
+                        {self.sync_query_param: "Older than the deletion history; run a full sync instead."}
+                    )
+            self._sync_watermark = watermark
+        return self._sync_watermark
+
+    def is_delta_sync(self) -> bool:
+        return self.action == "list" and self.get_sync_watermark() is not None
+
+    def get_cursor_ordering(self):
+        if self.is_delta_sync():
+            return ("updated_at", "id")
+        return self.cursor_ordering
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.is_delta_sync():
+            queryset = queryset.filter(updated_at__gte=self.get_sync_watermark())
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_delta_sync():
+            return super().list(request, *args, **kwargs)
+
+        overlap = timedelta(seconds=getattr(django_settings, "DELTA_SYNC_OVERLAP_SECONDS", 5))
+        sync_cursor = timezone.now() - overlap
+        response = super().list(request, *args, **kwargs)
+        response.data["sync_cursor"] = sync_cursor.isoformat()
+        response.data["deleted"] = [
+            str(object_id)
+            for object_id in models.DeletedRecord.objects.filter(
+                model_name=self.queryset.model._meta.model_name,
+                deleted_at__gte=self.get_sync_watermark(),
+            ).values_list("object_id", flat=True)
+        ]
+        return response
+
+
+class SparseFieldsetMixin:
+    """Shape read responses with ``?fields=``/``?expand=`` and fetch only what they need.
+
+    Serializers drop unrequested fields themselves (``fieldsets.SparseFieldsMixin``);
+    viewsets override ``optimize_queryset`` to add the joins, prefetches and
+    annotations the requested shape needs rather than declaring them on ``queryset``.
+    """
+
+    def get_field_shape(self) -> fieldsets.FieldShape:
+        return fieldsets.FieldShape.from_request(self.request)
+
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset(), self.get_field_shape())
+
+    def optimize_queryset(self, queryset, shape: fieldsets.FieldShape):
+        return queryset
+
+
+class ConditionalGetMixin:
+    """Answer ``If-None-Match``/``If-Modified-Since`` on list and retrieve with 304.
+
+    Subclasses override ``get_validators`` with cheap watermark queries so an
+    unchanged resource is confirmed without serializing it.
+    """
+
+    def get_validators(self) -> Optional[conditional.Validators]:
+        """Return ``(etag, last_modified)`` for the request, or None to skip conditional handling."""
+        return None
+
+    def _conditional_response(self, request):
+        self._validators = None
+        if request.method not in ("GET", "HEAD"):
+            return None
+        self._validators = self.get_validators()
+        if self._validators is None:
+            return None
+        etag, last_modified = self._validators
+        return get_conditional_response(
+            request._request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, "_validators", None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+            # Clients may keep a copy but must revalidate before each use.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(request) or super().retrieve(request, *args, **kwargs)
 
 
-class TravelerViewSet(viewsets.ModelViewSet):
+class TravelerViewSet(DeltaSyncMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """CRUD operations for travelers."""
 
     queryset = models.Traveler.objects.all()
@@ -33,18 +161,25 @@ class TravelerViewSet(viewsets.ModelViewSet):
     filterset_fields = ["telegram_id"]
     search_fields = ["first_name", "last_name", "phone_number", "telegram_handle"]
     permission_classes = [permissions.IsStaffOrBotForWrite]
+    pagination_class = pagination.PageNumberOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
 
 
-class PlaceViewSet(viewsets.ModelViewSet):
+class PlaceViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """CRUD operations for places."""
 
-    queryset = models.Place.objects.prefetch_related("photos").all()
+    queryset = models.Place.objects.all()
     serializer_class = serializers.PlaceSerializer
     permission_classes = [permissions.IsStaffOrReadOnly]
     search_fields = ["name"]
 
+    def optimize_queryset(self, queryset, shape):
+        if shape.includes("photos"):
+            queryset = queryset.prefetch_related("photos")
+        return queryset
+
 
-class PlacePhotoViewSet(viewsets.ModelViewSet):
+class PlacePhotoViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """Manage place photo gallery."""
 
     queryset = models.PlacePhoto.objects.select_related("place").all()
@@ -52,31 +187,85 @@ class PlacePhotoViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
 
 
-class TripViewSet(viewsets.ModelViewSet):
+class TripViewSet(ConditionalGetMixin, DeltaSyncMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """Manage trips."""
 
-    queryset = models.Trip.objects.select_related("place").all()
+    queryset = models.Trip.objects.all()
     serializer_class = serializers.TripSerializer
     filterset_class = filters.TripFilter
     permission_classes = [permissions.IsStaffOrReadOnly]
     ordering_fields = ["trip_start", "trip_end", "created_at"]
     search_fields = ["title", "place__name"]
+    pagination_class = pagination.PageNumberOrCursorPagination
+    cursor_ordering = ("-trip_start", "-id")
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return serializers.TripListSerializer
+        return super().get_serializer_class()
+
+    def optimize_queryset(self, queryset, shape):
+        if shape.includes_any("", serializers.TripSerializer.financial_fields):
+            queryset = queryset.with_financials()
+        if shape.includes("place_detail"):
+            # Lists embed a place summary unless ``?expand=place`` asks for full galleries.
+            if self.action == "list" and not shape.expands("place"):
+                queryset = queryset.select_related("place__cover_photo")
+            else:
+                queryset = queryset.select_related("place").prefetch_related("place__photos")
+        return queryset
 
-
-class UserTripViewSet(viewsets.ModelViewSet):
+    def get_validators(self):
+        if self.action == "list" and self.is_delta_sync():
+            return None
+        try:
+            if self.action == "list":
+                queryset = self.filter_queryset(self.get_queryset())
+            else:
+                queryset = self.get_queryset().filter(pk=self.kwargs[self.lookup_field])
+            watermark = conditional.trip_watermark(queryset)
+        except (DjangoValidationError, ValueError):
+            # Malformed lookups fall through to the regular 404 handling.
+            return None
+        return conditional.make_validators(self.request, watermark) if watermark else None
+
+
+def optimize_user_trip_queryset(queryset, shape: fieldsets.FieldShape):
+    """Fetch the traveler and trip data a ``UserTripSerializer`` of this shape reads."""
+    if shape.includes("traveler_detail"):
+        queryset = queryset.select_related("traveler")
+    if not shape.includes("trip_detail"):
+        return queryset
+    trips = models.Trip.objects.all()
+    if shape.includes_any("trip_detail", serializers.TripSerializer.financial_fields):
+        trips = trips.with_financials()
+    if shape.expands("trip_detail.place"):
+        trips = trips.select_related("place").prefetch_related("place__photos")
+    elif shape.includes("trip_detail.place_detail"):
+        trips = trips.select_related("place__cover_photo")
+    # A separate trip query lets the financial aggregates run once per trip, not per row.
+    return queryset.prefetch_related(Prefetch("trip", queryset=trips))
+
+
+class UserTripViewSet(DeltaSyncMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """Join requests made by travelers."""
 
-    queryset = models.UserTrip.objects.select_related("trip", "traveler").all()
+    queryset = models.UserTrip.objects.all()
     serializer_class = serializers.UserTripSerializer
     filterset_class = filters.UserTripFilter
     permission_classes = [permissions.IsStaffOrBotForWrite]
     ordering_fields = ["created_at", "confirmed_at"]
+    pagination_class = pagination.PageNumberOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
+
+    def optimize_queryset(self, queryset, shape):
+        return optimize_user_trip_queryset(queryset, shape)
 
     def perform_create(self, serializer):
         serializer.save(payment_status=models.UserTrip.PAYMENT_PENDING, status=models.UserTrip.STATUS_PENDING)
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """Manage trip expenses for accounting."""
 
     queryset = models.Expense.objects.select_related("trip", "recorded_by").all()
@@ -86,7 +275,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     ordering_fields = ["incurred_at", "amount"]
 
 
-class TripAnnouncementViewSet(viewsets.ModelViewSet):
+class TripAnnouncementViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """Track announcement events for trips."""
 
     queryset = models.TripAnnouncement.objects.select_related("trip", "sent_by").all()
@@ -94,7 +283,7 @@ class TripAnnouncementViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
 
 
-class BotTokenViewSet(viewsets.ModelViewSet):
+class BotTokenViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """Manage bot tokens used for authenticating Telegram bots."""
 
     queryset = models.BotToken.objects.all()
@@ -117,23 +306,26 @@ class OverviewMetricsView(APIView):
         end_dt = timezone.now().date()
         start_dt = end_dt - timedelta(days=days)
 
-        confirmed_user_trips = models.UserTrip.objects.filter(
-            status=models.UserTrip.STATUS_CONFIRMED, confirmed_at__date__gte=start_dt
-        )
-        income_total = confirmed_user_trips.aggregate(total=Sum("paid_amount"))["total"] or Decimal("0.00")
-
-        expenses_total = (
-            models.Expense.objects.filter(incurred_at__gte=start_dt).aggregate(total=Sum("amount"))["total"]
-            or Decimal("0.00")
+        rollup_rows = (
+            models.DailyFinanceRollup.objects.filter(date__gte=start_dt)
+            .values("date")
+            .annotate(
+                income=Sum("income"),
+                expenses=Sum("expenses"),
+                outstanding=Sum("outstanding"),
+            )
+            .order_by("date")
         )
 
-        outstanding_total = (
-            models.UserTrip.objects.filter(
-                payment_status=models.UserTrip.PAYMENT_PENDING,
-                created_at__date__gte=start_dt,
-            ).aggregate(total=Sum("quoted_price"))["total"]
-            or Decimal("0.00")
-        )
+        income_total = Decimal("0.00")
+        expenses_total = Decimal("0.00")
+        outstanding_total = Decimal("0.00")
+        daily_rows = {}
+        for row in rollup_rows:
+            income_total += row["income"]
+            expenses_total += row["expenses"]
+            outstanding_total += row["outstanding"]
+            daily_rows[row["date"]] = row
 
         active_registrations = (
             models.Trip.objects.filter(status=models.Trip.STATUS_REGISTRATION)
@@ -145,24 +337,15 @@ class OverviewMetricsView(APIView):
         daily_data = []
         current_date = start_dt
         while current_date <= end_dt:
-            # Income for this day
-            daily_income = models.UserTrip.objects.filter(
-                status=models.UserTrip.STATUS_CONFIRMED,
-                confirmed_at__date=current_date
-            ).aggregate(total=Sum("paid_amount"))["total"] or Decimal("0.00")
-            
-            # Expenses for this day
-            daily_expenses = models.Expense.objects.filter(
-                incurred_at=current_date
-            ).aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
-            
+            row = daily_rows.get(current_date)
+            income = row["income"] if row else Decimal("0.00")
+            expenses = row["expenses"] if row else Decimal("0.00")
             daily_data.append({
                 "date": current_date.strftime("%Y-%m-%d"),
-                "income": float(daily_income),
-                "expenses": float(daily_expenses),
-                "net": float(daily_income - daily_expenses)
+                "income": float(income),
+                "expenses": float(expenses),
+                "net": float(income - expenses)
             })
-            
             current_date += timedelta(days=1)
 
         data = {
@@ -183,10 +366,15 @@ class TripParticipantsView(ListAPIView):
     serializer_class = serializers.UserTripSerializer
     permission_classes = [IsAdminUser]
     lookup_url_kwarg = "pk"
+    pagination_class = pagination.PageNumberOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         trip_id = self.kwargs["pk"]
-        return models.UserTrip.objects.filter(trip_id=trip_id).select_related("traveler", "trip")
+        return optimize_user_trip_queryset(
+            models.UserTrip.objects.filter(trip_id=trip_id),
+            fieldsets.FieldShape.from_request(self.request),
+        )
 
 
 class TripAnnouncementToggleView(APIView):
@@ -202,7 +390,7 @@ class TripAnnouncementToggleView(APIView):
             return Response({"detail": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
 
         trip.announce_in_channel = not trip.announce_in_channel
-        trip.save(update_fields=["announce_in_channel"])
+        trip.save(update_fields=["announce_in_channel", "updated_at"])
 
         return Response({"id": str(trip.id), "announce_in_channel": trip.announce_in_channel})
 
@@ -215,7 +403,7 @@ class TripLinkGroupView(APIView):
     def post(self, request, *args, **kwargs):
         trip_id = kwargs.get("pk")
         try:
-            trip = models.Trip.objects.get(id=trip_id)
+            trip = models.Trip.objects.select_related("place").with_financials().get(id=trip_id)
         except models.Trip.DoesNotExist:
             return Response({"detail": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -230,8 +418,8 @@ class TripLinkGroupView(APIView):
 
         invite_link = (request.data.get("invite_link") or "").strip()
 
-        update_fields = ["group_chat_id"]
-        trip.group_chat_id = str(chat_id_int)
+        update_fields = ["group_chat_id", "updated_at"]
+        trip.group_chat_id = chat_id_int
         if invite_link:
             trip.group_invite_link = invite_link
             update_fields.append("group_invite_link")
@@ -257,7 +445,7 @@ class UserTripGroupJoinView(APIView):
         success = bool(request.data.get("success"))
         error_message = request.data.get("error", "")
 
-        update_fields = []
+        update_fields = ["updated_at"]
         if success:
             user_trip.group_joined_at = timezone.now()
             user_trip.group_join_error = ""
@@ -273,6 +461,138 @@ class UserTripGroupJoinView(APIView):
         return Response(serializer.data)
 
 
+class BotJoinRequestLookupView(APIView):
+    """Resolve a Telegram join request to the traveler's confirmed registration for that group."""
+
+    permission_classes = [permissions.IsStaffOrBot]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            chat_id = int(request.query_params.get("chat_id", ""))
+            telegram_id = int(request.query_params.get("telegram_id", ""))
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "chat_id and telegram_id must be numeric."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user_trip = (
+            models.UserTrip.objects.filter(
+                trip__group_chat_id=chat_id,
+                traveler__telegram_id=str(telegram_id),
+                payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+            )
+            .order_by("-confirmed_at")
+            .values("id", "trip_id", "traveler_id", "status", "group_joined_at")
+            .first()
+        )
+        if user_trip is None:
+            return Response({"detail": "No confirmed registration for this group."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            {
+                "id": str(user_trip["id"]),
+                "trip": str(user_trip["trip_id"]),
+                "traveler": str(user_trip["traveler_id"]),
+                "status": user_trip["status"],
+                "group_joined_at": user_trip["group_joined_at"],
+            }
+        )
+
+
+class BotRegistrationContextView(APIView):
+    """Everything the bot needs once a traveler picks a trip, in one response.
+
+    Two queries: the trip with its place summary, and the traveler annotated with
+    whether they already registered for it. Payment instructions come from the
+    cached settings row.
+    """
+
+    permission_classes = [permissions.IsStaffOrBot]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            trip_id = uuid.UUID(request.query_params.get("trip", ""))
+            telegram_id = int(request.query_params.get("telegram_id", ""))
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "trip must be a UUID and telegram_id must be numeric."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        trip = models.Trip.objects.select_related("place__cover_photo").filter(pk=trip_id).first()
+        if trip is None:
+            return Response({"detail": "Trip not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        traveler = (
+            models.Traveler.objects.filter(telegram_id=str(telegram_id))
+            .annotate(
+                already_registered=Exists(
+                    models.UserTrip.objects.filter(traveler=OuterRef("pk"), trip_id=trip.pk)
+                )
+            )
+            .first()
+        )
+        context = {"request": request}
+        return Response(
+            {
+                "trip": serializers.BotTripSummarySerializer(trip, context=context).data,
+                "traveler": serializers.TravelerSerializer(traveler, context=context).data if traveler else None,
+                "already_registered": bool(traveler and traveler.already_registered),
+                "payment_instructions": models.Settings.load().payment_instructions,
+            }
+        )
+
+
+class BotTravelerRegistrationsView(APIView):
+    """A traveler's registrations, flattened for the bot's "my registrations" screen.
+
+    One joined query; ``can_request_invite`` is computed in SQL so the bot does not
+    need trip details to decide which rows get an invite button. Only the newest
+    ``max_results`` rows are returned; ``has_more`` tells the bot older ones exist.
+    """
+
+    permission_classes = [permissions.IsStaffOrBot]
+    max_results = 50
+
+    def get(self, request, telegram_id, *args, **kwargs):
+        has_group = Q(trip__group_chat_id__isnull=False) | ~Q(trip__group_invite_link="")
+        rows = (
+            models.UserTrip.objects.filter(traveler__telegram_id=str(telegram_id))
+            .annotate(
+                can_request_invite=Case(
+                    When(
+                        has_group,
+                        status=models.UserTrip.STATUS_CONFIRMED,
+                        payment_status=models.UserTrip.PAYMENT_CONFIRMED,
+                        then=Value(True),
+                    ),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                )
+            )
+            .order_by("-created_at")
+            .values("id", "trip_id", "trip__title", "status", "payment_status", "can_request_invite")
+        )
+        rows = list(rows[: self.max_results + 1])
+        return Response(
+            {
+                "has_more": len(rows) > self.max_results,
+                "results": [
+                    {
+                        "id": str(row["id"]),
+                        "trip": str(row["trip_id"]),
+                        "title": row["trip__title"],
+                        "status": row["status"],
+                        "payment_status": row["payment_status"],
+                        "can_request_invite": row["can_request_invite"],
+                    }
+                    for row in rows[: self.max_results]
+                ]
+            }
+        )
+
+
 class LoginView(APIView):
     """Handle user login for the admin panel."""
 
@@ -359,50 +679,7 @@ class FileStatsView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        media_root = settings.MEDIA_ROOT
-        
-        # Count files in payment_proofs directory
-        payment_proofs_dir = Path(media_root) / "payment_proofs"
-        payment_proofs_count = 0
-        payment_proofs_size = 0
-        
-        if payment_proofs_dir.exists():
-            for file_path in payment_proofs_dir.iterdir():
-                if file_path.is_file():
-                    payment_proofs_count += 1
-                    payment_proofs_size += file_path.stat().st_size
-        
-        # Count files in place_photos directory
-        place_photos_dir = Path(media_root) / "place_photos"
-        place_photos_count = 0
-        place_photos_size = 0
-        
-        if place_photos_dir.exists():
-            for file_path in place_photos_dir.iterdir():
-                if file_path.is_file():
-                    place_photos_count += 1
-                    place_photos_size += file_path.stat().st_size
-        
-        total_count = payment_proofs_count + place_photos_count
-        total_size = payment_proofs_size + place_photos_size
-        
-        return Response({
-            "payment_proofs": {
-                "count": payment_proofs_count,
-                "size": payment_proofs_size,
-                "size_mb": round(payment_proofs_size / (1024 * 1024), 2)
-            },
-            "place_photos": {
-                "count": place_photos_count,
-                "size": place_photos_size,
-                "size_mb": round(place_photos_size / (1024 * 1024), 2)
-            },
-            "total": {
-                "count": total_count,
-                "size": total_size,
-                "size_mb": round(total_size / (1024 * 1024), 2)
-            }
-        })
+        return Response(media.file_stats())
 
 
 class BulkDeleteFilesView(APIView):
@@ -419,47 +696,13 @@ class BulkDeleteFilesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        media_root = settings.MEDIA_ROOT
-        deleted_files = []
-        
-        # Get all files with their modification times
-        all_files = []
-        
-        for directory in ["payment_proofs", "place_photos"]:
-            dir_path = Path(media_root) / directory
-            if dir_path.exists():
-                for file_path in dir_path.iterdir():
-                    if file_path.is_file():
-                        all_files.append((file_path.stat().st_mtime, file_path))
-        
-        # Sort by modification time (oldest first)
-        all_files.sort(key=lambda x: x[0])
-        
-        # Delete the oldest files
-        files_deleted = 0
-        for _, file_path in all_files:
-            if files_deleted >= count_to_delete:
-                break
-            
-            try:
-                file_size = file_path.stat().st_size
-                file_path.unlink()
-                deleted_files.append({
-                    "path": str(file_path.relative_to(media_root)),
-                    "size": file_size
-                })
-                files_deleted += 1
-            except OSError as e:
-                continue
-        
-        total_size_deleted = sum(f["size"] for f in deleted_files)
-        
-        return Response({
-            "deleted_count": files_deleted,
-            "deleted_size": total_size_deleted,
-            "deleted_size_mb": round(total_size_deleted / (1024 * 1024), 2),
-            "deleted_files": deleted_files
-        })
+        job = models.FilePurgeJob.objects.create(
+            kind=models.FilePurgeJob.KIND_BULK,
+            requested_count=count_to_delete,
+            requested_by=request.user,
+        )
+        purge.enqueue_purge_job(job)
+        return Response(serializers.FilePurgeJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
 class TripFileStatsView(APIView):
@@ -476,55 +719,13 @@ class TripFileStatsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Count payment proof files for this trip
-        user_trips = trip.user_trips.all()
-        payment_proofs_count = 0
-        payment_proofs_size = 0
-        
-        for user_trip in user_trips:
-            if user_trip.payment_proof:
-                try:
-                    file_path = user_trip.payment_proof.path
-                    if os.path.exists(file_path):
-                        payment_proofs_count += 1
-                        payment_proofs_size += os.path.getsize(file_path)
-                except (ValueError, OSError):
-                    continue
-        
-        # Count place photos for this trip's place
-        place_photos_count = 0
-        place_photos_size = 0
-        
-        for photo in trip.place.photos.all():
-            try:
-                file_path = photo.image.path
-                if os.path.exists(file_path):
-                    place_photos_count += 1
-                    place_photos_size += os.path.getsize(file_path)
-            except (ValueError, OSError):
-                continue
-        
-        total_count = payment_proofs_count + place_photos_count
-        total_size = payment_proofs_size + place_photos_size
-        
+        stored_files = models.StoredFile.objects.filter(
+            Q(user_trip__trip=trip) | Q(place_photo__place_id=trip.place_id)
+        )
         return Response({
             "trip_id": str(trip.id),
             "trip_title": trip.title,
-            "payment_proofs": {
-                "count": payment_proofs_count,
-                "size": payment_proofs_size,
-                "size_mb": round(payment_proofs_size / (1024 * 1024), 2)
-            },
-            "place_photos": {
-                "count": place_photos_count,
-                "size": place_photos_size,
-                "size_mb": round(place_photos_size / (1024 * 1024), 2)
-            },
-            "total": {
-                "count": total_count,
-                "size": total_size,
-                "size_mb": round(total_size / (1024 * 1024), 2)
-            }
+            **media.file_stats(stored_files),
         })
 
 
@@ -541,58 +742,80 @@ class TripDeleteFilesView(APIView):
                 {"detail": "Trip not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        deleted_files = []
-        
-        # Delete payment proof files
-        for user_trip in trip.user_trips.all():
-            if user_trip.payment_proof:
-                try:
-                    file_path = user_trip.payment_proof.path
-                    if os.path.exists(file_path):
-                        file_size = os.path.getsize(file_path)
-                        os.remove(file_path)
-                        deleted_files.append({
-                            "type": "payment_proof",
-                            "path": str(user_trip.payment_proof),
-                            "size": file_size
-                        })
-                        # Clear the file field
-                        user_trip.payment_proof = None
-                        user_trip.save()
-                except (ValueError, OSError):
-                    continue
-        
-        # Delete place photos
-        for photo in trip.place.photos.all():
-            try:
-                file_path = photo.image.path
-                if os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    os.remove(file_path)
-                    deleted_files.append({
-                        "type": "place_photo",
-                        "path": str(photo.image),
-                        "size": file_size
-                    })
-                    # Delete the photo record
-                    photo.delete()
-            except (ValueError, OSError):
-                continue
-        
-        total_size_deleted = sum(f["size"] for f in deleted_files)
-        
-        return Response({
-            "trip_id": str(trip.id),
-            "trip_title": trip.title,
-            "deleted_count": len(deleted_files),
-            "deleted_size": total_size_deleted,
-            "deleted_size_mb": round(total_size_deleted / (1024 * 1024), 2),
-            "deleted_files": deleted_files
-        })
 
+        job = models.FilePurgeJob.objects.create(
+            kind=models.FilePurgeJob.KIND_TRIP,
+            trip=trip,
+            requested_by=request.user,
+        )
+        purge.enqueue_purge_job(job)
+        return Response(serializers.FilePurgeJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class FilePurgeJobView(RetrieveAPIView):
+    """Report progress of a background file purge job."""
+
+    queryset = models.FilePurgeJob.objects.all()
+    serializer_class = serializers.FilePurgeJobSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_object(self):
+        job = super().get_object()
+        # A job orphaned by a restarted worker would otherwise be polled forever.
+        if job.status in (models.FilePurgeJob.STATUS_PENDING, models.FilePurgeJob.STATUS_RUNNING):
+            if purge.fail_stale_jobs(models.FilePurgeJob.objects.filter(pk=job.pk)):
+                job.refresh_from_db()
+        return job
+
+
+class OutboxEventListView(APIView):
+    """Long-poll for outbox events; each returned event must be acknowledged.
+
+    ``wait`` holds the request open (up to ``OUTBOX_LONG_POLL_MAX_SECONDS``, a few
+    seconds by default so a worker thread is not held for long) until an event is
+    available. Unacknowledged events are handed out again after the ack timeout.
+    """
+
+    permission_classes = [permissions.IsStaffOrBot]
+    poll_interval = 1.0
+    max_limit = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            wait = float(request.query_params.get("wait", 0))
+            limit = int(request.query_params.get("limit", 20))
+        except (TypeError, ValueError):
+            return Response({"detail": "wait and limit must be numeric."}, status=status.HTTP_400_BAD_REQUEST)
+        wait = min(max(wait, 0), getattr(django_settings, "OUTBOX_LONG_POLL_MAX_SECONDS", 5))
+        limit = min(max(limit, 1), self.max_limit)
+
+        deadline = time.monotonic() + wait
+        events = outbox.claim_events(limit)
+        while not events and time.monotonic() < deadline:
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+            events = outbox.claim_events(limit)
+
+        serializer = serializers.OutboxEventSerializer(events, many=True, context={"request": request})
+        return Response({"results": serializer.data})
+
+
+class OutboxEventAckView(APIView):
+    """Acknowledge delivered outbox events so they are not handed out again."""
 
-class SettingsViewSet(viewsets.ModelViewSet):
+    permission_classes = [permissions.IsStaffOrBot]
+
+    def post(self, request, *args, **kwargs):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return Response({"detail": "ids must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            event_ids = [uuid.UUID(str(value)) for value in ids]
+        except ValueError:
+            return Response({"detail": "ids must be UUIDs."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"acknowledged": outbox.acknowledge(event_ids)})
+
+
+class SettingsViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """CRUD operations for application settings."""
 
     queryset = models.Settings.objects.all()
@@ -601,25 +824,15 @@ class SettingsViewSet(viewsets.ModelViewSet):
 
     def get_object(self):
         """Get or create the single settings instance."""
-        settings_obj, created = models.Settings.objects.get_or_create(
-            defaults={
-                'payment_instructions': 'Send payment screenshot to the bot.',
-                'support_contacts': ''
-            }
-        )
-        return settings_obj
+        return models.Settings.load()
 
-    def list(self, request, *args, **kwargs):
-        """Return the single settings instance."""
+    def get_validators(self):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return conditional.make_validators(self.request, [instance.pk, instance.updated_at])
 
-    def retrieve(self, request, *args, **kwargs):
+    def list(self, request, *args, **kwargs):
         """Return the single settings instance."""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return self.retrieve(request, *args, **kwargs)
 
     def update(self, request, *args, **kwargs):
         """Update the single settings instance."""
@@ -656,12 +869,7 @@ class SettingsUpdateView(APIView):
     
     def put(self, request):
         """Update the settings instance."""
-        settings_obj, created = models.Settings.objects.get_or_create(
-            defaults={
-                'payment_instructions': 'Send payment screenshot to the bot.',
-                'support_contacts': ''
-            }
-        )
+        settings_obj = models.Settings.load()
         serializer = serializers.SettingsSerializer(settings_obj, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
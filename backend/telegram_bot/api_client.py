@@ -1,8 +1,16 @@
 """Async HTTP client for interacting with the LocTur backend."""
 from __future__ import annotations
 
+import asyncio
+import copy
+import importlib.util
 import logging
-from typing import Any, Dict, Iterable, List, Optional
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 import httpx
 
@@ -18,20 +26,327 @@ class APIClientError(RuntimeError):
         self.payload = payload
 
 
+@dataclass
+class StreamingUpload:
+    """A file streamed into a multipart request body as ``chunks`` arrive.
+
+    ``size`` must be the exact byte count, since the backend needs a Content-Length;
+    the upload is aborted if the chunks come out longer or shorter.
+    """
+
+    field: str
+    filename: str
+    content_type: str
+    size: int
+    chunks: AsyncIterator[bytes]
+
+
+def _multipart_param(value: str) -> str:
+    return value.replace("\r", " ").replace("\n", " ").replace('"', "%22")
+
+
+def _streaming_multipart(data: Dict[str, Any], upload: StreamingUpload) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """Build headers and a body generator for ``data`` plus one streamed file field."""
+    boundary = uuid.uuid4().hex
+    head = b"".join(
+        (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{_multipart_param(str(name))}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode("utf-8")
+        for name, value in data.items()
+    )
+    head += (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{_multipart_param(upload.field)}"; '
+        f'filename="{_multipart_param(upload.filename)}"\r\n'
+        f"Content-Type: {upload.content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        sent = 0
+        async for chunk in upload.chunks:
+            sent += len(chunk)
+            if sent > upload.size:
+                raise APIClientError(f"Upload {upload.filename} is larger than the declared {upload.size} bytes.")
+            yield chunk
+        if sent != upload.size:
+            raise APIClientError(f"Upload {upload.filename} ended after {sent} of {upload.size} bytes.")
+        yield tail
+
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + upload.size + len(tail)),
+    }
+    return headers, body()
+
+
+class ResponseCache:
+    """Bounded LRU of GET responses that carried validators, for conditional revalidation."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: OrderedDict[Tuple[str, Tuple], Tuple[Dict[str, str], Any]] = OrderedDict()
+
+    @staticmethod
+    def key(url: str, params: dict | None) -> Tuple[str, Tuple]:
+        return str(url), tuple(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+
+    def validators(self, key: Tuple[str, Tuple]) -> Dict[str, str]:
+        entry = self._entries.get(key)
+        return dict(entry[0]) if entry else {}
+
+    def get(self, key: Tuple[str, Tuple]) -> Tuple[bool, Any]:
+        """Return ``(found, data)``; callers may mutate ``data``, so it is a copy."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        self._entries.move_to_end(key)
+        return True, copy.deepcopy(entry[1])
+
+    def store(self, key: Tuple[str, Tuple], response: httpx.Response, data: Any) -> None:
+        headers = {}
+        if response.headers.get("etag"):
+            headers["If-None-Match"] = response.headers["etag"]
+        if response.headers.get("last-modified"):
+            headers["If-Modified-Since"] = response.headers["last-modified"]
+        if not headers or self.max_size <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (headers, copy.deepcopy(data))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class CircuitBreaker:
+    """Fail fast after repeated backend failures, probing again after ``reset_timeout``.
+
+    ``closed`` passes every call; ``failure_threshold`` consecutive failures switch
+    to ``open``, which rejects calls until the timeout elapses; then ``half_open``
+    lets a single probe through and its outcome closes or reopens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.failure_threshold <= 0 or self.consecutive_failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """End a call that finished without an outcome (e.g. cancelled), freeing the probe slot."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        was_closed = self.state == self.CLOSED
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.consecutive_failures >= self.failure_threshold > 0:
+            self._opened_at = time.monotonic()
+            if was_closed:
+                self.times_opened += 1
+                logger.warning(
+                    "Backend circuit opened after %s consecutive failures", self.consecutive_failures
+                )
+
+
 class APIClient:
-    """Lightweight wrapper around the backend API for bot operations."""
+    """Lightweight wrapper around the backend API for bot operations.
+
+    Requests share a bounded keep-alive connection pool. Idempotent methods are
+    retried with jittered exponential back-off on transport errors and 502/503/504,
+    and a circuit breaker rejects calls while the backend keeps failing.
+    """
 
-    def __init__(self, base_url: str, bot_token: str, *, timeout: float = 30.0):
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+    def __init__(
+        self,
+        base_url: str,
+        bot_token: str,
+        *,
+        timeout: float = 10.0,
+        endpoint_timeouts: Dict[str, float] | None = None,
+        cache_size: int = 256,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        max_retries: int = 2,
+        retry_backoff: float = 0.25,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
         if not base_url.endswith("/"):
             base_url = f"{base_url}/"
-        self._client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+            http2 = False
+        self._base_url = base_url
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=base_url, timeout=timeout, limits=self._limits, http2=http2, transport=transport
+        )
         self._headers = {"X-Bot-Token": bot_token}
+        self._cache = ResponseCache(cache_size)
+        # Longest prefix first so "user-trips/x/" beats "user-trips/".
+        self._endpoint_timeouts = sorted((endpoint_timeouts or {}).items(), key=lambda item: -len(item[0]))
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._breaker = CircuitBreaker(
+            failure_threshold=breaker_failure_threshold,
+            reset_timeout=breaker_reset_timeout,
+        )
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
 
     async def aclose(self) -> None:
         await self._client.aclose()
 
-    async def _request(self, method: str, url: str, *, params: dict | None = None, data: dict | None = None, files: dict | None = None) -> Any:
-        response = await self._client.request(method, url, params=params, data=data, files=files, headers=self._headers)
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of pool usage, request counters and breaker state."""
+        max_connections = self._limits.max_connections or 0
+        return {
+            **self._counters,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "max_connections": max_connections,
+            "pool_saturation": round(self._in_flight / max_connections, 2) if max_connections else 0.0,
+            "breaker_state": self._breaker.state,
+            "breaker_consecutive_failures": self._breaker.consecutive_failures,
+            "breaker_times_opened": self._breaker.times_opened,
+        }
+
+    def _timeout_for(self, url: str) -> Optional[float]:
+        path = str(url)
+        if path.startswith(self._base_url):
+            path = path[len(self._base_url):]
+        for prefix, timeout in self._endpoint_timeouts:
+            if path.startswith(prefix):
+                return timeout
+        return None
+
+    async def _send(self, method: str, url: str, *, timeout: float | None = None, **kwargs: Any) -> httpx.Response:
+        """Send one logical request through the breaker, retrying idempotent methods."""
+        if timeout is None:
+            timeout = self._timeout_for(url)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        retries = self._max_retries if method in self.IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            if not self._breaker.allow():
+                self._counters["rejected"] += 1
+                raise APIClientError("Backend API unavailable (circuit open)", status_code=None)
+
+            self._counters["requests"] += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError as exc:
+                self._breaker.record_failure()
+                self._counters["failures"] += 1
+                if attempt >= retries:
+                    raise APIClientError(f"Backend API request failed: {exc}", status_code=None) from exc
+                failure = str(exc) or exc.__class__.__name__
+            except BaseException:
+                # Cancellation or a non-transport error says nothing about the backend,
+                # but a half-open probe must not stay claimed forever.
+                self._breaker.release()
+                raise
+            else:
+                if response.status_code < 500:
+                    self._breaker.record_success()
+                    return response
+                self._breaker.record_failure()
+                self._counters["failures"] += 1
+                if attempt >= retries or response.status_code not in self.RETRY_STATUS_CODES:
+                    return response
+                failure = f"status {response.status_code}"
+            finally:
+                self._in_flight -= 1
+
+            attempt += 1
+            self._counters["retries"] += 1
+            delay = random.uniform(0, self._retry_backoff * (2 ** attempt))
+            logger.info(
+                "Retrying %s %s in %.2fs after %s (attempt %s/%s)", method, url, delay, failure, attempt, retries
+            )
+            await asyncio.sleep(delay)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict | None = None,
+        data: dict | None = None,
+        files: dict | None = None,
+        json: Any | None = None,
+        content: Any | None = None,
+        extra_headers: Dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> Any:
+        headers = {**self._headers, **(extra_headers or {})}
+        cache_key = None
+        if method == "GET":
+            cache_key = self._cache.key(url, params)
+            headers.update(self._cache.validators(cache_key))
+        response = await self._send(
+            method,
+            url,
+            params=params,
+            data=data,
+            files=files,
+            json=json,
+            content=content,
+            headers=headers,
+            timeout=timeout,
+        )
+        if response.status_code == 304 and cache_key is not None:
+            found, cached = self._cache.get(cache_key)
+            if found:
+                return cached
+            # Evicted by a concurrent request while this one was in flight; fetch in full.
+            response = await self._send(method, url, params=params, headers=self._headers, timeout=timeout)
         if response.status_code >= 400:
             content_type = response.headers.get("content-type", "")
             detail: Any
@@ -48,8 +363,12 @@ class APIClient:
         if response.status_code == 204:
             return None
         if response.headers.get("content-type", "").startswith("application/json"):
-            return response.json()
-        return response.text
+            result = response.json()
+        else:
+            result = response.text
+        if cache_key is not None:
+            self._cache.store(cache_key, response, result)
+        return result
 
     async def _paginate(self, url: str, *, params: dict | None = None) -> List[dict]:
         items: List[dict] = []
@@ -69,11 +388,26 @@ class APIClient:
                 break
         return items
 
-    async def get_traveler_by_telegram_id(self, telegram_id: str) -> Optional[dict]:
-        data = await self._request("GET", "travelers/", params={"telegram_id": telegram_id})
-        if isinstance(data, dict) and data.get("results"):
-            return data["results"][0]
-        return None
+    async def sync_changes(self, url: str, *, since: str, params: dict | None = None) -> Dict[str, Any]:
+        """Fetch rows changed since the ``since`` watermark, following every page.
+
+        Returns ``{"results": [...], "deleted": [...], "sync_cursor": str}``; pass the
+        returned cursor as ``since`` on the next call.
+        """
+        results: List[dict] = []
+        deleted: List[str] = []
+        sync_cursor = since
+        next_url: Optional[str] = url
+        query_params: dict | None = {**(params or {}), "updated_since": since}
+
+        while next_url:
+            data = await self._request("GET", next_url, params=query_params)
+            results.extend(data.get("results") or [])
+            deleted.extend(data.get("deleted") or [])
+            sync_cursor = data.get("sync_cursor") or sync_cursor
+            next_url = data.get("next")
+            query_params = None  # already included in next
+        return {"results": results, "deleted": list(dict.fromkeys(deleted)), "sync_cursor": sync_cursor}
 
     async def create_traveler(self, payload: Dict[str, Any]) -> dict:
         return await self._request("POST", "travelers/", data=payload)
@@ -87,18 +421,66 @@ class APIClient:
             params["status"] = status
         return await self._paginate("trips/", params=params)
 
-    async def get_trip(self, trip_id: str) -> dict:
-        return await self._request("GET", f"trips/{trip_id}/")
-
-    async def create_user_trip(self, payload: Dict[str, Any], *, files: Dict[str, Any]) -> dict:
+    async def create_user_trip(
+        self,
+        payload: Dict[str, Any],
+        *,
+        files: Dict[str, Any] | None = None,
+        upload: StreamingUpload | None = None,
+    ) -> dict:
+        if upload is not None:
+            headers, body = _streaming_multipart(payload, upload)
+            return await self._request("POST", "user-trips/", content=body, extra_headers=headers)
         return await self._request("POST", "user-trips/", data=payload, files=files)
 
-    async def list_user_trips(self, *, filters: Dict[str, Any]) -> List[dict]:
-        return await self._paginate("user-trips/", params=filters)
+    async def fetch_events(self, *, wait: float = 0, limit: int = 20) -> List[dict]:
+        """Long-poll the backend outbox; returned events must be passed to ``ack_events``."""
+        data = await self._request(
+            "GET",
+            "events/",
+            params={"wait": wait, "limit": limit},
+            timeout=wait + (self._client.timeout.read or 30.0),
+        )
+        return (data or {}).get("results") or []
+
+    async def ack_events(self, event_ids: Iterable[str]) -> int:
+        data = await self._request("POST", "events/ack/", json={"ids": list(event_ids)})
+        return (data or {}).get("acknowledged", 0)
+
+    async def sync_user_trips(self, *, since: str, filters: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        return await self.sync_changes("user-trips/", since=since, params=filters)
 
     async def get_user_trip(self, user_trip_id: str) -> dict:
         return await self._request("GET", f"user-trips/{user_trip_id}/")
 
+    async def resolve_join_request(self, *, chat_id: int, telegram_id: int) -> Optional[dict]:
+        """Return the confirmed registration matching a group join request, or None."""
+        try:
+            return await self._request(
+                "GET",
+                "bot/join-requests/",
+                params={"chat_id": chat_id, "telegram_id": telegram_id},
+            )
+        except APIClientError as exc:
+            if exc.status_code == 404:
+                return None
+            raise
+
+    async def get_registration_context(self, trip_id: str, telegram_id: int | str) -> dict:
+        """Trip summary, traveler (or ``None``), ``already_registered`` and payment instructions."""
+        return await self._request(
+            "GET", "bot/registration-context/", params={"trip": trip_id, "telegram_id": telegram_id}
+        )
+
+    async def list_traveler_registrations(self, telegram_id: int | str) -> Dict[str, Any]:
+        """The newest flat registration rows (title, statuses, ``can_request_invite``) for a Telegram user.
+
+        Returns ``{"results": [...], "has_more": bool}``; the backend caps ``results``
+        and sets ``has_more`` when older registrations were left out.
+        """
+        data = await self._request("GET", f"bot/travelers/{telegram_id}/registrations/") or {}
+        return {"results": data.get("results", []), "has_more": bool(data.get("has_more"))}
+
     async def report_group_join(self, user_trip_id: str, *, success: bool, error: str | None = None) -> dict:
         data = {"success": "true" if success else "false"}
         if not success:
@@ -12,10 +12,13 @@ except ImportError:  # pragma: no cover - compatibility fallback
     DefaultBotProperties = None  # type: ignore
 
 from .api_client import APIClient
+from .catalogue import TripCatalogue
 from .config import BotConfig, load_config
+from .events import consume_events
 from .handlers import router as handlers_router
 from .poller import poll_group_join_queue
 from .runtime import clear_bot_data, get_bot_data, set_bot_data
+from .store import BotStateStore
 
 
 async def _setup_logging() -> None:
@@ -28,17 +31,45 @@ async def _setup_logging() -> None:
 async def _on_startup(bot: Bot) -> None:
     api_client: APIClient = get_bot_data(bot, "api_client")
     config: BotConfig = get_bot_data(bot, "config")
-    set_bot_data(bot, "pending_group_joins", {})
-    set_bot_data(bot, "group_join_task", asyncio.create_task(poll_group_join_queue(bot, api_client, config)))
+    store = BotStateStore(
+        config.state_db_path,
+        processed_ttl=config.processed_ids_ttl_seconds,
+        pending_join_ttl=config.pending_join_ttl_seconds,
+        max_entries=config.state_max_entries,
+    )
+    store.prune()
+    set_bot_data(bot, "state_store", store)
+    set_bot_data(bot, "pending_group_joins", store.pending_joins)
+    # Shared so the event consumer and the reconciliation sweep do not invite twice.
+    processed_ids = store.processed_ids
+    set_bot_data(bot, "events_task", asyncio.create_task(consume_events(bot, api_client, config, processed_ids)))
+    set_bot_data(
+        bot,
+        "group_join_task",
+        asyncio.create_task(poll_group_join_queue(bot, api_client, config, processed_ids)),
+    )
+    if config.api_metrics_log_interval_seconds > 0:
+        set_bot_data(bot, "metrics_task", asyncio.create_task(_log_api_metrics(api_client, config)))
     logging.getLogger(__name__).info("Telegram bot started.")
 
 
+async def _log_api_metrics(api_client: APIClient, config: BotConfig) -> None:
+    logger = logging.getLogger(__name__)
+    while True:
+        await asyncio.sleep(config.api_metrics_log_interval_seconds)
+        logger.info("Backend API client metrics: %s", api_client.metrics())
+
+
 async def _on_shutdown(bot: Bot) -> None:
-    task: asyncio.Task | None = get_bot_data(bot, "group_join_task")
-    if task:
-        task.cancel()
-        with suppress(asyncio.CancelledError):
-            await task
+    for key in ("events_task", "group_join_task", "metrics_task"):
+        task: asyncio.Task | None = get_bot_data(bot, key)
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    store: BotStateStore | None = get_bot_data(bot, "state_store")
+    if store:
+        store.close()
     api_client: APIClient = get_bot_data(bot, "api_client")
     await api_client.aclose()
     clear_bot_data(bot)
@@ -48,7 +79,20 @@ async def _on_shutdown(bot: Bot) -> None:
 async def main() -> None:
     await _setup_logging()
     config = load_config()
-    api_client = APIClient(config.backend_api_base, config.backend_bot_token)
+    api_client = APIClient(
+        config.backend_api_base,
+        config.backend_bot_token,
+        timeout=config.api_timeout_seconds,
+        endpoint_timeouts=config.api_endpoint_timeouts,
+        max_connections=config.api_max_connections,
+        max_keepalive_connections=config.api_max_keepalive_connections,
+        keepalive_expiry=config.api_keepalive_expiry_seconds,
+        http2=config.api_http2,
+        max_retries=config.api_max_retries,
+        retry_backoff=config.api_retry_backoff_seconds,
+        breaker_failure_threshold=config.api_breaker_failure_threshold,
+        breaker_reset_timeout=config.api_breaker_reset_seconds,
+    )
     if DefaultBotProperties:
         bot = Bot(config.telegram_token, default=DefaultBotProperties(parse_mode="HTML"))
     else:
@@ -59,6 +103,16 @@ async def main() -> None:
 
     set_bot_data(bot, "api_client", api_client)
     set_bot_data(bot, "config", config)
+    set_bot_data(
+        bot,
+        "trip_catalogue",
+        TripCatalogue(
+            api_client,
+            status=config.trips_status_filter,
+            ttl=config.trip_cache_ttl_seconds,
+            stale_ttl=config.trip_cache_stale_seconds,
+        ),
+    )
 
     dp.startup.register(_on_startup)
     dp.shutdown.register(_on_shutdown)
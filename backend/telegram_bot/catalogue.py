@@ -0,0 +1,66 @@
+"""Short-lived cache of open trips shared by every bot conversation."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from .api_client import APIClient
+
+logger = logging.getLogger(__name__)
+
+
+class TripCatalogue:
+    """TTL cache of the trip list with single-flight refresh and stale-while-revalidate.
+
+    Within ``ttl`` the cached list is served as is. Past it, callers get the stale
+    list straight away while one background refresh runs, for up to ``stale_ttl``;
+    older data is only served if the backend is failing. Concurrent callers never
+    trigger more than one backend fetch.
+    """
+
+    def __init__(self, api_client: APIClient, *, status: str | None, ttl: float, stale_ttl: float):
+        self.api_client = api_client
+        self.status = status
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._trips: Optional[List[dict]] = None
+        self._fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _age(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    async def list_trips(self) -> List[dict]:
+        if self._trips is not None:
+            age = self._age()
+            if age < self.ttl:
+                return list(self._trips)
+            if age < self.ttl + self.stale_ttl:
+                self._start_refresh()
+                return list(self._trips)
+        try:
+            await asyncio.shield(self._start_refresh())
+        except Exception as exc:
+            if self._trips is None:
+                raise
+            logger.warning("Serving trips cached %.0fs ago; refresh failed: %s", self._age(), exc)
+        return list(self._trips)
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(_log_refresh_failure)
+        return self._refresh_task
+
+    async def _refresh(self) -> None:
+        trips = await self.api_client.list_trips(status=self.status)
+        self._trips = trips
+        self._fetched_at = time.monotonic()
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    # Background refreshes have no awaiting caller; retrieve the error so it is not lost.
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Trip catalogue refresh failed: %s", task.exception())
@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict
 
 
 @dataclass(slots=True)
@@ -12,8 +13,33 @@ class BotConfig:
     telegram_token: str
     backend_api_base: str
     backend_bot_token: str
-    poll_interval_seconds: int = 30
+    poll_interval_seconds: int = 300
+    events_wait_seconds: int = 5
+    events_idle_delay_seconds: float = 5.0
+    invite_concurrency: int = 8
+    telegram_global_rate: float = 30.0
+    telegram_private_chat_rate: float = 1.0
+    telegram_group_chat_rate: float = 20 / 60
+    state_db_path: str = "bot_state.sqlite3"
+    processed_ids_ttl_seconds: int = 7 * 24 * 3600
+    pending_join_ttl_seconds: int = 7 * 24 * 3600
+    state_max_entries: int = 50000
+    api_timeout_seconds: float = 10.0
+    api_endpoint_timeouts: Dict[str, float] = field(default_factory=lambda: {"user-trips/": 60.0})
+    api_max_connections: int = 20
+    api_max_keepalive_connections: int = 10
+    api_keepalive_expiry_seconds: float = 30.0
+    api_http2: bool = False
+    api_max_retries: int = 2
+    api_retry_backoff_seconds: float = 0.25
+    api_breaker_failure_threshold: int = 5
+    api_breaker_reset_seconds: float = 30.0
+    api_metrics_log_interval_seconds: int = 300
     trips_status_filter: str = "registration"
+    trip_cache_ttl_seconds: int = 60
+    trip_cache_stale_seconds: int = 600
+    payment_proof_max_bytes: int = 10 * 1024 * 1024
+    defer_payment_proof_fetch: bool = True
 
 
 def _get_env(name: str, default: str | None = None, *, required: bool = False) -> str:
@@ -25,19 +51,79 @@ def _get_env(name: str, default: str | None = None, *, required: bool = False) -
     return value
 
 
+def _parse_timeouts(value: str) -> Dict[str, float]:
+    """Parse ``"user-trips/=60,trips/=5"`` into a prefix-to-seconds mapping."""
+    timeouts: Dict[str, float] = {}
+    for item in value.split(","):
+        prefix, _, seconds = item.strip().partition("=")
+        if prefix and seconds:
+            timeouts[prefix.strip()] = float(seconds)
+    return timeouts
+
+
 def load_config() -> BotConfig:
     """Load configuration from environment variables."""
 
     telegram_token = _get_env("TELEGRAM_BOT_TOKEN", required=True)
     backend_api_base = _get_env("BACKEND_API_BASE_URL", "http://localhost:8000/api/")
     backend_bot_token = _get_env("BACKEND_BOT_TOKEN", required=True)
-    poll_interval_seconds = int(_get_env("GROUP_POLL_INTERVAL", "30"))
+    poll_interval_seconds = int(_get_env("GROUP_POLL_INTERVAL", "300"))
+    events_wait_seconds = int(_get_env("EVENTS_WAIT_SECONDS", "5"))
+    events_idle_delay_seconds = float(_get_env("EVENTS_IDLE_DELAY", "5"))
+    invite_concurrency = int(_get_env("INVITE_CONCURRENCY", "8"))
+    telegram_global_rate = float(_get_env("TELEGRAM_GLOBAL_RATE", "30"))
+    telegram_private_chat_rate = float(_get_env("TELEGRAM_PRIVATE_CHAT_RATE", "1"))
+    telegram_group_chat_rate = float(_get_env("TELEGRAM_GROUP_CHAT_RATE", str(20 / 60)))
+    state_db_path = _get_env("BOT_STATE_DB", "bot_state.sqlite3")
+    processed_ids_ttl_seconds = int(_get_env("PROCESSED_IDS_TTL", str(7 * 24 * 3600)))
+    pending_join_ttl_seconds = int(_get_env("PENDING_JOIN_TTL", str(7 * 24 * 3600)))
+    state_max_entries = int(_get_env("BOT_STATE_MAX_ENTRIES", "50000"))
+    api_timeout_seconds = float(_get_env("API_TIMEOUT", "10"))
+    api_endpoint_timeouts = _parse_timeouts(_get_env("API_ENDPOINT_TIMEOUTS", "user-trips/=60"))
+    api_max_connections = int(_get_env("API_MAX_CONNECTIONS", "20"))
+    api_max_keepalive_connections = int(_get_env("API_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    api_keepalive_expiry_seconds = float(_get_env("API_KEEPALIVE_EXPIRY", "30"))
+    api_http2 = _get_env("API_HTTP2", "false").lower() in {"1", "true", "yes"}
+    api_max_retries = int(_get_env("API_MAX_RETRIES", "2"))
+    api_retry_backoff_seconds = float(_get_env("API_RETRY_BACKOFF", "0.25"))
+    api_breaker_failure_threshold = int(_get_env("API_BREAKER_FAILURES", "5"))
+    api_breaker_reset_seconds = float(_get_env("API_BREAKER_RESET", "30"))
+    api_metrics_log_interval_seconds = int(_get_env("API_METRICS_LOG_INTERVAL", "300"))
     trips_status_filter = _get_env("TRIP_STATUS_FILTER", "registration")
+    trip_cache_ttl_seconds = int(_get_env("TRIP_CACHE_TTL", "60"))
+    trip_cache_stale_seconds = int(_get_env("TRIP_CACHE_STALE_TTL", "600"))
+    payment_proof_max_bytes = int(_get_env("PAYMENT_PROOF_MAX_BYTES", str(10 * 1024 * 1024)))
+    defer_payment_proof_fetch = _get_env("DEFER_PAYMENT_PROOF_FETCH", "true").lower() in {"1", "true", "yes"}
 
     return BotConfig(
         telegram_token=telegram_token,
         backend_api_base=backend_api_base.rstrip("/") + "/",
         backend_bot_token=backend_bot_token,
         poll_interval_seconds=poll_interval_seconds,
+        events_wait_seconds=events_wait_seconds,
+        events_idle_delay_seconds=events_idle_delay_seconds,
+        invite_concurrency=invite_concurrency,
+        telegram_global_rate=telegram_global_rate,
+        telegram_private_chat_rate=telegram_private_chat_rate,
+        telegram_group_chat_rate=telegram_group_chat_rate,
+        state_db_path=state_db_path,
+        processed_ids_ttl_seconds=processed_ids_ttl_seconds,
+        pending_join_ttl_seconds=pending_join_ttl_seconds,
+        state_max_entries=state_max_entries,
+        api_timeout_seconds=api_timeout_seconds,
+        api_endpoint_timeouts=api_endpoint_timeouts,
+        api_max_connections=api_max_connections,
+        api_max_keepalive_connections=api_max_keepalive_connections,
+        api_keepalive_expiry_seconds=api_keepalive_expiry_seconds,
+        api_http2=api_http2,
+        api_max_retries=api_max_retries,
+        api_retry_backoff_seconds=api_retry_backoff_seconds,
+        api_breaker_failure_threshold=api_breaker_failure_threshold,
+        api_breaker_reset_seconds=api_breaker_reset_seconds,
+        api_metrics_log_interval_seconds=api_metrics_log_interval_seconds,
         trips_status_filter=trips_status_filter,
+        trip_cache_ttl_seconds=trip_cache_ttl_seconds,
+        trip_cache_stale_seconds=trip_cache_stale_seconds,
+        payment_proof_max_bytes=payment_proof_max_bytes,
+        defer_payment_proof_fetch=defer_payment_proof_fetch,
     )
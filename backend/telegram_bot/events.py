@@ -0,0 +1,79 @@
+"""Consume backend outbox events pushed over the `/events/` long-poll."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, MutableSet, Optional
+
+from aiogram import Bot
+
+from .api_client import APIClient
+from .config import BotConfig
+from .group_invites import dispatch_group_invites
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_PAYMENT_CONFIRMED = "payment_confirmed"
+ERROR_BACKOFF_SECONDS = 5
+
+
+async def consume_events(
+    bot: Bot,
+    api_client: APIClient,
+    config: BotConfig,
+    processed_ids: MutableSet[str],
+) -> None:
+    """Wait for outbox events and handle them as they arrive."""
+
+    while True:
+        try:
+            events = await api_client.fetch_events(wait=config.events_wait_seconds)
+        except Exception as exc:  # pragma: no cover - upstream errors logged in API client
+            logger.error("Failed to fetch backend events: %s", exc)
+            await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+            continue
+        if not events:
+            # The backend only waits briefly; pause here instead of holding its workers.
+            await asyncio.sleep(config.events_idle_delay_seconds)
+            continue
+
+        handled = []
+        invites = []
+        for event in events:
+            if event.get("event_type") == EVENT_PAYMENT_CONFIRMED:
+                user_trip = _pending_invite(event, processed_ids)
+                if user_trip is not None:
+                    invites.append(user_trip)
+            handled.append(event["id"])
+
+        # Invite failures are recorded on the registration; the reconciliation sweep retries them.
+        try:
+            await dispatch_group_invites(
+                bot,
+                api_client,
+                invites,
+                processed_ids,
+                concurrency=config.invite_concurrency,
+            )
+        except Exception:  # pragma: no cover - defensive logging
+            logger.exception("Unexpected error while dispatching invites for events")
+            continue
+
+        # Unacknowledged events are redelivered by the backend after the ack timeout.
+        if handled:
+            try:
+                await api_client.ack_events(handled)
+            except Exception as exc:  # pragma: no cover - upstream errors logged in API client
+                logger.error("Failed to acknowledge events: %s", exc)
+
+
+def _pending_invite(event: Dict[str, Any], processed_ids: MutableSet[str]) -> Optional[Dict[str, Any]]:
+    """Return the registration to invite for a confirmation event, if it still needs one."""
+    user_trip = event.get("user_trip") or {}
+    user_trip_id = user_trip.get("id")
+    if not user_trip_id or user_trip_id in processed_ids or user_trip.get("group_joined_at"):
+        return None
+    if "awaiting traveler to join" in (user_trip.get("group_join_error") or "").lower():
+        return None
+    return user_trip
@@ -1,17 +1,23 @@
 """Utilities for sending group invite links to travelers."""
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, MutableMapping, MutableSet, Tuple
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from .api_client import APIClient
+from .ratelimit import get_rate_limiter
 from .runtime import get_bot_data, set_bot_data
 from . import strings
 
+logger = logging.getLogger(__name__)
+
 
 async def send_group_invite(
     bot: Bot,
@@ -22,6 +28,7 @@ async def send_group_invite(
 
     Returns (success, error_message). On success the error message is None.
     """
+    limiter = get_rate_limiter(bot)
     trip = user_trip.get("trip_detail") or {}
     traveler = user_trip.get("traveler_detail") or {}
 
@@ -61,7 +68,9 @@ async def send_group_invite(
             return False, error
 
         try:
-            invite = await bot.create_chat_invite_link(
+            # Creating a link posts nothing in the group, so the per-group message budget does not apply.
+            invite = await limiter.call_global(
+                bot.create_chat_invite_link,
                 chat_id=chat_id,
                 creates_join_request=True,
                 member_limit=1,
@@ -71,7 +80,8 @@ async def send_group_invite(
             # Telegram disallows member_limit when join requests are enabled; retry without it.
             if "member limit" in error_text.lower():
                 try:
-                    invite = await bot.create_chat_invite_link(
+                    invite = await limiter.call_global(
+                        bot.create_chat_invite_link,
                         chat_id=chat_id,
                         creates_join_request=True,
                     )
@@ -93,7 +103,14 @@ async def send_group_invite(
     message = strings.PAYMENT_CONFIRMED_MESSAGE.format(trip_title=trip.get('title'))
 
     try:
-        await bot.send_message(user_id, message, reply_markup=markup, disable_web_page_preview=True)
+        await limiter.call(
+            user_id,
+            bot.send_message,
+            user_id,
+            message,
+            reply_markup=markup,
+            disable_web_page_preview=True,
+        )
     except TelegramForbiddenError:
         error = strings.BOT_CANNOT_MESSAGE_TRAVELER
         await api_client.report_group_join(user_trip["id"], success=False, error=error)
@@ -107,8 +124,56 @@ async def send_group_invite(
     )
 
     if chat_id is not None:
-        pending_map: Dict[Tuple[int, int], str] = get_bot_data(bot, "pending_group_joins") or {}
+        pending_map: MutableMapping[Tuple[int, int], str] | None = get_bot_data(bot, "pending_group_joins")
+        if pending_map is None:
+            pending_map = {}
+            set_bot_data(bot, "pending_group_joins", pending_map)
         pending_map[(chat_id, user_id)] = user_trip["id"]
-        set_bot_data(bot, "pending_group_joins", pending_map)
 
     return True, None
+
+
+async def dispatch_group_invites(
+    bot: Bot,
+    api_client: APIClient,
+    user_trips: Iterable[Dict[str, Any]],
+    processed_ids: MutableSet[str],
+    *,
+    concurrency: int,
+) -> None:
+    """Send invites for several registrations at once, ``concurrency`` at a time.
+
+    Telegram limits are enforced by the shared rate limiter, so the pool only bounds
+    how many invites (and backend reports) are in flight.
+    """
+    pending = list(
+        {user_trip["id"]: user_trip for user_trip in user_trips if user_trip["id"] not in processed_ids}.values()
+    )
+    if not pending:
+        return
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    started = time.monotonic()
+
+    async def _send(user_trip: Dict[str, Any]) -> bool:
+        async with semaphore:
+            try:
+                success, _ = await send_group_invite(bot, api_client, user_trip)
+            except Exception:  # pragma: no cover - defensive logging
+                logger.exception("Failed to send group invite for user trip %s", user_trip["id"])
+                return False
+            if success:
+                processed_ids.add(user_trip["id"])
+            return success
+
+    results = await asyncio.gather(*(_send(user_trip) for user_trip in pending))
+    elapsed = time.monotonic() - started
+    sent = sum(results)
+    logger.info(
+        "Dispatched %s group invites (%s sent, %s failed) in %.1fs (%.1f/s)",
+        len(pending),
+        sent,
+        len(pending) - sent,
+        elapsed,
+        len(pending) / elapsed if elapsed > 0 else float(len(pending)),
+    )
@@ -1,19 +1,22 @@
 """Aiogram handlers for the LocTur Telegram bot."""
 from __future__ import annotations
 
+import asyncio
 import logging
 import mimetypes
 import re
 from dataclasses import dataclass
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, MutableMapping
 
-from aiogram import F, Router
+from aiogram import Bot, F, Router
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, ChatJoinRequest, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
-from .api_client import APIClient, APIClientError
+from .api_client import APIClient, APIClientError, StreamingUpload
+from .catalogue import TripCatalogue
 from .config import BotConfig
 from .formatters import format_trip_summary
 from .keyboards import (
@@ -32,19 +35,22 @@ logger = logging.getLogger(__name__)
 router = Router(name="registration")
 
 PHONE_PATTERN = re.compile(r"^\+?\d[\d\s()+-]{6,}$")
+PAYMENT_PROOF_CHUNK_SIZE = 64 * 1024
 
 
 @dataclass
 class Dependencies:
     api_client: APIClient
     config: BotConfig
+    trips: TripCatalogue
 
 
 def _get_dependencies(event: Message | CallbackQuery | ChatJoinRequest) -> Dependencies:
     bot = event.bot
     api_client: APIClient = get_bot_data(bot, "api_client")
     config: BotConfig = get_bot_data(bot, "config")
-    return Dependencies(api_client=api_client, config=config)
+    trips: TripCatalogue = get_bot_data(bot, "trip_catalogue")
+    return Dependencies(api_client=api_client, config=config, trips=trips)
 
 
 async def _ensure_main_menu(message: Message, text: str) -> None:
@@ -60,7 +66,7 @@ async def cmd_start(message: Message, state: FSMContext) -> None:
         strings.MAIN_MENU_GREETING.format(name=message.from_user.full_name),
     )
     try:
-        trips = await deps.api_client.list_trips(status=deps.config.trips_status_filter)
+        trips = await deps.trips.list_trips()
     except APIClientError as exc:
         logger.warning("Unable to fetch trips on /start: %s", exc)
         return
@@ -114,7 +120,7 @@ async def cb_register(callback: CallbackQuery, state: FSMContext) -> None:
     deps = _get_dependencies(callback)
     await callback.answer()
     try:
-        trips = await deps.api_client.list_trips(status=deps.config.trips_status_filter)
+        trips = await deps.trips.list_trips()
     except APIClientError as exc:
         logger.error("Failed to fetch trips: %s", exc)
         await callback.message.answer(strings.UNABLE_TO_LOAD_TRIPS)
@@ -132,15 +138,9 @@ async def cb_register(callback: CallbackQuery, state: FSMContext) -> None:
 async def cb_registrations(callback: CallbackQuery, state: FSMContext) -> None:
     deps = _get_dependencies(callback)
     await callback.answer()
-    traveler = await deps.api_client.get_traveler_by_telegram_id(str(callback.from_user.id))
-    if not traveler:
-        await callback.message.answer(
-            strings.NO_REGISTRATIONS_YET,
-            reply_markup=main_menu_keyboard(),
-        )
-        return
-    user_trips = await deps.api_client.list_user_trips(filters={"traveler": traveler["id"]})
-    if not user_trips:
+    page = await deps.api_client.list_traveler_registrations(callback.from_user.id)
+    registrations = page["results"]
+    if not registrations:
         await callback.message.answer(
             strings.NO_REGISTRATIONS_YET,
             reply_markup=main_menu_keyboard(),
@@ -149,31 +149,28 @@ async def cb_registrations(callback: CallbackQuery, state: FSMContext) -> None:
 
     lines = [strings.YOUR_REGISTRATIONS]
     eligible_buttons: list[list[InlineKeyboardButton]] = []
-    for user_trip in user_trips:
-        trip = user_trip.get("trip_detail") or {}
-        title = trip.get("title", "Trip")
+    for registration in registrations:
+        title = registration.get("title") or "Trip"
         lines.append(
             strings.REGISTRATION_LINE.format(
                 title=title,
-                status=user_trip.get('status'),
-                payment=user_trip.get('payment_status')
+                status=registration.get("status"),
+                payment=registration.get("payment_status"),
             )
         )
 
-        trip_has_group = bool((trip.get("group_chat_id") or trip.get("group_invite_link")))
-        if (
-            user_trip.get("status") == "confirmed"
-            and user_trip.get("payment_status") == "confirmed"
-            and trip_has_group
-        ):
+        if registration.get("can_request_invite"):
             eligible_buttons.append(
                 [
                     InlineKeyboardButton(
                         text=strings.GET_INVITE_FOR.format(title=title),
-                        callback_data=f"join:{user_trip['id']}",
+                        callback_data=f"join:{registration['id']}",
                     )
                 ]
             )
+    if page["has_more"]:
+        # The backend returns only the newest registrations; say so instead of hiding the rest.
+        lines.append(strings.OLDER_REGISTRATIONS_HIDDEN.format(count=len(registrations)))
 
     await callback.message.answer(
         "\n".join(lines),
@@ -193,33 +190,27 @@ async def cb_select_trip(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
     trip_id = callback.data.split(":", maxsplit=1)[1]
     try:
-        trip = await deps.api_client.get_trip(trip_id)
+        context = await deps.api_client.get_registration_context(trip_id, callback.from_user.id)
     except APIClientError as exc:
-        logger.error("Failed to fetch trip %s: %s", trip_id, exc)
+        logger.error("Failed to fetch registration context for trip %s: %s", trip_id, exc)
         await callback.message.answer(strings.UNABLE_TO_LOAD_TRIP)
         return
 
-    traveler = await deps.api_client.get_traveler_by_telegram_id(str(callback.from_user.id))
-    
-    # Check if user is already registered
+    if context["already_registered"]:
+        await callback.message.answer(strings.ALREADY_REGISTERED)
+        await state.clear()
+        return
+
+    trip = context["trip"]
+    traveler = context["traveler"]
+    payment_instructions = context.get("payment_instructions", "")
     if traveler:
-        # Check if user is already registered for this specific trip
-        try:
-            existing_trips = await deps.api_client.list_user_trips(filters={"traveler": traveler["id"], "trip": trip_id})
-            if existing_trips:
-                await callback.message.answer(strings.ALREADY_REGISTERED)
-                await state.clear()
-                return
-        except APIClientError:
-            # If check fails, proceed anyway - will be caught later
-            logger.warning("Failed to check existing registration")
-        
-        # User is registered, skip to payment proof
-        traveler_id = traveler.get("id")
+        # Known traveler: skip straight to the payment proof
         await state.update_data(
             trip_id=trip_id,
             trip_data=trip,
-            traveler_id=traveler_id,
+            traveler_id=traveler.get("id"),
+            payment_instructions=payment_instructions,
         )
         
         await callback.message.answer(format_trip_summary(trip), disable_web_page_preview=True)
@@ -236,6 +227,7 @@ async def cb_select_trip(callback: CallbackQuery, state: FSMContext) -> None:
         trip_id=trip_id,
         trip_data=trip,
         traveler_id=None,
+        payment_instructions=payment_instructions,
         suggested_first_name=suggested_first,
         suggested_last_name=suggested_last,
         suggested_phone=suggested_phone,
@@ -328,13 +320,15 @@ async def _ask_for_payment_proof(message: Message, trip_data: Dict[str, Any], st
     trip_title = trip_data.get('title')
     default_price = trip_data.get("default_price", "0")
     
-    # Get payment instructions from settings
-    try:
-        settings = await deps.api_client.get_settings()
-        payment_instructions = settings.get("payment_instructions", "")
-    except APIClientError:
-        logger.warning("Failed to fetch payment instructions from settings")
-        payment_instructions = ""
+    # Instructions normally arrive with the registration context; fetch them otherwise
+    payment_instructions = (await state.get_data()).get("payment_instructions")
+    if payment_instructions is None:
+        try:
+            settings = await deps.api_client.get_settings()
+            payment_instructions = settings.get("payment_instructions", "")
+        except APIClientError:
+            logger.warning("Failed to fetch payment instructions from settings")
+            payment_instructions = ""
     
     # Format the payment message with instructions
     payment_message = strings.PAYMENT_PROOF_PROMPT.format(
@@ -378,30 +372,88 @@ async def on_extra_info(message: Message, state: FSMContext) -> None:
     await _ask_for_payment_proof(message, trip, state, deps)
 
 
-async def _download_payment_file(message: Message) -> tuple[bytes, str, str]:
-    from io import BytesIO
+class PaymentProofTooLarge(ValueError):
+    """Raised when a payment proof exceeds the configured size limit."""
 
-    if not message.bot:
-        raise RuntimeError("Bot instance unavailable for downloading files.")
 
-    buffer = BytesIO()
-    filename = "payment_proof.jpg"
-    content_type = "image/jpeg"
+async def _stream_telegram_file(bot: Bot, file_path: str, *, limit: int) -> AsyncIterator[bytes]:
+    """Yield a Telegram file in chunks, aborting as soon as it grows past ``limit`` bytes."""
+    received = 0
+    if bot.session.api.is_local:
+        chunks = _read_local_file(bot.session.api.wrap_local_file.to_local(file_path))
+    else:
+        chunks = bot.session.stream_content(
+            url=bot.session.api.file_url(bot.token, file_path),
+            chunk_size=PAYMENT_PROOF_CHUNK_SIZE,
+        )
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > limit:
+            raise PaymentProofTooLarge(f"Payment proof exceeds {limit} bytes.")
+        yield chunk
+
 
+async def _read_local_file(path: str | Path) -> AsyncIterator[bytes]:
+    # Disk reads block; run them on a thread so a slow volume does not stall the event loop.
+    handle = await asyncio.to_thread(open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(handle.read, PAYMENT_PROOF_CHUNK_SIZE):
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _payment_attachment(message: Message, *, max_size: int):
+    """Return the proof attachment with its filename and content type, rejecting oversized files."""
     if message.photo:
-        photo = message.photo[-1]
-        await message.bot.download(photo.file_id, destination=buffer)
-        filename = f"payment_{photo.file_unique_id}.jpg"
+        attachment = message.photo[-1]
+        filename = f"payment_{attachment.file_unique_id}.jpg"
+        content_type = "image/jpeg"
     elif message.document:
-        document = message.document
-        await message.bot.download(document.file_id, destination=buffer)
-        filename = document.file_name or f"payment_{document.file_unique_id}"
-        content_type = document.mime_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        attachment = message.document
+        filename = attachment.file_name or f"payment_{attachment.file_unique_id}"
+        content_type = attachment.mime_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
     else:
         raise ValueError("Unsupported message type for payment proof.")
 
-    buffer.seek(0)
-    return buffer.getvalue(), filename, content_type
+    if attachment.file_size and attachment.file_size > max_size:
+        raise PaymentProofTooLarge(f"Payment proof exceeds {max_size} bytes.")
+    return attachment, filename, content_type
+
+
+def _payment_file_reference(message: Message, *, max_size: int) -> Dict[str, str]:
+    """Payload fields that let the backend download the proof itself."""
+    attachment, _, _ = _payment_attachment(message, max_size=max_size)
+    return {
+        "payment_proof_file_id": attachment.file_id,
+        "payment_proof_file_unique_id": attachment.file_unique_id,
+    }
+
+
+async def _payment_file_upload(message: Message, *, max_size: int) -> StreamingUpload:
+    """Describe the proof attached to ``message`` as a streaming upload.
+
+    Sizes reported by Telegram are checked before anything is downloaded; the
+    stream itself is capped again in case the reported size was missing or wrong.
+    """
+    if not message.bot:
+        raise RuntimeError("Bot instance unavailable for downloading files.")
+
+    attachment, filename, content_type = _payment_attachment(message, max_size=max_size)
+    telegram_file = await message.bot.get_file(attachment.file_id)
+    size = telegram_file.file_size or attachment.file_size
+    if not size or not telegram_file.file_path:
+        raise ValueError("Telegram did not report the payment proof size.")
+    if size > max_size:
+        raise PaymentProofTooLarge(f"Payment proof exceeds {max_size} bytes.")
+
+    return StreamingUpload(
+        field="payment_proof",
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        chunks=_stream_telegram_file(message.bot, telegram_file.file_path, limit=size),
+    )
 
 
 @router.message(RegistrationStates.waiting_for_payment_proof)
@@ -412,8 +464,19 @@ async def on_payment_proof(message: Message, state: FSMContext) -> None:
         await message.answer(strings.PLEASE_SEND_PAYMENT_PROOF)
         return
 
+    # With deferred fetching the backend downloads the file after replying, so the
+    # traveler is not kept waiting on a download and re-upload through the bot. The
+    # reference is sent either way so the backend can recognise re-sent files.
+    upload = None
     try:
-        file_bytes, filename, content_type = await _download_payment_file(message)
+        reference = _payment_file_reference(message, max_size=deps.config.payment_proof_max_bytes)
+        if not deps.config.defer_payment_proof_fetch:
+            upload = await _payment_file_upload(message, max_size=deps.config.payment_proof_max_bytes)
+    except PaymentProofTooLarge:
+        await message.answer(
+            strings.PAYMENT_PROOF_TOO_LARGE.format(max_mb=deps.config.payment_proof_max_bytes // (1024 * 1024))
+        )
+        return
     except ValueError:
         await message.answer(strings.UNSUPPORTED_FILE_TYPE)
         return
@@ -423,14 +486,19 @@ async def on_payment_proof(message: Message, state: FSMContext) -> None:
         "traveler": data["traveler_id"],
         "quoted_price": str(data["trip_data"].get("default_price", "0")),
         "paid_amount": "0",
+        **reference,
     }
     caption = _normalize_text(message.caption)
     if caption:
         payload["payment_note"] = caption
 
-    files = {"payment_proof": (filename, file_bytes, content_type)}
     try:
-        user_trip = await deps.api_client.create_user_trip(payload, files=files)
+        user_trip = await deps.api_client.create_user_trip(payload, upload=upload)
+    except PaymentProofTooLarge:
+        await message.answer(
+            strings.PAYMENT_PROOF_TOO_LARGE.format(max_mb=deps.config.payment_proof_max_bytes // (1024 * 1024))
+        )
+        return
     except APIClientError as exc:
         detail = exc.payload or {}
         if isinstance(detail, dict) and "non_field_errors" in detail:
@@ -469,24 +537,14 @@ async def on_chat_join_request(join_request: ChatJoinRequest) -> None:
     deps = _get_dependencies(join_request)
     chat_id = join_request.chat.id
     user_id = join_request.from_user.id
-    pending_map: dict[tuple[int, int], str] = get_bot_data(join_request.bot, "pending_group_joins")
+    pending_map: MutableMapping[tuple[int, int], str] = get_bot_data(join_request.bot, "pending_group_joins") or {}
 
     user_trip_id = pending_map.get((chat_id, user_id))
-    traveler = None
 
     if not user_trip_id:
-        traveler = await deps.api_client.get_traveler_by_telegram_id(str(user_id))
-        if traveler:
-            user_trips = await deps.api_client.list_user_trips(filters={"traveler": traveler["id"]})
-            for user_trip in user_trips:
-                trip = user_trip.get("trip_detail") or {}
-                try:
-                    configured_chat = int(trip.get("group_chat_id") or 0)
-                except (TypeError, ValueError):
-                    continue
-                if configured_chat == chat_id and user_trip.get("payment_status") == "confirmed":
-                    user_trip_id = user_trip["id"]
-                    break
+        user_trip = await deps.api_client.resolve_join_request(chat_id=chat_id, telegram_id=user_id)
+        if user_trip:
+            user_trip_id = user_trip["id"]
 
     if not user_trip_id:
         await join_request.decline()
@@ -1,28 +1,46 @@
-"""Background task to handle post-payment group onboarding."""
+"""Reconciliation sweep for post-payment group onboarding.
+
+Confirmations normally arrive through the outbox event stream (see ``events``);
+this slow sweep picks up anything that stream missed.
+"""
 from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Set
+from typing import MutableSet, Optional
 
 from aiogram import Bot
 
 from .api_client import APIClient
 from .config import BotConfig
-from .group_invites import send_group_invite
+from .group_invites import dispatch_group_invites
 
 
 logger = logging.getLogger(__name__)
 
+INITIAL_SYNC_CURSOR = "1970-01-01T00:00:00+00:00"
+# Every Nth cycle re-reads the whole pending queue in case a delta was missed.
+FULL_SWEEP_EVERY = 12
+
 
-async def poll_group_join_queue(bot: Bot, api_client: APIClient, config: BotConfig) -> None:
-    """Poll backend for confirmed registrations and send invite links."""
+async def poll_group_join_queue(
+    bot: Bot,
+    api_client: APIClient,
+    config: BotConfig,
+    processed_ids: Optional[MutableSet[str]] = None,
+) -> None:
+    """Periodically poll backend for confirmed registrations and send missing invite links."""
 
-    processed_ids: Set[str] = set()
+    processed_ids = set() if processed_ids is None else processed_ids
+    sync_cursor: Optional[str] = None
+    cycle = 0
 
     while True:
+        if cycle % FULL_SWEEP_EVERY == 0:
+            sync_cursor = None
+        cycle += 1
         try:
-            await _process_pending(bot, api_client, config, processed_ids)
+            sync_cursor = await _process_pending(bot, api_client, config, processed_ids, sync_cursor)
         except Exception:  # pragma: no cover - defensive logging
             logger.exception("Unexpected error while processing group join queue")
         await asyncio.sleep(max(config.poll_interval_seconds, 10))
@@ -32,32 +50,48 @@ async def _process_pending(
     bot: Bot,
     api_client: APIClient,
     config: BotConfig,
-    processed_ids: Set[str],
-) -> None:
+    processed_ids: MutableSet[str],
+    sync_cursor: Optional[str] = None,
+) -> Optional[str]:
+    """Send invites for pending registrations changed since ``sync_cursor``.
+
+    Passing ``None`` performs a full sweep. Returns the cursor for the next call,
+    or the unchanged cursor if the backend could not be reached.
+    """
     filters = {
         "payment_status": "confirmed",
         "status": "confirmed",
         "group_joined": "false",
     }
     try:
-        user_trips = await api_client.list_user_trips(filters=filters)
+        changes = await api_client.sync_user_trips(
+            since=sync_cursor or INITIAL_SYNC_CURSOR,
+            filters=filters,
+        )
     except Exception as exc:  # pragma: no cover - upstream errors logged in API client
         logger.error("Failed to fetch pending group joins: %s", exc)
-        return
+        return sync_cursor
 
-    for user_trip in user_trips:
-        user_trip_id = user_trip["id"]
-        if user_trip_id in processed_ids:
-            continue
+    for user_trip_id in changes["deleted"]:
+        processed_ids.discard(user_trip_id)
+    user_trips = changes["results"]
 
-        if user_trip.get("group_joined_at"):
+    eligible = []
+    for user_trip in user_trips:
+        if user_trip["id"] in processed_ids or user_trip.get("group_joined_at"):
             continue
 
         error_text = (user_trip.get("group_join_error") or "").lower()
         if "awaiting traveler to join" in error_text:
             continue
+        eligible.append(user_trip)
 
-        success, _ = await send_group_invite(bot, api_client, user_trip)
-        if success:
-            processed_ids.add(user_trip_id)
+    await dispatch_group_invites(
+        bot,
+        api_client,
+        eligible,
+        processed_ids,
+        concurrency=config.invite_concurrency,
+    )
 
+    return changes["sync_cursor"]
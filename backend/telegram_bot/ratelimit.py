@@ -0,0 +1,140 @@
+"""Token-bucket throttling for outgoing Telegram Bot API calls."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, TypeVar
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from .config import BotConfig
+from .runtime import get_bot_data, set_bot_data
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursting up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity and not self._lock.locked()
+
+
+class TelegramRateLimiter:
+    """Apply Telegram's global and per-chat limits and back off on ``RetryAfter``.
+
+    Private chats and groups have different per-chat budgets; a negative chat id
+    is a group or channel. The per-chat budgets cover messages sent to a chat;
+    administrative calls such as creating invite links use ``call_global``. A
+    ``RetryAfter`` from any call pauses every caller.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        private_chat_rate: float = 1.0,
+        group_chat_rate: float = 20 / 60,
+        max_retries: int = 3,
+        max_chat_buckets: int = 1024,
+    ):
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.max_retries = max_retries
+        self.max_chat_buckets = max_chat_buckets
+        self._global = TokenBucket(global_rate)
+        self._chats: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = self.group_chat_rate if chat_id < 0 else self.private_chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, capacity=1)
+            if len(self._chats) > self.max_chat_buckets:
+                for stale_id in [key for key, value in self._chats.items() if value.idle]:
+                    del self._chats[stale_id]
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _wait_for_pause(self) -> None:
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
+
+    async def call(self, chat_id: int, func: Callable[..., Awaitable[T]], /, *args: Any, **kwargs: Any) -> T:
+        """Run ``func(*args, **kwargs)``, a message to ``chat_id``, once both budgets allow it."""
+        return await self._call(chat_id, func, *args, **kwargs)
+
+    async def call_global(self, func: Callable[..., Awaitable[T]], /, *args: Any, **kwargs: Any) -> T:
+        """Run ``func(*args, **kwargs)``, which posts nothing to a chat, under the global budget only."""
+        return await self._call(None, func, *args, **kwargs)
+
+    async def _call(self, chat_id: int | None, func: Callable[..., Awaitable[T]], /, *args: Any, **kwargs: Any) -> T:
+        attempt = 0
+        while True:
+            await self._wait_for_pause()
+            if chat_id is not None:
+                await self._chat_bucket(chat_id).acquire()
+            await self._global.acquire()
+            try:
+                return await func(*args, **kwargs)
+            except TelegramRetryAfter as exc:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self._paused_until = max(self._paused_until, time.monotonic() + exc.retry_after)
+                logger.warning(
+                    "Telegram flood control on %s; pausing all calls for %ss (attempt %s/%s)",
+                    f"chat {chat_id}" if chat_id is not None else "a global call",
+                    exc.retry_after,
+                    attempt,
+                    self.max_retries,
+                )
+
+
+def get_rate_limiter(bot: Bot) -> TelegramRateLimiter:
+    """Return the limiter shared by everything that talks to Telegram through ``bot``."""
+    limiter: TelegramRateLimiter | None = get_bot_data(bot, "rate_limiter")
+    if limiter is None:
+        config: BotConfig | None = get_bot_data(bot, "config")
+        if config is None:
+            limiter = TelegramRateLimiter()
+        else:
+            limiter = TelegramRateLimiter(
+                global_rate=config.telegram_global_rate,
+                private_chat_rate=config.telegram_private_chat_rate,
+                group_chat_rate=config.telegram_group_chat_rate,
+            )
+        set_bot_data(bot, "rate_limiter", limiter)
+    return limiter
@@ -0,0 +1,156 @@
+"""Disk-backed bot state that survives restarts (processed invites, pending joins)."""
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import MutableMapping, MutableSet
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+PendingJoinKey = Tuple[int, int]
+
+# Expired and excess rows are pruned once every this many writes.
+PRUNE_EVERY_WRITES = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_user_trips (
+    user_trip_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS processed_user_trips_expires ON processed_user_trips (expires_at);
+
+CREATE TABLE IF NOT EXISTS pending_group_joins (
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    user_trip_id TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pending_group_joins_expires ON pending_group_joins (expires_at);
+"""
+
+
+class BotStateStore:
+    """SQLite file holding bot bookkeeping with per-entry TTLs and a row cap per table."""
+
+    def __init__(self, path: str | Path, *, processed_ttl: float, pending_join_ttl: float, max_entries: int):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.max_entries = max_entries
+        self.processed_ids = ProcessedIds(self, processed_ttl)
+        self.pending_joins = PendingJoins(self, pending_join_ttl)
+        self._writes = 0
+
+    def execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        return self._conn.execute(sql, params)
+
+    def wrote(self) -> None:
+        self._writes += 1
+        if self._writes >= PRUNE_EVERY_WRITES:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired rows, then the soonest-expiring rows beyond ``max_entries``."""
+        now = time.time()
+        for table in ("processed_user_trips", "pending_group_joins"):
+            self._conn.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE expires_at <= ("
+                f"SELECT expires_at FROM {table} ORDER BY expires_at DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._writes = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ProcessedIds(MutableSet):
+    """Set of registration ids that already received an invite."""
+
+    def __init__(self, store: BotStateStore, ttl: float):
+        self._store = store
+        self.ttl = ttl
+
+    def __contains__(self, user_trip_id: object) -> bool:
+        row = self._store.execute(
+            "SELECT 1 FROM processed_user_trips WHERE user_trip_id = ? AND expires_at > ?",
+            (str(user_trip_id), time.time()),
+        ).fetchone()
+        return row is not None
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._store.execute(
+            "SELECT user_trip_id FROM processed_user_trips WHERE expires_at > ?", (time.time(),)
+        ).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        return self._store.execute(
+            "SELECT COUNT(*) FROM processed_user_trips WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    def add(self, user_trip_id: str) -> None:
+        self._store.execute(
+            "INSERT OR REPLACE INTO processed_user_trips (user_trip_id, expires_at) VALUES (?, ?)",
+            (str(user_trip_id), time.time() + self.ttl),
+        )
+        self._store.wrote()
+
+    def discard(self, user_trip_id: str) -> None:
+        self._store.execute("DELETE FROM processed_user_trips WHERE user_trip_id = ?", (str(user_trip_id),))
+
+
+class PendingJoins(MutableMapping):
+    """Map of ``(chat_id, user_id)`` to the registration whose invite is awaiting a join request."""
+
+    def __init__(self, store: BotStateStore, ttl: float):
+        self._store = store
+        self.ttl = ttl
+
+    def _lookup(self, key: PendingJoinKey) -> Optional[str]:
+        chat_id, user_id = key
+        row = self._store.execute(
+            "SELECT user_trip_id FROM pending_group_joins WHERE chat_id = ? AND user_id = ? AND expires_at > ?",
+            (int(chat_id), int(user_id), time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def __getitem__(self, key: PendingJoinKey) -> str:
+        value = self._lookup(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: PendingJoinKey, user_trip_id: str) -> None:
+        chat_id, user_id = key
+        self._store.execute(
+            "INSERT OR REPLACE INTO pending_group_joins (chat_id, user_id, user_trip_id, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (int(chat_id), int(user_id), str(user_trip_id), time.time() + self.ttl),
+        )
+        self._store.wrote()
+
+    def __delitem__(self, key: PendingJoinKey) -> None:
+        chat_id, user_id = key
+        cursor = self._store.execute(
+            "DELETE FROM pending_group_joins WHERE chat_id = ? AND user_id = ?",
+            (int(chat_id), int(user_id)),
+        )
+        if not cursor.rowcount:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[PendingJoinKey]:
+        rows = self._store.execute(
+            "SELECT chat_id, user_id FROM pending_group_joins WHERE expires_at > ?", (time.time(),)
+        ).fetchall()
+        return iter([(row[0], row[1]) for row in rows])
+
+    def __len__(self) -> int:
+        return self._store.execute(
+            "SELECT COUNT(*) FROM pending_group_joins WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
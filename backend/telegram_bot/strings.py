@@ -36,6 +36,7 @@ INVALID_PHONE_NUMBER = "Bu raqam to‘g‘ri formatda emas. Iltimos, qayta kirit
 PAYMENT_PROOF_PROMPT = "Deyarli tayyor! <b>{trip_title}</b> uchun to‘lov kvitansiyasining fotosurati yoki PDF faylini yuboring (miqdor: {amount})."
 PLEASE_SEND_PAYMENT_PROOF = "Iltimos, to‘lov dalilini (foto yoki hujjat) yuboring."
 UNSUPPORTED_FILE_TYPE = "Bu turdagi fayl qo‘llab-quvvatlanmaydi. Faqat foto yoki PDF yuboring."
+PAYMENT_PROOF_TOO_LARGE = "Fayl juda katta. Iltimos, {max_mb} MB dan kichik foto yoki PDF yuboring."
 PAYMENT_SUBMITTED = "Rahmat! To‘lov dalilingiz yuborildi.\nAdminlar tasdiqlagach sizga xabar beriladi."
 TRIP_SUMMARY = "Sayohat haqida umumiy ma’lumot:\n{summary}"
 
@@ -48,6 +49,7 @@ COULDNT_SUBMIT_REGISTRATION = "Ro‘yxatdan o‘tish jarayonini yakunlab bo‘lm
 NO_REGISTRATIONS_YET = "Siz hali hech qanday sayohatga yozilmagansiz. Menyudan birinchisini tanlang!"
 YOUR_REGISTRATIONS = "Sizning ro‘yxatlaringiz:"
 REGISTRATION_LINE = "• <b>{title}</b>: holat={status}, to‘lov={payment}"
+OLDER_REGISTRATIONS_HIDDEN = "Faqat oxirgi {count} ta ro‘yxat ko‘rsatildi."
 GET_INVITE_FOR = "{title} uchun taklif olish"
 TAP_FOR_INVITE = "Taklif havolasini qayta olish uchun quyidagi tugmani bosing:"
 
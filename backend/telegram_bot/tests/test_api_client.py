@@ -0,0 +1,195 @@
+"""Tests for the backend API client's retries, timeouts, circuit breaker and uploads."""
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import httpx
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.http.multipartparser import MultiPartParser
+
+from telegram_bot import handlers
+from telegram_bot.api_client import APIClient, APIClientError, CircuitBreaker, StreamingUpload, _streaming_multipart
+
+BASE_URL = "http://backend.test/api/"
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_after_threshold_and_probes_once_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(breaker.times_opened, 1)
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_open_breaker_rejects_until_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_release_frees_the_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.release()
+        self.assertTrue(breaker.allow())
+
+
+class APIClientTransportTests(unittest.IsolatedAsyncioTestCase):
+    def client(self, handler, **kwargs):
+        kwargs.setdefault("retry_backoff", 0)
+        client = APIClient(BASE_URL, "token", transport=httpx.MockTransport(handler), **kwargs)
+        self.addAsyncCleanup(client.aclose)
+        return client
+
+    async def test_idempotent_requests_retry_on_gateway_errors(self):
+        statuses = iter([503, 502, 200])
+
+        def handler(request):
+            return httpx.Response(next(statuses), json={"ok": True})
+
+        client = self.client(handler, max_retries=2)
+        self.assertEqual(await client._request("GET", "trips/"), {"ok": True})
+        self.assertEqual(client.metrics()["retries"], 2)
+        self.assertEqual(client.metrics()["breaker_consecutive_failures"], 0)
+
+    async def test_non_idempotent_requests_are_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ConnectError("refused", request=request)
+
+        client = self.client(handler, max_retries=3)
+        with self.assertRaises(APIClientError):
+            await client._request("POST", "user-trips/", json={})
+        self.assertEqual(len(calls), 1)
+
+    async def test_open_circuit_rejects_without_sending(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500)
+
+        client = self.client(handler, max_retries=0, breaker_failure_threshold=2, breaker_reset_timeout=60)
+        for _ in range(2):
+            with self.assertRaises(APIClientError):
+                await client._request("GET", "trips/")
+        with self.assertRaisesRegex(APIClientError, "circuit open"):
+            await client._request("GET", "trips/")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(client.metrics()["rejected"], 1)
+
+    async def test_cancelled_probe_does_not_wedge_the_breaker(self):
+        started = asyncio.Event()
+        outcome = {"hang": True}
+
+        async def handler(request):
+            if outcome["hang"]:
+                started.set()
+                await asyncio.sleep(60)
+            return httpx.Response(200, json=[])
+
+        client = self.client(handler, max_retries=0, breaker_failure_threshold=1, breaker_reset_timeout=0)
+        client._breaker.record_failure()
+        probe = asyncio.create_task(client._request("GET", "trips/"))
+        await started.wait()
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+
+        outcome["hang"] = False
+        self.assertEqual(await client._request("GET", "trips/"), [])
+        self.assertEqual(client.metrics()["breaker_state"], CircuitBreaker.CLOSED)
+        self.assertEqual(client.metrics()["in_flight"], 0)
+
+    async def test_endpoint_timeouts_use_longest_prefix(self):
+        seen = {}
+
+        def handler(request):
+            seen[request.url.path] = request.extensions["timeout"]["read"]
+            return httpx.Response(200, json={})
+
+        client = self.client(handler, timeout=10, endpoint_timeouts={"user-trips/": 30, "user-trips/sync/": 5})
+        await client._request("GET", "user-trips/sync/")
+        await client._request("GET", "user-trips/1/")
+        await client._request("GET", "trips/")
+        self.assertEqual(
+            seen, {"/api/user-trips/sync/": 5, "/api/user-trips/1/": 30, "/api/trips/": 10}
+        )
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def _collect(body):
+    return b"".join([chunk async for chunk in body])
+
+
+class StreamingMultipartTests(unittest.IsolatedAsyncioTestCase):
+    def upload(self, *parts, size=None, filename="proof.jpg"):
+        return StreamingUpload(
+            field="payment_proof",
+            filename=filename,
+            content_type="image/jpeg",
+            size=sum(map(len, parts)) if size is None else size,
+            chunks=_chunks(*parts),
+        )
+
+    async def test_body_matches_content_length_and_parses(self):
+        headers, body = _streaming_multipart({"trip": "1", "note": "ü"}, self.upload(b"abc", b"defg"))
+        payload = await _collect(body)
+        self.assertEqual(int(headers["Content-Length"]), len(payload))
+
+        # The backend's own parser must read it back.
+        meta = {"CONTENT_TYPE": headers["Content-Type"], "CONTENT_LENGTH": headers["Content-Length"]}
+        fields, files = MultiPartParser(meta, BytesIO(payload), [MemoryFileUploadHandler()]).parse()
+        self.assertEqual(fields.dict(), {"trip": "1", "note": "ü"})
+        self.assertEqual(files["payment_proof"].name, "proof.jpg")
+        self.assertEqual(files["payment_proof"].content_type, "image/jpeg")
+        self.assertEqual(files["payment_proof"].read(), b"abcdefg")
+
+    async def test_parameters_are_quoted(self):
+        _, body = _streaming_multipart({}, self.upload(b"x", filename='a"b\r\nc.jpg'))
+        self.assertIn(b'filename="a%22b  c.jpg"', await _collect(body))
+
+    async def test_short_stream_aborts(self):
+        _, body = _streaming_multipart({}, self.upload(b"abc", size=5))
+        with self.assertRaisesRegex(APIClientError, "ended after 3 of 5 bytes"):
+            await _collect(body)
+
+    async def test_long_stream_aborts_before_sending_extra_bytes(self):
+        _, body = _streaming_multipart({}, self.upload(b"abc", b"def", size=4))
+        sent = []
+        with self.assertRaisesRegex(APIClientError, "larger than the declared 4 bytes"):
+            async for chunk in body:
+                sent.append(chunk)
+        self.assertEqual(sent[1:], [b"abc"])
+
+
+class ReadLocalFileTests(unittest.IsolatedAsyncioTestCase):
+    async def test_reads_in_chunks_off_the_event_loop(self):
+        with tempfile.NamedTemporaryFile() as handle:
+            handle.write(b"0123456789")
+            handle.flush()
+            with mock.patch.object(handlers, "PAYMENT_PROOF_CHUNK_SIZE", 4), mock.patch.object(
+                handlers.asyncio, "to_thread", wraps=asyncio.to_thread
+            ) as to_thread:
+                chunks = [chunk async for chunk in handlers._read_local_file(handle.name)]
+        self.assertEqual(chunks, [b"0123", b"4567", b"89"])
+        # One call opens the file, and one per read, including the final empty one.
+        self.assertEqual(to_thread.call_count, 5)
@@ -0,0 +1,60 @@
+"""Tests for group invite dispatch."""
+from __future__ import annotations
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from telegram_bot.group_invites import dispatch_group_invites
+from telegram_bot.ratelimit import TelegramRateLimiter
+from telegram_bot.runtime import clear_bot_data, set_bot_data
+
+GROUP_ID = -100123
+
+
+class FakeBot:
+    def __init__(self):
+        self.invite_links = 0
+        self.messages = []
+
+    async def create_chat_invite_link(self, *, chat_id, **kwargs):
+        self.invite_links += 1
+        return SimpleNamespace(invite_link=f"https://t.me/+{self.invite_links}")
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append(chat_id)
+
+
+class FakeAPIClient:
+    async def report_group_join(self, user_trip_id, *, success, error=None):
+        return {}
+
+
+class DispatchGroupInvitesTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.bot = FakeBot()
+        self.addCleanup(clear_bot_data, self.bot)
+        # Group chats get one message every three seconds; a whole batch must not wait on it.
+        self.limiter = TelegramRateLimiter(global_rate=1000, private_chat_rate=1, group_chat_rate=20 / 60)
+        set_bot_data(self.bot, "rate_limiter", self.limiter)
+
+    async def test_invites_for_one_group_skip_the_group_message_budget(self):
+        user_trips = [
+            {
+                "id": f"user-trip-{index}",
+                "trip_detail": {"title": "Trip", "group_chat_id": str(GROUP_ID), "group_invite_link": ""},
+                "traveler_detail": {"telegram_id": str(1000 + index)},
+            }
+            for index in range(20)
+        ]
+        processed_ids = set()
+
+        await asyncio.wait_for(
+            dispatch_group_invites(self.bot, FakeAPIClient(), user_trips, processed_ids, concurrency=8),
+            timeout=2,
+        )
+
+        self.assertEqual(self.bot.invite_links, 20)
+        self.assertEqual(len(self.bot.messages), 20)
+        self.assertEqual(len(processed_ids), 20)
+        self.assertNotIn(GROUP_ID, self.limiter._chats)